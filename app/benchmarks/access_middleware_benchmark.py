@@ -0,0 +1,99 @@
+"""
+Requests per second through the access middleware, the BaseHTTPMiddleware version it replaced against the
+pure ASGI AccessMiddleware. Runs in-process over httpx's ASGI transport, with the token check stubbed out,
+so the numbers compare middleware overhead only.
+
+    PYTHONPATH=app/src python app/benchmarks/access_middleware_benchmark.py [requests] [concurrency]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, RedirectResponse, StreamingResponse
+from starlette.routing import Route
+
+from service.auth import access_middleware
+from service.auth.access_middleware import AccessMiddleware, PathMatcher
+
+ALLOWED_PATHS = ["/", "/metrics", "/health", "/docs", "/openapi.json", "/users/token", "/login", "/signup",
+                 "/users/signup", "/users/login"]
+COOKIE_NAME = "user_token"
+
+
+@asynccontextmanager
+async def no_session():
+    yield None
+
+
+async def resolve_auth_context(token, session):
+    return token
+
+
+async def legacy_middleware(request: Request, call_next):
+    """The former @app.middleware("http") function, with the same stubbed token check."""
+    request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+    request.state.request_id = request_id
+    if request.url.path not in ALLOWED_PATHS:
+        token = request.cookies.get(COOKIE_NAME)
+        if not token:
+            return RedirectResponse(url="/")
+        async with no_session() as session:
+            request.state.auth = await resolve_auth_context(token, session)
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+async def health(request: Request):
+    return PlainTextResponse("ok")
+
+
+async def stream(request: Request):
+    return StreamingResponse((str(i) for i in range(10)), media_type="text/plain")
+
+
+def build_app(asgi: bool) -> Starlette:
+    app = Starlette(routes=[Route("/health", health), Route("/users/balance/current", health),
+                            Route("/prediction/stream", stream)])
+    if asgi:
+        app.add_middleware(AccessMiddleware, public_paths=PathMatcher(ALLOWED_PATHS, ["/docs/"]))
+    else:
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_middleware)
+    return app
+
+
+async def requests_per_second(app: Starlette, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 cookies={COOKIE_NAME: "token"}) as client:
+        async def worker(count: int):
+            for _ in range(count):
+                (await client.get(path)).raise_for_status()
+
+        await worker(100)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(total // concurrency) for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+async def main(total: int, concurrency: int) -> None:
+    access_middleware.get_auth_settings().COOKIE_NAME = COOKIE_NAME
+    access_middleware.async_session_scope = no_session
+    access_middleware.resolve_auth_context = resolve_auth_context
+
+    print(f"{'path':<28}{'BaseHTTPMiddleware':>20}{'pure ASGI':>12}{'change':>9}")
+    for path in ("/health", "/users/balance/current", "/prediction/stream"):
+        before = await requests_per_second(build_app(asgi=False), path, total, concurrency)
+        after = await requests_per_second(build_app(asgi=True), path, total, concurrency)
+        print(f"{path:<28}{before:>16.0f} r/s{after:>8.0f} r/s{(after / before - 1) * 100:>+8.0f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 50))
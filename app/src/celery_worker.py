@@ -2,40 +2,223 @@ import logging
 import os
 import uuid
 
-from celery import Celery
+from celery import Celery, concurrency
+from celery.concurrency.prefork import TaskPool as PreforkTaskPool
+from celery.signals import setup_logging as setup_celery_logging, worker_init, worker_process_init, worker_ready, \
+    worker_shutdown, task_postrun
+from prometheus_client import start_http_server, CollectorRegistry, multiprocess
 
-from database.database import get_session
+from config.inference_config import get_inference_settings
+from config.logging_config import setup_logging
+from database.database import session_scope, get_engine
 from entities.ml_model.inference_input import InferenceInput
 from entities.task.prediction_request import PredictionRequest
 from exceptions.model_exception import ModelException
-from service.crud.model_service import get_model_by_name, prepare_and_save_task, make_prediction
-from service.crud.user_service import withdraw_balance
+from entities.task.batch_prediction_request import BatchPredictionRequest
+from entities.task.bulk_job_status import BulkJobStatus
+from service.crud.model_service import get_model_by_name, prepare_task, make_prediction, \
+    make_deduplicated_batch_prediction, add_batch_tasks
+from service.crud.bulk_job_service import run_bulk_job, fail_bulk_job
+from service.crud.user_service import charge_task, release_hold
+from service.inference.memory_stats import record_memory_stats
+from service.inference.prediction_batcher import get_prediction_batcher
+from service.inference.worker_boot import (
+    preload_active_models,
+    take_preloaded_models,
+    freeze_preloaded_objects,
+    warm_up,
+    mark_worker_ready,
+    mark_child_ready,
+    mark_worker_ready_after_children,
+    clear_worker_ready
+)
 
 celery = Celery(__name__)
 celery.conf.broker_url = os.environ.get("CELERY_BROKER_URL")
 celery.conf.result_backend = os.environ.get("CELERY_RESULT_BACKEND")
+celery.conf.worker_proc_alive_timeout = get_inference_settings().WORKER_PROC_ALIVE_TIMEOUT
 logger = logging.getLogger("celery")
 
 
+@setup_celery_logging.connect
+def configure_logging(**kwargs):
+    # Connecting this signal keeps Celery from replacing the root logger's handlers with its own. The worker
+    # logs through the queue to the JSON file and console handlers of LOGGING_CONFIG only, so Celery's
+    # --logfile and --logformat options have no effect.
+    setup_logging()
+
+
+_parent_pid = None
+
+
+@worker_init.connect
+def remember_parent_pid(**kwargs):
+    global _parent_pid
+    _parent_pid = os.getpid()
+
+
+def process_label() -> str:
+    # Solo and thread pools run tasks in the parent itself, prefork children have their own pid.
+    return "parent" if os.getpid() == _parent_pid else "child"
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    port = get_inference_settings().WORKER_METRICS_PORT
+    if not port:
+        return
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Prefork children write their metrics to PROMETHEUS_MULTIPROC_DIR, the parent serves the aggregate.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    logger.info("Worker metrics server started on port %s", port)
+
+
+# Number of prefork children that warm up the preloaded models, the worker is only ready once all of them did.
+_pool_children = 0
+
+
+@worker_init.connect
+def preload_models(sender=None, **kwargs):
+    settings = get_inference_settings()
+    clear_worker_ready(settings.WORKER_READY_FILE)
+    if not settings.WORKER_PRELOAD_MODELS:
+        return
+
+    with session_scope() as session:
+        preload_active_models(session)
+    # Prefork children are warmed up in worker_process_init: a child only gets tasks once that handler returns.
+    # They inherit the weights loaded here, which stay shared as long as nothing writes to their pages.
+    if issubclass(concurrency.get_implementation(sender.pool_cls), PreforkTaskPool):
+        global _pool_children
+        _pool_children = sender.concurrency
+        freeze_preloaded_objects()
+    else:
+        warm_up(take_preloaded_models(), settings.WORKER_WARMUP_LENGTHS)
+    record_memory_stats("parent")
+
+
+@worker_process_init.connect
+def warm_up_child(**kwargs):
+    # Pooled connections opened by the parent must not be shared with the forked child.
+    get_engine().dispose(close=False)
+    settings = get_inference_settings()
+    if settings.WORKER_PRELOAD_MODELS:
+        warm_up(take_preloaded_models(), settings.WORKER_WARMUP_LENGTHS)
+    mark_child_ready(settings.WORKER_READY_FILE)
+    record_memory_stats("child")
+
+
+_tasks_done = 0
+
+
+@task_postrun.connect
+def report_memory(**kwargs):
+    global _tasks_done
+    _tasks_done += 1
+    if _tasks_done % get_inference_settings().WORKER_MEMORY_STATS_EVERY_N_TASKS == 0:
+        record_memory_stats(process_label())
+
+
+@worker_ready.connect
+def signal_ready(**kwargs):
+    # worker_ready fires once the consumer starts, prefork children may still be warming up by then.
+    if _pool_children:
+        mark_worker_ready_after_children(get_inference_settings().WORKER_READY_FILE, _pool_children)
+    else:
+        mark_worker_ready(get_inference_settings().WORKER_READY_FILE)
+
+
+@worker_shutdown.connect
+def signal_shutdown(**kwargs):
+    clear_worker_ready(get_inference_settings().WORKER_READY_FILE)
+
+
 @celery.task(queue='prediction')
 def perform_prediction(prediction_request: dict, task_id: uuid, model_name: str) -> dict:
-    logger.info(f"Starting prediction task_id {task_id}")
+    logger.info("Starting prediction task_id %s", task_id)
+    request = PredictionRequest(**prediction_request)
 
-    model = get_model_by_name(model_name, next(get_session()))
+    # Every session below is closed before the model runs, so the worker holds no connection during inference.
+    with session_scope() as session:
+        model = get_model_by_name(model_name, session)
 
     try:
-        result = make_prediction(model, InferenceInput(prediction_request['inference_input']))
-        prepare_and_save_task(PredictionRequest(**prediction_request), result, True, model.prediction_cost, task_id,
-                              next(get_session()))
-        withdraw_balance(prediction_request['user_id'], model.prediction_cost, next(get_session()))
-        logger.info(f"Succeeded prediction task_id {task_id}")
+        if get_inference_settings().PREDICTION_BATCHING_ENABLED:
+            result = get_prediction_batcher().predict(model, request.inference_input)
+        else:
+            result = make_prediction(model, InferenceInput(request.inference_input))
+        # The task row and the settlement of the hold reserved by the API are committed together
+        # by charge_task.
+        with session_scope() as session:
+            prepare_task(request, result, True, model.prediction_cost, task_id, session)
+            charge_task(request.user_id, model.prediction_cost, task_id, session)
+        logger.info("Succeeded prediction task_id %s", task_id)
 
         return "Prediction succeeded"
 
     except Exception as exc:
         error_mes = f"Error during model prediction {exc}"
-        logger.info(f"Error during model prediction, task_id {task_id}, {exc}, saving failed task")
-        prepare_and_save_task(PredictionRequest(**prediction_request), error_mes, False, 0, task_id,
-                              next(get_session()))
+        logger.info("Error during model prediction, task_id %s, %s, saving failed task", task_id, exc)
+        with session_scope() as session:
+            prepare_task(request, error_mes, False, 0, task_id, session)
+            release_hold(task_id, session)
+            session.commit()
+
+        raise ModelException(error_mes, 500)
+
+
+@celery.task(queue='prediction')
+def perform_batch_prediction(batch_request: dict, batch_id: uuid, model_name: str) -> dict:
+    request = BatchPredictionRequest(**batch_request)
+    logger.info("Starting batch prediction batch_id %s, size %s", batch_id, len(request.inference_inputs))
 
+    with session_scope() as session:
+        model = get_model_by_name(model_name, session)
+
+    try:
+        results = make_deduplicated_batch_prediction(model, request.inference_inputs)
+        # The rows and the single charge for the whole batch are committed together by charge_task.
+        with session_scope() as session:
+            add_batch_tasks(request, results, True, model.prediction_cost, batch_id, session)
+            charge_task(request.user_id, model.prediction_cost * len(results), batch_id, session)
+        logger.info("Succeeded batch prediction batch_id %s", batch_id)
+
+        return "Batch prediction succeeded"
+
+    except Exception as exc:
+        error_mes = f"Error during model prediction {exc}"
+        logger.info("Error during batch prediction, batch_id %s, %s, saving failed tasks", batch_id, exc)
+        with session_scope() as session:
+            add_batch_tasks(request, [error_mes] * len(request.inference_inputs), False, 0, batch_id, session)
+            release_hold(batch_id, session)
+            session.commit()
         raise ModelException(error_mes, 500)
+
+
+# acks_late with reject_on_worker_lost: a job whose worker dies is redelivered and continues from its checkpoint.
+@celery.task(queue='prediction', acks_late=True, reject_on_worker_lost=True)
+def perform_bulk_job(job_id: uuid) -> str:
+    logger.info("Starting bulk job %s", job_id)
+    settings = get_inference_settings()
+
+    with session_scope() as session:
+        try:
+            job = run_bulk_job(uuid.UUID(str(job_id)), session, settings.BULK_JOB_BATCH_SIZE,
+                               settings.BULK_JOB_BATCHES_PER_TASK)
+        except Exception as exc:
+            error_mes = f"Error during bulk job {exc}"
+            logger.info("Error during bulk job %s, %s, marking job failed", job_id, exc)
+            fail_bulk_job(uuid.UUID(str(job_id)), error_mes, session)
+            raise ModelException(error_mes, 500)
+
+        if job is None:
+            return "Bulk job skipped"
+        if job.status == BulkJobStatus.RUNNING:
+            # Long jobs are split into several tasks, so prediction tasks queued meanwhile are not starved.
+            perform_bulk_job.apply_async(args=[job_id], queue="prediction")
+            return "Bulk job continues"
+        return f"Bulk job {job.status.value}"
@@ -9,6 +9,12 @@ class AuthSettings(BaseSettings):
     SECRET_KEY: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_MINUTES: Optional[int] = None
     COOKIE_NAME: Optional[str] = None
+    # bcrypt work factor of new hashes. Hashes with another factor are replaced on the user's next login.
+    BCRYPT_ROUNDS: int = 12
+    # Password hashing runs on its own threads, off the event loop. At most PASSWORD_HASH_MAX_WORKERS hashes
+    # run at once and PASSWORD_HASH_MAX_QUEUED more may wait; logins and signups beyond that get a 503.
+    PASSWORD_HASH_MAX_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUED: int = 64
     model_config = SettingsConfigDict(env_file=".env", extra='ignore')
 
 
@@ -0,0 +1,14 @@
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class BillingSettings(BaseSettings):
+    # Holds reserved at submit time are given back when their task has not settled them after this long.
+    BALANCE_HOLD_TTL_S: int = 3600
+    model_config = SettingsConfigDict(env_file=".env", extra='ignore')
+
+
+@lru_cache
+def get_billing_settings() -> BillingSettings:
+    return BillingSettings()
@@ -1 +1,21 @@
-DEFAULT_MODEL_NAME = 'multisent'
\ No newline at end of file
+DEFAULT_MODEL_NAME = 'multisent'
+DEFAULT_MODEL_REPO = 'tabularisai/multilingual-sentiment-analysis'
+
+TORCH_ENGINE = 'torch'
+ONNX_ENGINE = 'onnx'
+
+FP32_PRECISION = 'fp32'
+INT8_PRECISION = 'int8'
+BF16_PRECISION = 'bf16'
+
+TRUNCATE_MODE = 'truncate'
+SLIDING_WINDOW_MODE = 'sliding_window'
+
+MEAN_AGGREGATION = 'mean'
+LENGTH_WEIGHTED_AGGREGATION = 'length_weighted'
+
+CSV_FORMAT = 'csv'
+JSONL_FORMAT = 'jsonl'
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
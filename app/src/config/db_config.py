@@ -10,6 +10,9 @@ class Settings(BaseSettings):
     DB_USER: Optional[str] = None
     DB_PASS: Optional[str] = None
     DB_NAME: Optional[str] = None
+    # Connections of the API's asyncpg pool, each one serves a request while it awaits the database.
+    DB_ASYNC_POOL_SIZE: int = 10
+    DB_ASYNC_MAX_OVERFLOW: int = 20
 
     @property
     def DATABASE_URL_asyncpg(self) -> str:
@@ -0,0 +1,85 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class InferenceSettings(BaseSettings):
+    # Micro-batching of perform_prediction tasks. Only effective when several tasks run
+    # concurrently inside one worker process, e.g. `celery worker --pool threads --concurrency 32`.
+    PREDICTION_BATCHING_ENABLED: bool = False
+    PREDICTION_BATCH_MAX_SIZE: int = 32
+    PREDICTION_BATCH_MAX_WAIT_MS: int = 10
+
+    # Length-bucketed forward passes in ClassificationModel.predict: inputs are grouped by token
+    # length into buckets with these upper bounds, and each bucket is padded only to its own longest input.
+    INFERENCE_BUCKET_BOUNDARIES: List[int] = [16, 32, 64, 128, 256, 512]
+    INFERENCE_MAX_BATCH_SIZE: int = 32
+
+    # Texts longer than 512 tokens are either truncated ('truncate') or split into overlapping windows
+    # ('sliding_window') whose probabilities are averaged ('mean') or weighted by window length ('length_weighted').
+    INFERENCE_LONG_TEXT_MODE: str = 'truncate'
+    INFERENCE_WINDOW_STRIDE: int = 128
+    INFERENCE_WINDOW_AGGREGATION: str = 'mean'
+
+    # ONNX Runtime engine (ClassificationModel.engine == 'onnx'). 0 threads keeps the runtime default.
+    ONNX_INTRA_OP_THREADS: int = 0
+    ONNX_PARITY_ATOL: float = 1e-3
+
+    # Reduced-precision variants (ClassificationModel.precision == 'int8' or 'bf16') are refused when their
+    # labels on the built-in validation set agree with fp32 less often than this.
+    PRECISION_MIN_LABEL_AGREEMENT: float = 0.95
+
+    # Prediction result cache: an in-process LRU per worker, plus an optional SQLite file shared by
+    # all workers of a host when PREDICTION_CACHE_DISK_PATH is set.
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_MEMORY_MAX_SIZE: int = 10_000
+    PREDICTION_CACHE_DISK_PATH: Optional[str] = None
+    PREDICTION_CACHE_DISK_MAX_SIZE: int = 1_000_000
+
+    # Worker boot: active models are loaded before the worker consumes tasks and warmed up with forward passes
+    # of roughly these token lengths. The ready file is created once the worker is consuming.
+    WORKER_PRELOAD_MODELS: bool = True
+    WORKER_WARMUP_LENGTHS: List[int] = [16, 128, 512]
+    WORKER_PROC_ALIVE_TIMEOUT: float = 120.0
+    WORKER_READY_FILE: str = '/tmp/celery_worker_ready'
+    # Every that many tasks a worker process reports its RSS/PSS/USS.
+    WORKER_MEMORY_STATS_EVERY_N_TASKS: int = 100
+
+    # Model registry: at most that many (name, precision) models stay loaded per process, and no more than
+    # MODEL_REGISTRY_MAX_BYTES of weights when it is set. The least recently used model is evicted first.
+    MODEL_REGISTRY_MAX_MODELS: int = 4
+    MODEL_REGISTRY_MAX_BYTES: Optional[int] = None
+
+    # Opt-in /prediction/predict_sync: inputs of at most SYNC_PREDICTION_MAX_INPUT_CHARS characters run on a
+    # thread pool inside the API process, which then loads the models itself. Requests beyond
+    # SYNC_PREDICTION_MAX_WORKERS + SYNC_PREDICTION_MAX_QUEUED in flight go through Celery instead.
+    SYNC_PREDICTION_ENABLED: bool = False
+    SYNC_PREDICTION_MAX_WORKERS: int = 2
+    SYNC_PREDICTION_MAX_QUEUED: int = 4
+    SYNC_PREDICTION_MAX_INPUT_CHARS: int = 1000
+
+    # Largest number of texts accepted by one /prediction/predict_batch request.
+    BATCH_PREDICTION_MAX_TEXTS: int = 1000
+
+    # Bulk file jobs: uploads are stored under BULK_JOB_DIR (<app>/bulk_jobs when not set), which the API and the
+    # workers must share. A worker task scores up to BULK_JOB_BATCHES_PER_TASK batches of BULK_JOB_BATCH_SIZE rows,
+    # committing a checkpoint after each batch, and then re-queues the job.
+    BULK_JOB_DIR: Optional[str] = None
+    BULK_JOB_TEXT_FIELD: str = 'text'
+    BULK_JOB_BATCH_SIZE: int = 256
+    BULK_JOB_BATCHES_PER_TASK: int = 20
+    BULK_JOB_RESULT_PAGE_SIZE: int = 1000
+    BULK_JOB_RESULT_POLL_INTERVAL_S: float = 1.0
+    # A results download of a job that is neither finished nor updated for this long ends instead of waiting on.
+    BULK_JOB_RESULT_STALL_TIMEOUT_S: float = 300.0
+
+    # Port of the Prometheus endpoint started by each Celery worker, disabled when not set.
+    WORKER_METRICS_PORT: Optional[int] = None
+
+    model_config = SettingsConfigDict(env_file=".env", extra='ignore')
+
+
+@lru_cache
+def get_inference_settings() -> InferenceSettings:
+    return InferenceSettings()
@@ -1,57 +1,182 @@
+import atexit
+import copy
+import json
+import logging
 import logging.config
-
 import os
-import logging.config
+import random
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
 if os.getenv('TESTING'):
     log_file = 'tests.log'
 else:
     log_file = '/app/logs/app.log'
 
+# Set by the access middleware for the duration of a request, every record logged meanwhile carries it.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class LoggingSettings(BaseSettings):
+    LOG_LEVEL: str = 'INFO'
+    # Share of the records below WARNING that are kept, per logger name prefix; the longest prefix wins.
+    # Records of hot paths that are logged on every request are sampled, warnings and errors never are.
+    LOG_SAMPLING: Dict[str, float] = {'service.auth': 0.01}
+    model_config = SettingsConfigDict(env_file=".env", extra='ignore')
+
+
+@lru_cache
+def get_logging_settings() -> LoggingSettings:
+    return LoggingSettings()
+
+
+class RequestIdFilter(logging.Filter):
+    """Copies the request id onto the record while still in the thread and context that logged it."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._rate_by_logger = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+    def _rate(self, name: str) -> float:
+        rate = self._rate_by_logger.get(name)
+        if rate is None:
+            prefixes = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + ".")]
+            rate = self.rates[max(prefixes, key=len)] if prefixes else 1.0
+            self._rate_by_logger[name] = rate
+        return rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TracebackQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare folds the traceback into the message and drops exc_info. This one merges only the
+    message and arguments and keeps the rendered traceback in exc_text, where JsonFormatter picks it up.
+    """
+
+    _traceback_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
 LOGGING_CONFIG = {
     'version': 1,
     'disable_existing_loggers': False,  # Preserve existing loggers
 
     # Formatters define the log message format
     'formatters': {
-        'standard': {
-            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        'json': {
+            '()': JsonFormatter,
         },
     },
 
-    # Handlers determine where the log messages go.
+    # Handlers determine where the log messages go. Only the listener thread of setup_logging writes to them.
     'handlers': {
         'file': {
             'class': 'logging.FileHandler',
             'filename': log_file,       # Log file location
             'mode': 'a',                 # Append mode
-            'formatter': 'standard',
+            'formatter': 'json',
         },
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'standard',
+            'formatter': 'json',
         },
     },
 
     # The root logger configuration applies to all loggers that don't have a specific configuration.
     'root': {
         'handlers': ['file', 'console'],
-        'level': 'DEBUG',                 # Set minimum log level
+        'level': get_logging_settings().LOG_LEVEL,
     },
 
-    # Optionally, define loggers for specific parts of your app.
     'loggers': {
         'celery': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'app': {
-            'handlers': ['file', 'console'],
             'level': 'INFO',
-            'propagate': False,
         },
     },
 }
 
-logging.config.dictConfig(LOGGING_CONFIG)
-logger = logging.getLogger(__name__)
+_queue_handler: Optional[TracebackQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def setup_logging() -> None:
+    """
+    Applies LOGGING_CONFIG, then moves the root logger's handlers behind a queue: loggers only enqueue the
+    record and a listener thread formats and writes it, so neither the event loop nor a worker blocks on
+    disk or the console. Sampling and the request id are applied before enqueueing. Safe to call repeatedly.
+    """
+    global _queue_handler
+    with _lock:
+        if _queue_handler is not None:
+            return
+        logging.config.dictConfig(LOGGING_CONFIG)
+        root = logging.getLogger()
+        sinks = list(root.handlers)
+        _queue_handler = TracebackQueueHandler(SimpleQueue())
+        _queue_handler.addFilter(SamplingFilter(get_logging_settings().LOG_SAMPLING))
+        _queue_handler.addFilter(RequestIdFilter())
+        root.handlers = [_queue_handler]
+        _start_listener(sinks)
+        atexit.register(_stop_listener)
+        # A forked worker process inherits the queue handler but not the listener thread, it starts its own.
+        os.register_at_fork(after_in_child=lambda: _start_listener(sinks))
+
+
+def _start_listener(sinks) -> None:
+    global _listener
+    _queue_handler.queue = SimpleQueue()
+    _listener = QueueListener(_queue_handler.queue, *sinks, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+setup_logging()
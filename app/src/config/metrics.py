@@ -1,6 +1,6 @@
 import time
 
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Histogram, Gauge
 
 PREDICT_REQUEST_COUNT = Counter(
     "predict_request_count", "Total number of predict endpoint requests"
@@ -17,6 +17,84 @@ FAILED_PREDICTION_REQUEST_COUNT = Counter(
     "failed_prediction_request_count", "Total number of unsuccessful prediction requests"
 )
 
+SYNC_PREDICTION_REQUESTS = Counter(
+    "sync_prediction_requests", "predict_sync requests by how they were served (sync or celery)", ["mode"]
+)
+
+BULK_JOB_ROWS = Counter(
+    "bulk_job_rows", "Rows of bulk job input files, predicted or skipped as invalid", ["result"]
+)
+
+PREDICTION_BATCH_SIZE = Histogram(
+    "prediction_batch_size", "Number of texts processed in one batched forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+PREDICTION_BATCH_WAIT_LATENCY = Histogram(
+    "prediction_batch_wait_seconds", "Time (in seconds) a prediction waited in the batcher queue"
+)
+
+INFERENCE_PADDING_EFFICIENCY = Histogram(
+    "inference_padding_efficiency", "Share of real (non-padding) tokens in the tensors of one predict call",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+)
+
+INFERENCE_TOKENS = Counter(
+    "inference_tokens", "Tokens fed to the model, split into real and padding tokens", ["kind"]
+)
+
+PREDICTION_CACHE_REQUESTS = Counter(
+    "prediction_cache_requests", "Prediction cache lookups by tier and result", ["tier", "result"]
+)
+
+PREDICTION_CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions", "Entries evicted from the prediction cache by tier", ["tier"]
+)
+
+USER_CACHE_REQUESTS = Counter(
+    "user_cache_requests", "User cache lookups by result: hit, miss or expired", ["result"]
+)
+
+USER_CACHE_INVALIDATIONS = Counter(
+    "user_cache_invalidations", "Users dropped from the user cache, by where the change happened", ["source"]
+)
+
+USER_CACHE_HIT_AGE = Histogram(
+    "user_cache_hit_age_seconds", "Age of the cached user served on a hit, i.e. how stale it can be",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+)
+
+PASSWORD_HASH_QUEUE_LATENCY = Histogram(
+    "password_hash_queue_seconds", "Time (in seconds) a password hash or check waited for a hashing thread",
+    ["operation"]
+)
+
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_seconds", "Time (in seconds) spent computing a password hash or check", ["operation"]
+)
+
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected", "Password hashes or checks refused because the hashing queue was full", ["operation"]
+)
+
+WORKER_PROCESS_MEMORY = Gauge(
+    "worker_process_memory_bytes", "RSS, PSS and USS of a worker process in bytes", ["kind"],
+    multiprocess_mode="liveall"
+)
+
+MODEL_REGISTRY_RESIDENT_MODELS = Gauge(
+    "model_registry_resident_models", "Models currently loaded in the model registry", multiprocess_mode="liveall"
+)
+
+MODEL_REGISTRY_RESIDENT_BYTES = Gauge(
+    "model_registry_resident_bytes", "Size of the weights of the models loaded in the model registry",
+    multiprocess_mode="liveall"
+)
+
+MODEL_REGISTRY_EVICTIONS = Counter(
+    "model_registry_evictions", "Models evicted from the model registry"
+)
+
 
 def record_duration(metric, start_time):
     duration = time.time() - start_time
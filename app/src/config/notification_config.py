@@ -0,0 +1,21 @@
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class NotificationSettings(BaseSettings):
+    # Workers NOTIFY this Postgres channel when prediction results are saved; the API LISTENs on one connection.
+    RESULT_NOTIFY_CHANNEL: str = 'prediction_results'
+    RESULT_LISTENER_ENABLED: bool = True
+    # Longest wait accepted by the long-poll variant of /prediction/prediction_result.
+    RESULT_LONG_POLL_MAX_WAIT_S: float = 30.0
+    # Database re-check interval of long polls when no listener is running (e.g. on SQLite).
+    RESULT_LONG_POLL_FALLBACK_INTERVAL_S: float = 0.5
+    RESULT_STREAM_KEEPALIVE_S: float = 15.0
+    RESULT_STREAM_QUEUE_SIZE: int = 1000
+    model_config = SettingsConfigDict(env_file=".env", extra='ignore')
+
+
+@lru_cache
+def get_notification_settings() -> NotificationSettings:
+    return NotificationSettings()
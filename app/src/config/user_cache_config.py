@@ -0,0 +1,19 @@
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class UserCacheSettings(BaseSettings):
+    # Per-process cache of the users resolved from access tokens, so most requests don't read the users table.
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = 10_000
+    # Upper bound on how stale a cached user can be when an invalidation is missed, e.g. without a listener.
+    USER_CACHE_TTL_S: float = 30.0
+    # Balance and account changes NOTIFY this Postgres channel, every API process drops the user on it.
+    USER_INVALIDATION_CHANNEL: str = 'user_invalidations'
+    model_config = SettingsConfigDict(env_file=".env", extra='ignore')
+
+
+@lru_cache
+def get_user_cache_settings() -> UserCacheSettings:
+    return UserCacheSettings()
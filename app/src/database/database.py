@@ -1,5 +1,10 @@
+from contextlib import contextmanager, asynccontextmanager
 from functools import lru_cache
+from typing import Iterator, AsyncIterator
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config.db_config import get_settings
 
 
@@ -22,3 +27,52 @@ def get_session():
     engine = get_engine()
     with Session(engine) as session:
         yield session
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    One session for one unit of work outside of a request, e.g. a worker task. Uncommitted changes are
+    rolled back on error and the session is always closed, so its connection goes back to the pool on exit.
+    """
+    with Session(get_engine()) as session:
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+
+
+def create_async_db_engine() -> AsyncEngine:
+    settings = get_settings()
+    return create_async_engine(
+        url=settings.DATABASE_URL_asyncpg,
+        echo=False,
+        pool_size=settings.DB_ASYNC_POOL_SIZE,
+        max_overflow=settings.DB_ASYNC_MAX_OVERFLOW
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    return create_async_db_engine()
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Request scoped session of the API. Objects are not expired on commit: an expired attribute would need
+    a lazy load, which an AsyncSession can't do implicitly.
+    """
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    """Async counterpart of session_scope, for code that runs on the event loop outside of a route."""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
@@ -1,3 +1,6 @@
+import logging
+
+from sqlalchemy import Engine, inspect
 from sqlmodel import SQLModel, Session
 
 from database.database import get_engine
@@ -11,6 +14,8 @@ from service.auth.auth_service import get_password_hash
 from service.crud.model_service import create_and_save_default_model
 from service.crud.user_service import get_user_by_email, create_user
 
+logger = logging.getLogger(__name__)
+
 
 def create_admin_user(session: Session) -> None:
     admin_email = "admin@example.com"
@@ -44,9 +49,33 @@ def create_default_model(session: Session):
     session.refresh(model)
 
 
+def create_missing_indexes(engine: Engine) -> None:
+    """
+    Creates the indexes declared on the entities that an existing database doesn't have yet. create_all
+    only creates indexes together with a new table, so indexes added to a table later are created here.
+    init_db recreates every table and doesn't need it; run it against a database that is kept between
+    deployments with `python -m database.tables_initiator` from app/src.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    logger.info("Creating index %s on %s", index.name, table.name)
+                    index.create(connection)
+
+
 def init_db():
     SQLModel.metadata.drop_all(get_engine())
     SQLModel.metadata.create_all(get_engine())
     with Session(get_engine()) as session:
         create_admin_user(session)
         create_default_model(session)
+
+
+if __name__ == "__main__":
+    # Bootstraps the indexes of an existing database, see create_missing_indexes.
+    create_missing_indexes(get_engine())
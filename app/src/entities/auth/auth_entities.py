@@ -10,6 +10,7 @@ from starlette import status
 from starlette.requests import Request
 
 from config.auth_config import get_auth_settings
+from entities.user.user import User
 
 
 class Token(BaseModel):
@@ -22,6 +23,12 @@ class TokenData(BaseModel):
     username: str | None = None
 
 
+class AuthContext(BaseModel):
+    """The verified token and active user of a request, resolved once and kept on request.state.auth."""
+    token_data: TokenData
+    user: User
+
+
 class OAuth2PasswordBearerWithCookie(OAuth2):
     """
     This class is taken directly from FastAPI:
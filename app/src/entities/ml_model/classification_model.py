@@ -1,45 +1,46 @@
-from typing import Optional
+from typing import Optional, Any
 
-import torch
 from pydantic import PrivateAttr
 
+from config.constants import TORCH_ENGINE, FP32_PRECISION
 from entities.ml_model.inference_input import InferenceInput
 from entities.ml_model.ml_model import MLModel
 from sqlmodel import Field
 
+SENTIMENT_MAP = {
+    0: "Very Negative",
+    1: "Negative",
+    2: "Neutral",
+    3: "Positive",
+    4: "Very Positive"
+}
+
 
 class ClassificationModel(MLModel, table=True):
     __tablename__ = "ml_models"
 
     model_type: str = Field(default="classification", const=True)
-    _model: Optional[torch.nn.Module] = PrivateAttr(default=None)
-    _tokenizer: Optional[object] = PrivateAttr(default=None)
-
-    def set_resources(self, model: torch.nn.Module, tokenizer: object):
-        self._model = model
-        self._tokenizer = tokenizer
+    version: str = Field(default="1")
+    is_active: bool = Field(default=True)
+    engine: str = Field(default=TORCH_ENGINE)
+    precision: str = Field(default=FP32_PRECISION)
+    # Local directory with the model files, absolute or relative to the loader's cache dir (<name> when not set),
+    # and the Hugging Face repo it is downloaded from when that directory does not exist yet.
+    artifact_path: Optional[str] = Field(default=None)
+    source_repo: Optional[str] = Field(default=None)
+    # Set by the service layer once the weights are loaded, so processes that only read model metadata
+    # never load torch. Anything with a predict(texts) -> labels method will do.
+    _classifier: Optional[Any] = PrivateAttr(default=None)
+
+    def set_resources(self, classifier: Any):
+        self._classifier = classifier
         print("Resources have been set manually.")
 
     def predict(self, data_input: InferenceInput):
         texts = data_input.data
-        if self._model is None or self._tokenizer is None:
+        if self._classifier is None:
             raise ValueError("Model and tokenizer have not been loaded. "
                              "Call load_huggingface_resources() first.")
-
-        inputs = self._tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=512)
-        with torch.no_grad():
-            outputs = self._model(**inputs)
-        probabilities = torch.nn.functional.softmax(outputs.logits, dim=-1)
-        sentiment_map = {
-            0: "Very Negative",
-            1: "Negative",
-            2: "Neutral",
-            3: "Positive",
-            4: "Very Positive"
-        }
-        predictions = torch.argmax(probabilities, dim=-1).tolist()
-        return [sentiment_map[p] for p in predictions]
-
-
-
-
+        if isinstance(texts, str):
+            texts = [texts]
+        return self._classifier.predict(texts)
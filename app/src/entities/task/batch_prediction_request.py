@@ -0,0 +1,14 @@
+import uuid
+from datetime import datetime
+from typing import List
+
+from sqlmodel import SQLModel
+
+
+class BatchPredictionRequest(SQLModel):
+    user_id: uuid.UUID
+    model_id: uuid.UUID
+    user_email: str
+    inference_inputs: List[str]
+    user_balance_before_task: float
+    request_timestamp: datetime
@@ -0,0 +1,42 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlmodel import SQLModel, Field
+
+from entities.task.bulk_job_status import BulkJobStatus
+
+
+class BulkJob(SQLModel, table=True):
+    __tablename__ = "bulk_jobs"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", index=True)
+    model_id: uuid.UUID = Field(foreign_key="ml_models.id")
+    user_email: str
+    input_path: str
+    input_format: str
+    input_size: int
+    status: BulkJobStatus = Field(default=BulkJobStatus.PENDING)
+    # Checkpoint: byte offset in the input file after the last committed batch, and the number of rows read
+    # up to it. A restarted job continues from here.
+    input_offset: int = Field(default=0)
+    rows_read: int = Field(default=0)
+    rows_predicted: int = Field(default=0)
+    rows_skipped: int = Field(default=0)
+    error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class BulkJobDTO(BaseModel):
+    id: uuid.UUID
+    status: BulkJobStatus
+    rows_read: int
+    rows_predicted: int
+    rows_skipped: int
+    progress: float
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
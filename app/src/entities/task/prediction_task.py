@@ -1,7 +1,9 @@
 import uuid
 from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 from entities.task.prediction_request import PredictionRequest
@@ -9,8 +11,20 @@ from entities.task.prediction_result import PredictionResult
 
 
 class PredictionTask(PredictionRequest, PredictionResult, SQLModel, table=True):
+    # One index per history access pattern: a user's history, the admin history and a model's history
+    # are filtered on their leading column and read in (request_timestamp, id) order straight from the index,
+    # batch and bulk job results in batch_position order.
+    __table_args__ = (
+        Index("ix_predictiontask_user_id_request_timestamp_id", "user_id", "request_timestamp", "id"),
+        Index("ix_predictiontask_request_timestamp_id", "request_timestamp", "id"),
+        Index("ix_predictiontask_model_id_request_timestamp_id", "model_id", "request_timestamp", "id"),
+        Index("ix_predictiontask_batch_id_batch_position", "batch_id", "batch_position"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Set on the rows written by one /prediction/predict_batch or bulk job, batch_position keeps their input order.
+    batch_id: Optional[uuid.UUID] = Field(default=None)
+    batch_position: Optional[int] = Field(default=None)
 
 
 class PredictionDTO(BaseModel):
@@ -23,3 +37,8 @@ class PredictionDTO(BaseModel):
     cost: float
     request_timestamp: datetime
     result_timestamp: datetime
+
+
+class PredictionHistoryPage(BaseModel):
+    items: List[PredictionDTO]
+    next_cursor: Optional[str] = None
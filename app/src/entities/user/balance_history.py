@@ -1,12 +1,25 @@
 from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 import uuid
 
 
 class BalanceHistory(SQLModel, table=True):
+    # A user's balance history is read in (timestamp, id) order.
+    __table_args__ = (
+        Index("ix_balancehistory_user_id_timestamp_id", "user_id", "timestamp", "id"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id")
     amount_before_change: float
     amount_change: float
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class BalanceHistoryPage(BaseModel):
+    items: List[BalanceHistory]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+import uuid
+
+
+class BalanceHold(SQLModel, table=True):
+    """Amount already taken off the user's balance for a submitted task, until the task settles or releases it."""
+    __tablename__ = "balance_holds"
+
+    # The id of the prediction task or batch the hold was reserved for.
+    id: uuid.UUID = Field(primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", index=True)
+    amount: float
+    balance_before: float
+    created_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from typing import Annotated, BinaryIO
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+from celery_worker import perform_bulk_job
+from config.constants import DEFAULT_MODEL_NAME, CSV_FORMAT
+from config.inference_config import get_inference_settings
+from database.database import get_session, get_async_session
+from entities.auth.auth_entities import AuthContext
+from entities.task.bulk_job import BulkJob, BulkJobDTO
+from entities.task.bulk_job_status import BulkJobStatus
+from entities.user.user import User
+from service.auth.auth_service import get_auth_context
+from service.crud import bulk_job_service
+from service.crud.async_bulk_job_service import create_bulk_job, get_bulk_job_by_id, reset_bulk_job, fail_bulk_job
+from service.crud.async_model_service import get_model_metadata_by_name
+from service.crud.bulk_job_service import get_bulk_job_dir, bulk_job_to_dto, get_bulk_job_results_page
+from service.inference.bulk_input import input_format_from_filename
+
+bulk_job_router = APIRouter(prefix="/prediction/bulk_jobs", tags=["Prediction"])
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def get_user_job(job_id: uuid.UUID, user: User, session: AsyncSession) -> BulkJob:
+    job = await get_bulk_job_by_id(job_id, session)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    return job
+
+
+async def dispatch_bulk_job(job: BulkJob, session: AsyncSession) -> None:
+    """Marks the job failed when it can't be queued, so it is not left pending with nobody to run it."""
+    try:
+        perform_bulk_job.apply_async(args=[job.id], queue="prediction")
+        logger.info("Celery bulk job dispatched, job_id: %s", job.id)
+    except Exception as exc:
+        logger.error("Failed to dispatch Celery bulk job, error: %s", exc)
+        await fail_bulk_job(job, f"Dispatch failed: {exc}", session)
+        raise HTTPException(status_code=500, detail=f"Task error: {exc}")
+
+
+def store_upload(source: BinaryIO, path: str) -> None:
+    with open(path, "wb") as out:
+        shutil.copyfileobj(source, out, UPLOAD_CHUNK_SIZE)
+
+
+@bulk_job_router.post("", response_model=BulkJobDTO)
+async def create_bulk_prediction_job(
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        file: UploadFile = File(...),
+        model_name: str = Form(None),
+):
+    """
+    Stores an uploaded CSV (with a header containing the text column) or JSONL file and scores it in the
+    background. The file is copied to the shared job directory in chunks and never read into memory.
+    """
+    input_format = input_format_from_filename(file.filename or "")
+    if input_format is None:
+        raise HTTPException(status_code=400, detail="Only .csv and .jsonl files are supported")
+
+    model = await get_model_metadata_by_name(model_name, session) if model_name else None
+    if not model:
+        model = await get_model_metadata_by_name(DEFAULT_MODEL_NAME, session)
+
+    user = auth.user
+    if user.balance < model.prediction_cost:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient balance. Required: {model.prediction_cost}, Available: {user.balance}"
+        )
+
+    job_id = uuid.uuid4()
+    input_path = os.path.join(get_bulk_job_dir(), f"{job_id}.{input_format}")
+    # The copy runs in the thread pool: writing a multi-GB file on the event loop would stall every request.
+    await run_in_threadpool(store_upload, file.file, input_path)
+    logger.info("Bulk job input stored, job_id: %s, user_id: %s, path: %s", job_id, user.id, input_path)
+
+    job = await create_bulk_job(BulkJob(
+        id=job_id,
+        user_id=user.id,
+        model_id=model.id,
+        user_email=user.email,
+        input_path=input_path,
+        input_format=input_format,
+        input_size=os.path.getsize(input_path)
+    ), session)
+    await dispatch_bulk_job(job, session)
+
+    return bulk_job_to_dto(job)
+
+
+@bulk_job_router.get("/{job_id}", response_model=BulkJobDTO)
+async def get_bulk_prediction_job(
+        job_id: uuid.UUID,
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session)
+):
+    return bulk_job_to_dto(await get_user_job(job_id, auth.user, session))
+
+
+@bulk_job_router.post("/{job_id}/resume", response_model=BulkJobDTO)
+async def resume_bulk_prediction_job(
+        job_id: uuid.UUID,
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Continues a failed or interrupted job from its checkpoint. A running job is only taken over once it made
+    no progress for BULK_JOB_RESULT_STALL_TIMEOUT_S, otherwise two workers would share the same checkpoint.
+    """
+    job = await get_user_job(job_id, auth.user, session)
+    if job.status == BulkJobStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Bulk job is already completed")
+    if job.status == BulkJobStatus.RUNNING and not is_stalled(job):
+        raise HTTPException(status_code=409, detail="Bulk job is still running")
+
+    job = await reset_bulk_job(job, session)
+    await dispatch_bulk_job(job, session)
+    logger.info("Bulk job resumed, job_id: %s, offset: %s", job_id, job.input_offset)
+    return bulk_job_to_dto(job)
+
+
+def is_stalled(job: BulkJob) -> bool:
+    stall_timeout_s = get_inference_settings().BULK_JOB_RESULT_STALL_TIMEOUT_S
+    return (datetime.now() - job.updated_at).total_seconds() > stall_timeout_s
+
+
+def stream_results(job_id: uuid.UUID, input_format: str):
+    """
+    Yields the job's results in input order as they are committed, following a running job until it
+    completes or fails, or makes no progress for BULK_JOB_RESULT_STALL_TIMEOUT_S. Each page is read with
+    its own short-lived session; Starlette iterates a sync generator in its thread pool, so this one uses
+    the sync engine.
+    """
+    settings = get_inference_settings()
+    if input_format == CSV_FORMAT:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["position", "text", "result"])
+        yield buffer.getvalue()
+
+    last_position = -1
+    finished = False
+    while True:
+        with next(get_session()) as session:
+            tasks = get_bulk_job_results_page(job_id, last_position, settings.BULK_JOB_RESULT_PAGE_SIZE, session)
+            job = None if tasks or finished else bulk_job_service.get_bulk_job_by_id(job_id, session)
+        if not tasks and finished:
+            return
+        if job is not None:
+            if job.status in (BulkJobStatus.COMPLETED, BulkJobStatus.FAILED):
+                # The last rows may have been committed together with the status after the page was read.
+                finished = True
+                continue
+            if is_stalled(job):
+                logger.warning("Bulk job %s is %s without progress, ending results download", job_id, job.status)
+                return
+            time.sleep(settings.BULK_JOB_RESULT_POLL_INTERVAL_S)
+            continue
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if input_format == CSV_FORMAT else None
+        for task in tasks:
+            if writer:
+                writer.writerow([task.batch_position, task.inference_input, task.result])
+            else:
+                buffer.write(json.dumps({"position": task.batch_position, "text": task.inference_input,
+                                         "result": task.result}, ensure_ascii=False) + "\n")
+        last_position = tasks[-1].batch_position
+        yield buffer.getvalue()
+
+
+@bulk_job_router.get("/{job_id}/results")
+async def download_bulk_prediction_results(
+        job_id: uuid.UUID,
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session)
+):
+    job = await get_user_job(job_id, auth.user, session)
+    media_type = "text/csv" if job.input_format == CSV_FORMAT else "application/x-ndjson"
+    return StreamingResponse(
+        stream_results(job.id, job.input_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{job.id}-results.{job.input_format}"'}
+    )
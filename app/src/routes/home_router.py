@@ -5,15 +5,13 @@ from pathlib import Path
 from fastapi import APIRouter, Depends
 from jwt import InvalidTokenError
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from sqlmodel import Session
 from starlette.requests import Request
 from starlette.responses import HTMLResponse, RedirectResponse, Response
 from starlette.templating import Jinja2Templates
 
 from config.auth_config import get_auth_settings
-from database.database import get_session
-from entities.auth.auth_entities import TokenData
-from service.auth.auth_service import authenticate_cookie, get_current_active_user
+from entities.auth.auth_entities import AuthContext
+from service.auth.auth_service import authenticate_cookie, get_auth_context
 
 home_router = APIRouter(tags=["Home"])
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,6 +19,11 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 logger = logging.getLogger(__name__)
 
 
+def wants_json(request: Request) -> bool:
+    """Pages that render a template answer with JSON instead when the client asks for it."""
+    return "application/json" in request.headers.get("accept", "")
+
+
 @home_router.get('/', response_class=HTMLResponse)
 async def index(request: Request):
     auth_settings = get_auth_settings()
@@ -53,11 +56,10 @@ async def signup_page(request: Request):
 @home_router.get("/home", response_class=HTMLResponse)
 async def home_page(
         request: Request,
-        token: TokenData = Depends(authenticate_cookie),
-        session: Session = Depends(get_session)
+        auth: AuthContext = Depends(get_auth_context)
 ):
-    logger.info(f"Handling root endpoint {request.state.request_id}")
-    user = await get_current_active_user(token, session)
+    logger.info("Handling root endpoint %s", request.state.request_id)
+    user = auth.user
     return templates.TemplateResponse("home.html", {"request": request, "user": user})
 
 
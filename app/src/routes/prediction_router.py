@@ -1,137 +1,366 @@
+import asyncio
+import json
 import logging
 import time
 import uuid
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi.encoders import jsonable_encoder
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, JSONResponse
+from starlette.responses import HTMLResponse, JSONResponse, StreamingResponse
 
-from celery_worker import perform_prediction
+from celery_worker import perform_prediction, perform_batch_prediction
+from config.constants import DEFAULT_MODEL_NAME, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+from config.inference_config import get_inference_settings
+from config.notification_config import get_notification_settings
 from config.metrics import PREDICT_REQUEST_COUNT, PREDICT_SUCCESS_REQUEST_LATENCY, \
-    FAILED_PREDICTION_REQUEST_COUNT, PREDICT_FAILED_REQUEST_LATENCY, \
+    FAILED_PREDICTION_REQUEST_COUNT, PREDICT_FAILED_REQUEST_LATENCY, SYNC_PREDICTION_REQUESTS, \
     record_duration
-from database.database import get_session
-from entities.auth.auth_entities import TokenData
+from database.database import get_async_session, async_session_scope
+from entities.auth.auth_entities import AuthContext
+from entities.task.batch_prediction_request import BatchPredictionRequest
 from entities.task.prediction_request import PredictionRequest
-from entities.task.prediction_task import PredictionDTO
-from routes.home_router import templates
-from service.auth.auth_service import get_current_active_user, authenticate_cookie
-from service.crud.model_service import (
-    get_model_by_name,
-    get_default_model,
-    validate_input,
+from entities.task.prediction_task import PredictionDTO, PredictionHistoryPage
+from entities.user.user import User
+from routes.home_router import templates, wants_json
+from service.auth.auth_service import get_auth_context
+from service.crud.async_user_service import reserve_balance, release_hold
+from service.crud.model_service import validate_input
+from service.crud.async_model_service import (
+    get_model_metadata_by_name,
     get_prediction_task_by_id,
     get_model_by_id,
-    get_prediction_histories_by_user
+    get_prediction_histories_by_user,
+    get_prediction_tasks_by_batch
 )
-from service.mappers.prediction_mapper import prediction_task_to_dto
+from service.inference.sync_predictor import get_sync_predictor, predict_and_save
+from service.mappers.prediction_mapper import prediction_task_to_dto, prediction_tasks_to_dtos
+from service.notifications.result_listener import get_result_listener
 
 prediction_router = APIRouter(prefix="/prediction", tags=["Prediction"])
 logger = logging.getLogger(__name__)
 
 
-@prediction_router.post("/predict")
-async def create_prediction(
-        token: Annotated[TokenData, Depends(authenticate_cookie)],
-        session: Session = Depends(get_session),
-        inference_input: str = Body(..., embed=True),
-        model_name: str = Body(..., embed=True),
-):
-    start_time = time.time()
+async def prepare_prediction_request(user: User, session: AsyncSession, inference_input: str, model_name: str,
+                                     task_id: uuid.UUID, start_time: float):
+    """Validates the request and reserves the prediction cost on the user's balance under a hold named task_id."""
     PREDICT_REQUEST_COUNT.inc()
-    logger.info(f"Received prediction request, inference_input_length: {len(inference_input)}")
+    logger.info("Received prediction request, inference_input_length: %s", len(inference_input))
 
     if not validate_input(inference_input):
         FAILED_PREDICTION_REQUEST_COUNT.inc()
         record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
-        logger.warning(f"Invalid input length for prediction, inference_input_length: {len(inference_input)}")
+        logger.warning("Invalid input length for prediction, inference_input_length: %s", len(inference_input))
         raise HTTPException(status_code=400, detail="Input len should be > 5")
 
-    model = get_model_by_name(model_name, session) if model_name else get_default_model(session)
+    model = await get_model_metadata_by_name(model_name, session) if model_name else None
     if not model:
-        model = get_default_model(session)
+        model = await get_model_metadata_by_name(DEFAULT_MODEL_NAME, session)
 
-    user = await get_current_active_user(token, session)
-    logger.info(f"User authenticated, user_id: {user.id}")
+    logger.info("User authenticated, user_id: %s", user.id)
 
-    if user.balance < model.prediction_cost:
-        logger.warning(
-            f"Insufficient balance for prediction, user_id: {user.id}, required: {model.prediction_cost}, available: {user.balance}"
-        )
-        FAILED_PREDICTION_REQUEST_COUNT.inc()
-        record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
-        raise HTTPException(
-            status_code=400,
-            detail=f"Insufficient balance. Required: {model.prediction_cost}, Available: {user.balance}"
-        )
+    balance_before_task = user.balance
+    await reserve_prediction_cost(user, model.prediction_cost, task_id, session, start_time)
 
     prediction_request = PredictionRequest(
         user_id=user.id,
         model_id=model.id,
         user_email=user.email,
         inference_input=inference_input,
-        user_balance_before_task=user.balance,
+        user_balance_before_task=balance_before_task,
         request_timestamp=datetime.now()
     )
+    return model, prediction_request
 
-    task_id = uuid.uuid4()
 
+async def reserve_prediction_cost(user: User, cost: float, hold_id: uuid.UUID, session: AsyncSession,
+                                  start_time: float) -> None:
+    available = user.balance
+    try:
+        await reserve_balance(user.id, cost, hold_id, session)
+    except HTTPException as exc:
+        logger.warning(
+            "Insufficient balance for prediction, user_id: %s, required: %s, available: %s", user.id, cost, available
+        )
+        FAILED_PREDICTION_REQUEST_COUNT.inc()
+        record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=f"Insufficient balance. Required: {cost}, Available: {available}"
+        )
+
+
+async def dispatch_prediction(prediction_request: PredictionRequest, task_id: uuid.UUID, model_name: str,
+                              session: AsyncSession, start_time: float) -> None:
     try:
         perform_prediction.apply_async(
-            args=[prediction_request.dict(), task_id, model.name],
+            args=[prediction_request.dict(), task_id, model_name],
             task_id=str(task_id),
             queue="prediction"
         )
-        logger.info(f"Celery task dispatched, task_id: {task_id}, user_id: {user.id}")
+        logger.info("Celery task dispatched, task_id: %s, user_id: %s", task_id, prediction_request.user_id)
     except Exception as exc:
+        await release_hold(task_id, session)
         FAILED_PREDICTION_REQUEST_COUNT.inc()
         record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
-        logger.error(f"Failed to dispatch Celery task, error: {exc}")
+        logger.error("Failed to dispatch Celery task, error: %s", exc)
         raise HTTPException(status_code=500, detail=f"Task error: {exc}")
 
+
+@prediction_router.post("/predict")
+async def create_prediction(
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        inference_input: str = Body(..., embed=True),
+        model_name: str = Body(..., embed=True),
+):
+    start_time = time.time()
+    task_id = uuid.uuid4()
+    model, prediction_request = await prepare_prediction_request(auth.user, session, inference_input, model_name,
+                                                                 task_id, start_time)
+
+    await dispatch_prediction(prediction_request, task_id, model.name, session, start_time)
+
     record_duration(PREDICT_SUCCESS_REQUEST_LATENCY, start_time)
 
     return {"task_id": task_id}
 
 
+@prediction_router.post("/predict_sync")
+async def create_sync_prediction(
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        inference_input: str = Body(..., embed=True),
+        model_name: str = Body(..., embed=True),
+):
+    """
+    Returns the label in the response when sync predictions are enabled, the input is short and the
+    in-process pool has room. Otherwise the request goes through Celery and, like /predict, answers
+    202 with the task_id to poll.
+    """
+    start_time = time.time()
+    task_id = uuid.uuid4()
+    model, prediction_request = await prepare_prediction_request(auth.user, session, inference_input, model_name,
+                                                                 task_id, start_time)
+
+    settings = get_inference_settings()
+    future = None
+    if settings.SYNC_PREDICTION_ENABLED and len(inference_input) <= settings.SYNC_PREDICTION_MAX_INPUT_CHARS:
+        future = get_sync_predictor().try_submit(predict_and_save, prediction_request.dict(), task_id, model.name)
+
+    if future is None:
+        SYNC_PREDICTION_REQUESTS.labels(mode="celery").inc()
+        await dispatch_prediction(prediction_request, task_id, model.name, session, start_time)
+        record_duration(PREDICT_SUCCESS_REQUEST_LATENCY, start_time)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"task_id": str(task_id)})
+
+    SYNC_PREDICTION_REQUESTS.labels(mode="sync").inc()
+    try:
+        result = await asyncio.wrap_future(future)
+    except Exception as exc:
+        FAILED_PREDICTION_REQUEST_COUNT.inc()
+        record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
+        logger.error("Sync prediction failed, task_id: %s, error: %s", task_id, exc)
+        status_code = exc.status_code if isinstance(exc, HTTPException) else 500
+        raise HTTPException(status_code=status_code, detail=f"Prediction error: {exc}")
+
+    record_duration(PREDICT_SUCCESS_REQUEST_LATENCY, start_time)
+    return {"task_id": task_id, "result": result}
+
+
+@prediction_router.post("/predict_batch")
+async def create_batch_prediction(
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        inference_inputs: List[str] = Body(..., embed=True),
+        model_name: str = Body(..., embed=True),
+):
+    """Scores all texts in one Celery task and charges the user once for the whole batch."""
+    start_time = time.time()
+    PREDICT_REQUEST_COUNT.inc()
+    logger.info("Received batch prediction request, size: %s", len(inference_inputs))
+
+    max_texts = get_inference_settings().BATCH_PREDICTION_MAX_TEXTS
+    if not inference_inputs or len(inference_inputs) > max_texts \
+            or not all(validate_input(text) for text in inference_inputs):
+        FAILED_PREDICTION_REQUEST_COUNT.inc()
+        record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
+        logger.warning("Invalid batch prediction input, size: %s", len(inference_inputs))
+        raise HTTPException(status_code=400, detail=f"Batch should have 1 to {max_texts} inputs of len > 5")
+
+    model = await get_model_metadata_by_name(model_name, session) if model_name else None
+    if not model:
+        model = await get_model_metadata_by_name(DEFAULT_MODEL_NAME, session)
+
+    user = auth.user
+    logger.info("User authenticated, user_id: %s", user.id)
+
+    cost = model.prediction_cost * len(inference_inputs)
+    batch_id = uuid.uuid4()
+    balance_before_task = user.balance
+    await reserve_prediction_cost(user, cost, batch_id, session, start_time)
+
+    batch_request = BatchPredictionRequest(
+        user_id=user.id,
+        model_id=model.id,
+        user_email=user.email,
+        inference_inputs=inference_inputs,
+        user_balance_before_task=balance_before_task,
+        request_timestamp=datetime.now()
+    )
+
+    try:
+        perform_batch_prediction.apply_async(
+            args=[batch_request.dict(), batch_id, model.name],
+            task_id=str(batch_id),
+            queue="prediction"
+        )
+        logger.info("Celery batch task dispatched, batch_id: %s, user_id: %s", batch_id, user.id)
+    except Exception as exc:
+        await release_hold(batch_id, session)
+        FAILED_PREDICTION_REQUEST_COUNT.inc()
+        record_duration(PREDICT_FAILED_REQUEST_LATENCY, start_time)
+        logger.error("Failed to dispatch Celery batch task, error: %s", exc)
+        raise HTTPException(status_code=500, detail=f"Task error: {exc}")
+
+    record_duration(PREDICT_SUCCESS_REQUEST_LATENCY, start_time)
+
+    return {"batch_id": batch_id, "size": len(inference_inputs), "cost": cost}
+
+
+@prediction_router.post("/batch_result", response_model=List[PredictionDTO])
+async def get_batch_prediction(
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        batch_id: uuid.UUID = Body(..., embed=True)
+):
+    logger.info("Fetching batch prediction result, batch_id: %s", batch_id)
+    user = auth.user
+    tasks = [task for task in await get_prediction_tasks_by_batch(batch_id, session) if task.user_id == user.id]
+
+    if not tasks:
+        logger.info("Batch prediction is still processing, batch_id: %s", batch_id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"detail": "Batch prediction is still processing. Please try again later."}
+        )
+
+    logger.info("Batch prediction found, batch_id: %s, user_id: %s, size: %s", batch_id, user.id, len(tasks))
+    model = await get_model_by_id(tasks[0].model_id, session)
+    model_name = model.name if model else "unknown"
+    return [prediction_task_to_dto(task, user.email, model_name) for task in tasks]
+
+
 @prediction_router.post("/prediction_result", response_model=PredictionDTO)
 async def get_prediction(
-        token: Annotated[TokenData, Depends(authenticate_cookie)],
-        session: Session = Depends(get_session),
-        task_id: uuid.UUID = Body(..., embed=True)
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        task_id: uuid.UUID = Body(..., embed=True),
+        wait: float = Body(0, embed=True)
 ):
-    logger.info(f"Fetching prediction result, task_id: {task_id}")
-    user = await get_current_active_user(token, session)
-    task = get_prediction_task_by_id(task_id, session)
+    """With `wait` > 0 the request is held for up to that many seconds until the task completes."""
+    logger.info("Fetching prediction result, task_id: %s, wait: %s", task_id, wait)
+    user = auth.user
+    wait = min(max(wait, 0), get_notification_settings().RESULT_LONG_POLL_MAX_WAIT_S)
+    task = await wait_for_prediction_task(task_id, wait, session) if wait else \
+        await get_prediction_task_by_id(task_id, session)
 
     if not task:
-        logger.info(f"Prediction task is still processing, task_id: {task_id}")
+        logger.info("Prediction task is still processing, task_id: %s", task_id)
         return JSONResponse(
             status_code=status.HTTP_202_ACCEPTED,
             content={"detail": "Prediction task is still processing. Please try again later."}
         )
 
-    logger.info(f"Prediction task found, task_id: {task_id}, user_id: {user.id}")
-    model = get_model_by_id(task.model_id, session)
+    logger.info("Prediction task found, task_id: %s, user_id: %s", task_id, user.id)
+    model = await get_model_by_id(task.model_id, session)
     return prediction_task_to_dto(task, user.email, model.name if model else "unknown")
 
 
+async def wait_for_prediction_task(task_id: uuid.UUID, wait: float, session: AsyncSession):
+    """
+    The request's transaction is ended before waiting, so no pooled connection sits idle in a transaction
+    for the whole wait; each later check borrows a connection only for its own query.
+    """
+    task = await get_prediction_task_by_id(task_id, session)
+    if task:
+        return task
+    await session.rollback()
+
+    listener = get_result_listener()
+    if not listener.running:
+        deadline = time.monotonic() + wait
+        interval = get_notification_settings().RESULT_LONG_POLL_FALLBACK_INTERVAL_S
+        while not task and time.monotonic() < deadline:
+            await asyncio.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+            task = await fetch_prediction_task(task_id)
+        return task
+
+    future = listener.register(str(task_id))
+    try:
+        # The task may have completed between the first check and registering for its notification.
+        task = await fetch_prediction_task(task_id)
+        if not task and await listener.wait(future, wait):
+            task = await fetch_prediction_task(task_id)
+        return task
+    finally:
+        listener.unregister(str(task_id), future)
+
+
+async def fetch_prediction_task(task_id: uuid.UUID):
+    async with async_session_scope() as session:
+        return await get_prediction_task_by_id(task_id, session)
+
+
+@prediction_router.get("/stream")
+async def stream_prediction_results(auth: Annotated[AuthContext, Depends(get_auth_context)]):
+    """Server-Sent Events stream of the user's completed predictions and batches."""
+    user = auth.user
+    listener = get_result_listener()
+    if not listener.running:
+        raise HTTPException(status_code=503, detail="Result notifications are not available")
+
+    settings = get_notification_settings()
+    user_id = str(user.id)
+
+    async def events():
+        queue = listener.subscribe(user_id)
+        logger.info("Result stream opened, user_id: %s", user_id)
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), settings.RESULT_STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                event = "batch" if "batch_id" in data else "prediction"
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            listener.unsubscribe(user_id, queue)
+            logger.info("Result stream closed, user_id: %s", user_id)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @prediction_router.get("/history", response_class=HTMLResponse)
 async def show_prediction_history(
         request: Request,
-        token: Annotated[TokenData, Depends(authenticate_cookie)],
-        session: Session = Depends(get_session)
+        auth: Annotated[AuthContext, Depends(get_auth_context)],
+        session: AsyncSession = Depends(get_async_session),
+        cursor: Optional[str] = None,
+        limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE)
 ):
-    user = await get_current_active_user(token, session)
-    logger.info(f"Fetching prediction history for user, user_id: {user.id}")
-    predictions = get_prediction_histories_by_user(user.id, session)
-    logger.info(f"Prediction history fetched, user_id: {user.id}, count: {len(predictions)}")
-    prediction_dtos = [
-        prediction_task_to_dto(task, user.email, get_model_by_id(task.model_id, session).name)
-        for task in predictions
-    ]
-    return templates.TemplateResponse("prediction_history.html", {"request": request, "predictions": prediction_dtos})
+    user = auth.user
+    logger.info("Fetching prediction history for user, user_id: %s", user.id)
+    predictions, next_cursor = await get_prediction_histories_by_user(user.id, session, cursor, limit)
+    logger.info("Prediction history fetched, user_id: %s, count: %s", user.id, len(predictions))
+    prediction_dtos = prediction_tasks_to_dtos(predictions, user.email)
+    if wants_json(request):
+        return JSONResponse(jsonable_encoder(PredictionHistoryPage(items=prediction_dtos, next_cursor=next_cursor)))
+    return templates.TemplateResponse("prediction_history.html", {"request": request, "predictions": prediction_dtos,
+                                                                  "next_cursor": next_cursor, "limit": limit})
@@ -1,23 +1,27 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Form, Body
+from fastapi import APIRouter, Depends, HTTPException, Form, Body, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import EmailStr
-from sqlmodel import Session
-from typing import Annotated
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated, Optional
 
 from starlette import status
 from starlette.requests import Request
-from starlette.responses import RedirectResponse, HTMLResponse
+from starlette.responses import RedirectResponse, HTMLResponse, JSONResponse
 
 from config.auth_config import get_auth_settings
-from database.database import get_session
-from entities.auth.auth_entities import TokenData
+from config.constants import HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+from database.database import get_async_session
+from entities.auth.auth_entities import AuthContext
+from entities.user.balance_history import BalanceHistoryPage
 from entities.user.user import UserSignUp, UserDTO
-from routes.home_router import templates
-from service.auth.auth_service import get_current_active_user, authenticate_cookie
+from routes.home_router import templates, wants_json
+from service.auth.auth_service import get_auth_context
 from service.auth.jwt_service import create_access_token
-from service.crud.user_service import (
+from service.auth.password_hasher import get_password_hasher
+from service.crud.async_user_service import (
     create_user,
     add_balance,
     withdraw_balance,
@@ -34,32 +38,32 @@ logger = logging.getLogger(__name__)
 @user_router.post("/login")
 async def login(
     user_login: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> RedirectResponse:
-    logger.info(f"Login attempt for username: {user_login.username}")
+    logger.info("Login attempt for username: %s", user_login.username)
     auth_settings = get_auth_settings()
-    user = find_and_verify_user(user_login.username, user_login.password, session)
-    logger.info(f"User verified for login: {user_login.username}")
+    user = await find_and_verify_user(user_login.username, user_login.password, session)
+    logger.info("User verified for login: %s", user_login.username)
     response = RedirectResponse(url="/home", status_code=status.HTTP_302_FOUND)
     response.set_cookie(
         key=auth_settings.COOKIE_NAME,
         value=f"Bearer {create_access_token(user)}",
         httponly=True
     )
-    logger.info(f"Login cookie set for user: {user.email}")
+    logger.info("Login cookie set for user: %s", user.email)
     return response
 
 
 @user_router.post("/token")
 async def get_token(
     user_login: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> dict:
-    logger.info(f"Token request for username: {user_login.username}")
+    logger.info("Token request for username: %s", user_login.username)
     auth_settings = get_auth_settings()
-    user = find_and_verify_user(user_login.username, user_login.password, session)
+    user = await find_and_verify_user(user_login.username, user_login.password, session)
     token = create_access_token(user)
-    logger.info(f"Token created for user: {user.email}")
+    logger.info("Token created for user: %s", user.email)
     return {auth_settings.COOKIE_NAME: token, "token_type": "bearer"}
 
 
@@ -69,103 +73,105 @@ async def create_new_user(
     surname: str = Form(...),
     email: EmailStr = Form(...),
     password: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> RedirectResponse:
-    logger.info(f"Signup attempt for email: {email}")
+    logger.info("Signup attempt for email: %s", email)
     user_data = UserSignUp(name=username, surname=surname, email=email, password=password)
-    user = get_user_by_email(user_data.email, session)
+    user = await get_user_by_email(user_data.email, session)
     auth_settings = get_auth_settings()
     if user:
-        logger.warning(f"User with email {user_data.email} already exists")
+        logger.warning("User with email %s already exists", user_data.email)
         raise HTTPException(status_code=409, detail=f"User with email {user_data.email} already exists")
+    hashed_password = await get_password_hasher().hash(user_data.password)
     try:
-        user = user_signup_dto_to_user(user_data)
-        create_user(user, session)
-        logger.info(f"User created successfully: {user.email}")
+        user = user_signup_dto_to_user(user_data, hashed_password)
+        await create_user(user, session)
+        logger.info("User created successfully: %s", user.email)
         response = RedirectResponse(url="/home", status_code=status.HTTP_302_FOUND)
         response.set_cookie(
             key=auth_settings.COOKIE_NAME,
             value=f"Bearer {create_access_token(user)}",
             httponly=True
         )
-        logger.info(f"Signup cookie set for user: {user.email}")
+        logger.info("Signup cookie set for user: %s", user.email)
         return response
     except Exception as e:
-        logger.error(f"Error during signup for {email}: {e}")
+        logger.error("Error during signup for %s: %s", email, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @user_router.post("/balance/add")
 async def add_user_balance(
-    token: Annotated[TokenData, Depends(authenticate_cookie)],
-    session: Session = Depends(get_session),
+    auth: Annotated[AuthContext, Depends(get_auth_context)],
+    session: AsyncSession = Depends(get_async_session),
     amount: float = Body(..., embed=True)
 ) -> dict:
     try:
-        user = await get_current_active_user(token, session)
-        logger.info(f"Adding balance {amount} for user: {user.email}")
-        add_balance(user.email, amount, session)
-        new_balance = float(user.balance)
-        logger.info(f"New balance for {user.email} is {new_balance}")
+        user = auth.user
+        logger.info("Adding balance %s for user: %s", amount, user.email)
+        new_balance = float(await add_balance(user.email, amount, session))
+        logger.info("New balance for %s is %s", user.email, new_balance)
         return {
             "message": f"Successfully added {amount} to balance for user {user.email}",
             "new_balance": new_balance
         }
     except Exception as e:
-        logger.error(f"Error adding balance for user: {e}")
+        logger.error("Error adding balance for user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @user_router.post("/balance/withdraw")
 async def withdraw_user_balance(
-    token: Annotated[TokenData, Depends(authenticate_cookie)],
-    session: Session = Depends(get_session),
+    auth: Annotated[AuthContext, Depends(get_auth_context)],
+    session: AsyncSession = Depends(get_async_session),
     amount: float = Body(..., embed=True)
 ):
     try:
-        user = await get_current_active_user(token, session)
-        logger.info(f"Attempting to withdraw {amount} for user: {user.email}")
-        withdraw_balance(user.id, amount, session)
-        new_balance = float(user.balance)
-        logger.info(f"New balance after withdrawal for {user.email} is {new_balance}")
+        user = auth.user
+        logger.info("Attempting to withdraw %s for user: %s", amount, user.email)
+        new_balance = float(await withdraw_balance(user.id, amount, session))
+        logger.info("New balance after withdrawal for %s is %s", user.email, new_balance)
         return {
             "message": f"Successfully withdrew {amount} from balance for user {user.email}",
             "new_balance": new_balance
         }
     except Exception as e:
-        logger.error(f"Error withdrawing balance for user {user.email}: {e}")
+        logger.error("Error withdrawing balance for user %s: %s", user.email, e)
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @user_router.get("/balance/current", response_model=float)
 async def get_user_current_balance(
-    token: Annotated[TokenData, Depends(authenticate_cookie)],
-    session: Session = Depends(get_session)
+    auth: Annotated[AuthContext, Depends(get_auth_context)]
 ):
-    user = await get_current_active_user(token, session)
-    logger.info(f"Fetching current balance for user {user.email}, balance: {user.balance}")
+    user = auth.user
+    logger.info("Fetching current balance for user %s, balance: %s", user.email, user.balance)
     return user.balance
 
 
 @user_router.get("/balance/history", response_class=HTMLResponse)
 async def balance_history(
     request: Request,
-    token: Annotated[TokenData, Depends(authenticate_cookie)],
-    session: Session = Depends(get_session)
+    auth: Annotated[AuthContext, Depends(get_auth_context)],
+    session: AsyncSession = Depends(get_async_session),
+    cursor: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE)
 ):
-    user = await get_current_active_user(token, session)
-    logger.info(f"Fetching balance history for user: {user.email}")
-    history = get_balance_histories(user.id, session)
-    logger.info(f"Balance history fetched for user {user.email}, records: {len(history)}")
-    return templates.TemplateResponse("balance_history.html", {"request": request, "history": history})
+    user = auth.user
+    logger.info("Fetching balance history for user: %s", user.email)
+    history, next_cursor = await get_balance_histories(user.id, session, cursor, limit)
+    logger.info("Balance history fetched for user %s, records: %s", user.email, len(history))
+    if wants_json(request):
+        return JSONResponse(jsonable_encoder(BalanceHistoryPage(items=history, next_cursor=next_cursor)))
+    return templates.TemplateResponse("balance_history.html", {"request": request, "history": history,
+                                                               "next_cursor": next_cursor, "limit": limit})
 
 
 @user_router.get("/myinfo", response_model=UserDTO)
 async def my_info(
     request: Request,
-    token: Annotated[TokenData, Depends(authenticate_cookie)],
-    session: Session = Depends(get_session)
+    auth: Annotated[AuthContext, Depends(get_auth_context)]
 ):
-    user = await get_current_active_user(token, session)
-    logger.info(f"Fetching info for user: {user.email}")
+    user = auth.user
+    logger.info("Fetching info for user: %s", user.email)
     return templates.TemplateResponse("myinfo.html", {"request": request, "user": user})
@@ -0,0 +1,87 @@
+import logging
+import uuid
+from typing import Iterable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.responses import RedirectResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.auth_config import get_auth_settings
+from config.logging_config import request_id_var
+from database.database import async_session_scope
+from service.auth.auth_service import resolve_auth_context
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+class PathMatcher:
+    """Matches paths against a set of exact paths and a tuple of prefixes, both built once at startup."""
+
+    def __init__(self, paths: Iterable[str], prefixes: Iterable[str] = ()):
+        self._paths = frozenset(paths)
+        self._prefixes = tuple(prefixes)
+
+    def __call__(self, path: str) -> bool:
+        return path in self._paths or path.startswith(self._prefixes)
+
+
+class AccessMiddleware:
+    """
+    Pure ASGI middleware that tags every request with a request id and lets only signed-in users past the
+    public paths. The resolved AuthContext is stored in the request state, so routes don't look up the
+    token or the user again. Unlike BaseHTTPMiddleware it never buffers or wraps the response body, so
+    streamed responses pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, public_paths: PathMatcher):
+        self.app = app
+        self.public_paths = public_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get(REQUEST_ID_HEADER) or str(uuid.uuid4())
+        context_token = request_id_var.set(request_id)
+        try:
+            await self._handle(scope, receive, send, headers, request_id)
+        finally:
+            request_id_var.reset(context_token)
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send, headers: Headers, request_id: str) -> None:
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        logger.info("Received request: %s ", request_id)
+
+        if not self.public_paths(scope["path"]):
+            cookie_name = get_auth_settings().COOKIE_NAME
+            token = cookie_parser(headers.get("cookie", "")).get(cookie_name)
+            if not token:
+                await self._redirect(request_id)(scope, receive, send)
+                return
+            try:
+                async with async_session_scope() as session:
+                    state["auth"] = await resolve_auth_context(token, session)
+            except Exception:
+                response = self._redirect(request_id)
+                response.delete_cookie(key=cookie_name)
+                await response(scope, receive, send)
+                return
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+    @staticmethod
+    def _redirect(request_id: str) -> RedirectResponse:
+        response = RedirectResponse(url="/")
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
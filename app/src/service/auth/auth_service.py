@@ -1,48 +1,57 @@
 import logging
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
+from starlette.requests import Request
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from entities.auth.auth_entities import TokenData, OAuth2PasswordBearerWithCookie
+from database.database import get_async_session
+from entities.auth.auth_entities import AuthContext, TokenData, OAuth2PasswordBearerWithCookie
 from service.auth.jwt_service import verify_token, oauth2_scheme
-from service.crud.user_service import get_user_by_email, get_user_by_id
+from service.auth.user_cache import get_user_cache
+from service.crud import async_user_service
+from service.crud import user_service
+from service.crud.user_service import get_user_by_email
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme_cookie = OAuth2PasswordBearerWithCookie(tokenUrl="/users/token")
 logger = logging.getLogger(__name__)
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    return user_service.verify_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str):
-    return pwd_context.hash(password)
+    return user_service.hash_password(password)
 
 
 def authenticate_user(email: str, password: str, session: Session):
-    logger.info(f"Authenticating user with email: {email}")
+    logger.info("Authenticating user with email: %s", email)
     user = get_user_by_email(email, session)
     if not user:
-        logger.warning(f"User not found for email: {email}")
+        logger.warning("User not found for email: %s", email)
         return False
     if not verify_password(password, user.hashed_password):
-        logger.warning(f"Password verification failed for user: {email}")
+        logger.warning("Password verification failed for user: %s", email)
         return False
-    logger.info(f"User {email} authenticated successfully")
+    logger.info("User %s authenticated successfully", email)
     return user
 
 
-async def get_current_active_user(token_data: TokenData, session: Session):
-    logger.info(f"Fetching current active user for token data: {token_data}")
-    current_user = get_user_by_id(token_data.user_id, session)
+async def get_current_active_user(token_data: TokenData, session: AsyncSession):
+    logger.info("Fetching current active user for token data: %s", token_data)
+    cache = get_user_cache()
+    current_user = cache.get(token_data.user_id) if cache else None
     if current_user is None:
-        logger.error(f"User not found for user_id: {token_data.user_id}")
-        raise HTTPException(status_code=404, detail="User not found")
+        current_user = await async_user_service.get_user_by_id(token_data.user_id, session)
+        if current_user is None:
+            logger.error("User not found for user_id: %s", token_data.user_id)
+            raise HTTPException(status_code=404, detail="User not found")
+        if cache:
+            cache.put(current_user)
     if current_user.disabled:
-        logger.warning(f"User {current_user.email} is inactive")
+        logger.warning("User %s is inactive", current_user.email)
         raise HTTPException(status_code=400, detail="Inactive user")
-    logger.info(f"User {current_user.email} is active")
+    logger.info("User %s is active", current_user.email)
     return current_user
 
 
@@ -54,7 +63,7 @@ async def authenticate(token: str = Depends(oauth2_scheme)) -> str:
             detail="Sign in for access"
         )
     decoded_token = verify_token(token)
-    logger.info(f"Token decoded successfully for username: {decoded_token.username}")
+    logger.info("Token decoded successfully for username: %s", decoded_token.username)
     return decoded_token.username
 
 
@@ -67,5 +76,23 @@ async def authenticate_cookie(token: str = Depends(oauth2_scheme_cookie)) -> Tok
         )
     token = token.removeprefix('Bearer ')
     decoded_token = verify_token(token)
-    logger.info(f"Cookie token decoded successfully for username: {decoded_token.username}")
+    logger.info("Cookie token decoded successfully for username: %s", decoded_token.username)
     return decoded_token
+
+
+async def resolve_auth_context(token: str, session: AsyncSession) -> AuthContext:
+    token_data = verify_token(token)
+    return AuthContext(token_data=token_data, user=await get_current_active_user(token_data, session))
+
+
+async def get_auth_context(request: Request, session: AsyncSession = Depends(get_async_session)) -> AuthContext:
+    """
+    Route dependency for the authenticated user. The access middleware has usually resolved it already, then
+    neither the token nor the user is looked up again. Otherwise it is resolved here and kept for the request.
+    """
+    auth = getattr(request.state, "auth", None)
+    if auth is None:
+        token = await oauth2_scheme_cookie(request)
+        auth = await resolve_auth_context(token, session)
+        request.state.auth = auth
+    return auth
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 
 
 def create_access_token(user: User):
-    logger.info(f"Creating access token for user: {user.email if hasattr(user, 'email') else user.id}")
+    logger.info("Creating access token for user: %s", user.email if hasattr(user, 'email') else user.id)
     auth_settings = get_auth_settings()
     access_token_expires = timedelta(minutes=auth_settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     token = __create_access_token(
@@ -22,7 +22,7 @@ def create_access_token(user: User):
         algorithm=auth_settings.ALGORITHM,
         expires_delta=access_token_expires
     )
-    logger.info(f"Access token created for user: {user.email if hasattr(user, 'email') else user.id}")
+    logger.info("Access token created for user: %s", user.email if hasattr(user, 'email') else user.id)
     return token
 
 
@@ -34,7 +34,7 @@ def __create_access_token(data: dict, secret_key: str, algorithm: str, expires_d
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
-    logger.info(f"JWT token encoded with expiration at {expire}")
+    logger.info("JWT token encoded with expiration at %s", expire)
     return encoded_jwt
 
 
@@ -48,8 +48,8 @@ def verify_token(token: str) -> TokenData:
             logger.error("Token verification failed: 'sub' (user_id) is missing")
             raise InvalidTokenError("Missing user id in token")
         token_data = TokenData(user_id=user_id, username=payload.get("username"))
-        logger.info(f"Token verified for user_id: {user_id}, username: {payload.get('username')}")
+        logger.info("Token verified for user_id: %s, username: %s", user_id, payload.get('username'))
     except InvalidTokenError as e:
-        logger.error(f"Token verification failed: {e}")
+        logger.error("Token verification failed: %s", e)
         raise InvalidTokenError(e)
     return token_data
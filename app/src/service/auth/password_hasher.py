@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable
+
+from fastapi import HTTPException
+
+from config.auth_config import get_auth_settings
+from config.metrics import PASSWORD_HASH_QUEUE_LATENCY, PASSWORD_HASH_LATENCY, PASSWORD_HASH_REJECTED
+from service.crud.user_service import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+HASH_OPERATION = "hash"
+VERIFY_OPERATION = "verify"
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so a burst of logins doesn't stall the event loop. At most
+    `max_workers` hashes run at once and `max_queued` more may wait for a thread; anything beyond that is
+    refused with a 503 rather than queueing up behind seconds of hashing.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(HASH_OPERATION, hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(VERIFY_OPERATION, verify_password, password, hashed_password)
+
+    async def _run(self, operation: str, fn: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            PASSWORD_HASH_REJECTED.labels(operation=operation).inc()
+            logger.warning("Password hashing queue is full, refusing %s", operation)
+            raise HTTPException(status_code=503, detail="Too many sign-in attempts, try again later")
+
+        submitted_at = time.time()
+
+        def timed():
+            started_at = time.time()
+            PASSWORD_HASH_QUEUE_LATENCY.labels(operation=operation).observe(started_at - submitted_at)
+            try:
+                return fn(*args)
+            finally:
+                PASSWORD_HASH_LATENCY.labels(operation=operation).observe(time.time() - started_at)
+
+        try:
+            future = self._executor.submit(timed)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+@lru_cache(maxsize=1)
+def get_password_hasher() -> PasswordHasher:
+    settings = get_auth_settings()
+    return PasswordHasher(settings.PASSWORD_HASH_MAX_WORKERS, settings.PASSWORD_HASH_MAX_QUEUED)
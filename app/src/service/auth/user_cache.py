@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from config.metrics import USER_CACHE_REQUESTS, USER_CACHE_INVALIDATIONS, USER_CACHE_HIT_AGE
+from config.user_cache_config import get_user_cache_settings
+from entities.user.user import User
+
+logger = logging.getLogger(__name__)
+
+LOCAL_SOURCE = "local"
+NOTIFY_SOURCE = "notify"
+
+
+class UserCache:
+    """
+    Bounded LRU of the users resolved from access tokens, keyed by user id. Entries expire after `ttl_s`,
+    which bounds staleness when an invalidation is missed. Every process holds its own copies of the users,
+    so routes can't change a cached user through their session.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: uuid.UUID) -> Optional[User]:
+        key = str(user_id)
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                USER_CACHE_REQUESTS.labels(result="miss").inc()
+                return None
+            user, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl_s:
+                del self._items[key]
+                USER_CACHE_REQUESTS.labels(result="expired").inc()
+                return None
+            self._items.move_to_end(key)
+        USER_CACHE_REQUESTS.labels(result="hit").inc()
+        USER_CACHE_HIT_AGE.observe(age)
+        return User(**user.model_dump())
+
+    def put(self, user: User) -> None:
+        key = str(user.id)
+        with self._lock:
+            self._items[key] = (User(**user.model_dump()), time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: uuid.UUID, source: str = LOCAL_SOURCE) -> None:
+        with self._lock:
+            if self._items.pop(str(user_id), None) is not None:
+                USER_CACHE_INVALIDATIONS.labels(source=source).inc()
+
+    def on_notification(self, payload: str) -> None:
+        """Runs on the event loop for every NOTIFY on the invalidation channel, the payload is the user id."""
+        self.invalidate(payload, NOTIFY_SOURCE)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+@lru_cache(maxsize=1)
+def get_user_cache() -> Optional[UserCache]:
+    settings = get_user_cache_settings()
+    if not settings.USER_CACHE_ENABLED:
+        return None
+    return UserCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_S)
+
+
+def invalidate_cached_user(user_id: uuid.UUID) -> None:
+    cache = get_user_cache()
+    if cache is not None:
+        cache.invalidate(user_id)
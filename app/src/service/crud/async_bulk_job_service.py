@@ -0,0 +1,44 @@
+import logging
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from entities.task.bulk_job import BulkJob
+from entities.task.bulk_job_status import BulkJobStatus
+
+logger = logging.getLogger(__name__)
+
+
+async def create_bulk_job(job: BulkJob, session: AsyncSession) -> BulkJob:
+    logger.info("Creating bulk job %s, input size %s", job.id, job.input_size)
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def get_bulk_job_by_id(job_id: uuid.UUID, session: AsyncSession) -> Optional[BulkJob]:
+    return await session.get(BulkJob, job_id)
+
+
+async def reset_bulk_job(job: BulkJob, session: AsyncSession) -> BulkJob:
+    """Puts a failed or interrupted job back to pending, it continues from its last checkpoint."""
+    job.status = BulkJobStatus.PENDING
+    job.error = None
+    job.updated_at = datetime.now()
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def fail_bulk_job(job: BulkJob, error: str, session: AsyncSession) -> BulkJob:
+    job.status = BulkJobStatus.FAILED
+    job.error = error
+    job.updated_at = datetime.now()
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
@@ -0,0 +1,73 @@
+import logging
+import uuid
+from typing import List, Optional, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config.constants import HISTORY_PAGE_SIZE
+from entities.ml_model.classification_model import ClassificationModel
+from entities.task.prediction_task import PredictionTask
+from service.crud.pagination import apply_keyset, split_page
+
+logger = logging.getLogger(__name__)
+
+
+async def get_model_by_id(id: uuid.UUID, session: AsyncSession) -> ClassificationModel:
+    logger.info("Getting model by id %s", id)
+    statement = select(ClassificationModel).where(ClassificationModel.id == id)
+    return (await session.exec(statement)).first()
+
+
+async def get_model_metadata_by_name(name: str, session: AsyncSession) -> ClassificationModel:
+    """Returns the model row, the API never loads model weights."""
+    logger.info("Getting %s model metadata from database", name)
+    statement = select(ClassificationModel).where(ClassificationModel.name == name)
+    return (await session.exec(statement)).first()
+
+
+async def get_prediction_task_by_id(task_id: uuid.UUID, session: AsyncSession) -> PredictionTask:
+    logger.info("Getting prediction task by id %s", task_id)
+    statement = select(PredictionTask).where(PredictionTask.id == task_id)
+    return (await session.exec(statement)).first()
+
+
+async def get_prediction_tasks_by_batch(batch_id: uuid.UUID, session: AsyncSession) -> List[PredictionTask]:
+    statement = select(PredictionTask) \
+        .where(PredictionTask.batch_id == batch_id) \
+        .order_by(PredictionTask.batch_position)
+
+    return (await session.exec(statement)).all()
+
+
+def task_cursor_key(row: Tuple[PredictionTask, Optional[str]]):
+    task, _ = row
+    return task.request_timestamp, task.id
+
+
+def prediction_history_statement():
+    """Selects every task together with the name of its model, so a page of history is a single query."""
+    return select(PredictionTask, ClassificationModel.name) \
+        .outerjoin(ClassificationModel, ClassificationModel.id == PredictionTask.model_id)
+
+
+async def get_all_prediction_histories(
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = HISTORY_PAGE_SIZE
+) -> Tuple[List[Tuple[PredictionTask, Optional[str]]], Optional[str]]:
+    """Returns a page of (task, model name) rows, newest first, and the cursor of the next page."""
+    statement = apply_keyset(prediction_history_statement(), PredictionTask.request_timestamp, PredictionTask.id,
+                             cursor, limit)
+    return split_page((await session.exec(statement)).all(), limit, task_cursor_key)
+
+
+async def get_prediction_histories_by_user(
+        user_id: uuid.UUID,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = HISTORY_PAGE_SIZE
+) -> Tuple[List[Tuple[PredictionTask, Optional[str]]], Optional[str]]:
+    statement = apply_keyset(prediction_history_statement().where(PredictionTask.user_id == user_id),
+                             PredictionTask.request_timestamp, PredictionTask.id, cursor, limit)
+    return split_page((await session.exec(statement)).all(), limit, task_cursor_key)
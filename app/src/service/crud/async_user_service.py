@@ -0,0 +1,148 @@
+import logging
+import uuid
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config.constants import HISTORY_PAGE_SIZE
+from entities.user.balance_history import BalanceHistory
+from entities.user.balance_hold import BalanceHold
+from entities.user.user import User
+from service.auth.password_hasher import get_password_hasher
+from service.auth.user_cache import invalidate_cached_user
+from service.crud.pagination import apply_keyset, split_page
+from service.crud.user_service import (
+    balance_statement,
+    credit_by_email_statement,
+    debit_statement,
+    delete_hold_statement,
+    expired_holds_statement,
+    password_needs_rehash
+)
+from service.notifications.user_notifier import notify_user_changed_async
+
+logger = logging.getLogger(__name__)
+
+
+async def get_all_users(session: AsyncSession) -> List[User]:
+    return (await session.exec(select(User))).all()
+
+
+async def get_user_by_id(id: uuid.UUID, session: AsyncSession) -> User:
+    return await session.get(User, id)
+
+
+async def get_user_by_email(email: str, session: AsyncSession) -> User:
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
+
+async def create_user(new_user: User, session: AsyncSession) -> None:
+    session.add(new_user)
+    await session.commit()
+    await session.refresh(new_user)
+
+
+async def add_balance(email: str, amount: float, session: AsyncSession) -> float:
+    """Returns the new balance."""
+    if amount <= 0:
+        raise Exception("Amount must be positive")
+
+    row = (await session.exec(credit_by_email_statement(email, amount))).first()
+    if not row:
+        await session.rollback()
+        raise Exception("User not found")
+
+    user_id, new_balance = row
+    session.add(BalanceHistory(user_id=user_id, amount_before_change=new_balance - amount, amount_change=amount))
+    await commit_user_change(user_id, session)
+    return new_balance
+
+
+async def commit_user_change(user_id: uuid.UUID, session: AsyncSession) -> None:
+    await notify_user_changed_async(user_id, session)
+    await session.commit()
+    invalidate_cached_user(user_id)
+
+
+async def withdraw_balance(user_id: uuid.UUID, amount: float, session: AsyncSession) -> float:
+    """Returns the new balance."""
+    logger.info("Withdrawing %s from user %s", amount, user_id)
+    if amount <= 0:
+        logger.error("Amount must be positive %s, user %s", amount, user_id)
+        raise Exception("Amount must be positive")
+
+    new_balance = await debit(user_id, amount, session)
+    session.add(BalanceHistory(user_id=user_id, amount_before_change=new_balance + amount, amount_change=-amount))
+    await commit_user_change(user_id, session)
+    logger.info("Amount: %s withdrawed from user: %s", amount, user_id)
+    return new_balance
+
+
+async def debit(user_id: uuid.UUID, amount: float, session: AsyncSession) -> float:
+    new_balance = (await session.exec(debit_statement(user_id, amount))).scalar_one_or_none()
+    if new_balance is not None:
+        return new_balance
+
+    balance = (await session.exec(balance_statement(user_id))).first()
+    if balance is None:
+        logger.error("User %s not found", user_id)
+        raise HTTPException(status_code=404, detail=str("User not found"))
+    logger.error("Insufissient balance: %s, amount: %s, user: %s", balance, amount, user_id)
+    raise HTTPException(status_code=400, detail=str("Insufficient balance"))
+
+
+async def reserve_balance(user_id: uuid.UUID, amount: float, hold_id: uuid.UUID, session: AsyncSession) -> float:
+    logger.info("Reserving %s from user %s, hold %s", amount, user_id, hold_id)
+    for expired_hold_id in (await session.exec(expired_holds_statement(user_id))).all():
+        await release_hold(expired_hold_id, session)
+    new_balance = await debit(user_id, amount, session)
+    session.add(BalanceHold(id=hold_id, user_id=user_id, amount=amount, balance_before=new_balance + amount))
+    await commit_user_change(user_id, session)
+    return new_balance
+
+
+async def release_hold(hold_id: uuid.UUID, session: AsyncSession) -> bool:
+    row = (await session.exec(delete_hold_statement(hold_id))).first()
+    if not row:
+        return False
+
+    user_id, amount, _ = row
+    await session.exec(update(User).where(User.id == user_id).values(balance=User.balance + amount))
+    await commit_user_change(user_id, session)
+    logger.info("Hold %s of %s released for user %s", hold_id, amount, user_id)
+    return True
+
+
+async def get_balance_histories(user_id: uuid.UUID, session: AsyncSession, cursor: Optional[str] = None,
+                                limit: int = HISTORY_PAGE_SIZE) -> Tuple[List[BalanceHistory], Optional[str]]:
+    """Returns a page of the user's balance changes, newest first, and the cursor of the next page."""
+    statement = apply_keyset(select(BalanceHistory).where(BalanceHistory.user_id == user_id),
+                             BalanceHistory.timestamp, BalanceHistory.id, cursor, limit)
+    return split_page((await session.exec(statement)).all(), limit, lambda history: (history.timestamp, history.id))
+
+
+async def find_and_verify_user(email: str, password: str, session: AsyncSession) -> User:
+    """
+    Checks the password on the hashing threads. A hash made with an outdated work factor is replaced while
+    the plain password is at hand; a failed rehash doesn't fail the login.
+    """
+    hasher = get_password_hasher()
+    user = await get_user_by_email(email, session)
+    if not user or not await hasher.verify(password, user.hashed_password):
+        logger.error("Invalid credentials for user %s", email)
+
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    if password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await hasher.hash(password)
+            session.add(user)
+            await session.commit()
+            logger.info("Password of user %s rehashed with the current work factor", email)
+        except Exception as e:
+            await session.rollback()
+            logger.warning("Rehashing the password of user %s failed: %s", email, e)
+    return user
@@ -0,0 +1,172 @@
+import logging
+import os
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import List, Optional
+
+from sqlmodel import Session, select, update
+
+from config.inference_config import get_inference_settings
+from config.metrics import BULK_JOB_ROWS
+from entities.task.batch_prediction_request import BatchPredictionRequest
+from entities.task.bulk_job import BulkJob, BulkJobDTO
+from entities.task.bulk_job_status import BulkJobStatus
+from entities.task.prediction_task import PredictionTask
+from service.crud.model_service import (
+    get_model_by_id,
+    get_model_by_name,
+    make_deduplicated_batch_prediction,
+    add_batch_tasks,
+    validate_input
+)
+from service.crud.user_service import get_user_by_id, withdraw_balance
+from service.inference.bulk_input import iter_rows
+
+logger = logging.getLogger(__name__)
+
+
+def get_bulk_job_dir() -> str:
+    bulk_job_dir = get_inference_settings().BULK_JOB_DIR
+    if bulk_job_dir is None:
+        bulk_job_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../bulk_jobs"))
+    os.makedirs(bulk_job_dir, exist_ok=True)
+    return bulk_job_dir
+
+
+def create_bulk_job(job: BulkJob, session: Session) -> BulkJob:
+    logger.info("Creating bulk job %s, input size %s", job.id, job.input_size)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def get_bulk_job_by_id(job_id: uuid.UUID, session: Session) -> Optional[BulkJob]:
+    return session.get(BulkJob, job_id)
+
+
+def reset_bulk_job(job: BulkJob, session: Session) -> BulkJob:
+    """Puts a failed or interrupted job back to pending, it continues from its last checkpoint."""
+    job.status = BulkJobStatus.PENDING
+    job.error = None
+    job.updated_at = datetime.now()
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def bulk_job_to_dto(job: BulkJob) -> BulkJobDTO:
+    return BulkJobDTO(
+        id=job.id,
+        status=job.status,
+        rows_read=job.rows_read,
+        rows_predicted=job.rows_predicted,
+        rows_skipped=job.rows_skipped,
+        progress=job.input_offset / job.input_size if job.input_size else 1.0,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+
+def get_bulk_job_results_page(job_id: uuid.UUID, after_position: int, limit: int,
+                              session: Session) -> List[PredictionTask]:
+    statement = select(PredictionTask) \
+        .where(PredictionTask.batch_id == job_id) \
+        .where(PredictionTask.batch_position > after_position) \
+        .order_by(PredictionTask.batch_position) \
+        .limit(limit)
+
+    return session.exec(statement).all()
+
+
+def run_bulk_job(job_id: uuid.UUID, session: Session, batch_size: int, max_batches: int) -> Optional[BulkJob]:
+    """
+    Scores up to `max_batches` batches of the job's input, starting at its checkpoint. Every batch is
+    committed together with its PredictionTask rows, its charge and the new checkpoint, so a job stopped at
+    any point resumes without losing or repeating rows. Returns the job, still RUNNING if input is left,
+    or None when the job does not exist or is being processed by another worker.
+    """
+    job = get_bulk_job_by_id(job_id, session)
+    if job is None:
+        return None
+    if job.status == BulkJobStatus.COMPLETED:
+        return job
+
+    logger.info("Running bulk job %s from offset %s, rows read %s", job_id, job.input_offset, job.rows_read)
+    job.status = BulkJobStatus.RUNNING
+    job.updated_at = datetime.now()
+    session.add(job)
+    session.commit()
+
+    model = get_model_by_name(get_model_by_id(job.model_id, session).name, session)
+    text_field = get_inference_settings().BULK_JOB_TEXT_FIELD
+    offset, rows_read = job.input_offset, job.rows_read
+    rows = iter_rows(job.input_path, job.input_format, text_field, offset)
+
+    for _ in range(max_batches):
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            job.status = BulkJobStatus.COMPLETED
+            job.updated_at = datetime.now()
+            session.add(job)
+            session.commit()
+            logger.info("Bulk job %s completed, rows predicted %s", job_id, job.rows_predicted)
+            return job
+
+        positions, texts = [], []
+        for i, (text, _) in enumerate(batch):
+            if text is not None and validate_input(text):
+                positions.append(rows_read + i)
+                texts.append(text)
+        results = make_deduplicated_batch_prediction(model, texts) if texts else []
+
+        # The checkpoint only moves if nobody else moved it since this run read it, so a second worker that
+        # picked up the same job (e.g. after a redelivery) stops instead of scoring the same rows again.
+        statement = update(BulkJob) \
+            .where(BulkJob.id == job_id) \
+            .where(BulkJob.input_offset == offset) \
+            .values(input_offset=batch[-1][1],
+                    rows_read=BulkJob.rows_read + len(batch),
+                    rows_predicted=BulkJob.rows_predicted + len(texts),
+                    rows_skipped=BulkJob.rows_skipped + len(batch) - len(texts),
+                    updated_at=datetime.now())
+        if session.exec(statement).rowcount != 1:
+            logger.warning("Bulk job %s is processed by another worker, stopping", job_id)
+            session.rollback()
+            return None
+        offset, rows_read = batch[-1][1], rows_read + len(batch)
+
+        if texts:
+            request = BatchPredictionRequest(
+                user_id=job.user_id,
+                model_id=job.model_id,
+                user_email=job.user_email,
+                inference_inputs=texts,
+                user_balance_before_task=get_user_by_id(job.user_id, session).balance,
+                request_timestamp=datetime.now()
+            )
+            add_batch_tasks(request, results, True, model.prediction_cost, job_id, session, positions)
+            withdraw_balance(job.user_id, model.prediction_cost * len(texts), session)
+        else:
+            session.commit()
+        session.refresh(job)
+
+        BULK_JOB_ROWS.labels(result="predicted").inc(len(texts))
+        BULK_JOB_ROWS.labels(result="skipped").inc(len(batch) - len(texts))
+
+    return job
+
+
+def fail_bulk_job(job_id: uuid.UUID, error: str, session: Session) -> None:
+    session.rollback()
+    job = get_bulk_job_by_id(job_id, session)
+    if job is None:
+        return
+    job.status = BulkJobStatus.FAILED
+    job.error = error
+    job.updated_at = datetime.now()
+    session.add(job)
+    session.commit()
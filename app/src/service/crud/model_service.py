@@ -1,30 +1,40 @@
 import logging
 from datetime import datetime
+from functools import lru_cache
 import uuid
 from typing import List
 
-from sqlmodel import Session, select, delete
+from sqlmodel import Session, select, delete, insert
 
-from config.constants import DEFAULT_MODEL_NAME
+from config.constants import DEFAULT_MODEL_NAME, DEFAULT_MODEL_REPO
 from entities.ml_model.inference_input import InferenceInput
+from entities.task.batch_prediction_request import BatchPredictionRequest
 from entities.task.prediction_request import PredictionRequest
 from entities.task.prediction_result import PredictionResult
 from entities.task.prediction_task import PredictionTask
 from entities.ml_model.ml_model import MLModel
 
 from entities.ml_model.classification_model import ClassificationModel
-from service.loaders.model_loader import ModelLoader
+from service.inference.prediction_cache import get_prediction_cache
+from service.notifications.result_notifier import notify_result
 
-model_loader = ModelLoader()
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def get_model_loader():
+    # Imported here so that torch and transformers are only loaded by processes that run inference.
+    from service.loaders.model_loader import ModelLoader
+
+    return ModelLoader()
+
+
 def create_model(new_model: ClassificationModel, session: Session) -> None:
-    logger.info(f"Creating {new_model.name} model in database")
+    logger.info("Creating %s model in database", new_model.name)
     session.add(new_model)
     session.commit()
     session.refresh(new_model)
-    logger.info(f"{new_model.name} model was created")
+    logger.info("%s model was created", new_model.name)
 
 
 def get_all_models(session: Session) -> List[MLModel]:
@@ -32,53 +42,98 @@ def get_all_models(session: Session) -> List[MLModel]:
     return session.query(ClassificationModel).all()
 
 
+def get_active_models(session: Session) -> List[ClassificationModel]:
+    logger.info("Getting active models")
+    statement = select(ClassificationModel).where(ClassificationModel.is_active == True)
+    return session.exec(statement).all()
+
+
 def get_model_by_id(id: uuid, session: Session) -> ClassificationModel:
-    logger.info(f"Getting model by id {id}")
+    logger.info("Getting model by id %s", id)
 
     statement = select(ClassificationModel).where(ClassificationModel.id == id)
     result = session.exec(statement).first()
-    logger.info(f"Model with id {id} was fetched")
+    logger.info("Model with id %s was fetched", id)
 
     return result
 
 
 def create_and_save_default_model():
-    return ClassificationModel(name=DEFAULT_MODEL_NAME, model_type='classification', prediction_cost=100.0)
+    return ClassificationModel(name=DEFAULT_MODEL_NAME, model_type='classification', prediction_cost=100.0,
+                               source_repo=DEFAULT_MODEL_REPO)
 
 
 def get_default_model(session: Session):
     return get_model_by_name(DEFAULT_MODEL_NAME, session)
 
 
-def get_model_by_name(name: str, session: Session) -> ClassificationModel:
-    logger.info(f"Getting {name} model from database")
+def get_model_metadata_by_name(name: str, session: Session) -> ClassificationModel:
+    """Returns the model row without loading its weights, for callers that only need its id, name or cost."""
+    logger.info("Getting %s model metadata from database", name)
 
     statement = select(ClassificationModel) \
         .where(ClassificationModel.name == name)
 
-    result = session.exec(statement).first()
+    return session.exec(statement).first()
+
+
+def get_model_by_name(name: str, session: Session) -> ClassificationModel:
+    logger.info("Getting %s model from database", name)
+
+    result = get_model_metadata_by_name(name, session)
     if result:
-        model, tokenizer = model_loader.get_model(name)
-        result.set_resources(model, tokenizer)
+        model_loader = get_model_loader()
+        model_loader.register(name, result.artifact_path, result.source_repo)
+        result.set_resources(model_loader.get_classifier(name, result.engine, result.precision))
 
-    logger.info(f"{name} model was fetched from database")
+    logger.info("%s model was fetched from database", name)
 
     return result
 
 
 def make_prediction(model: ClassificationModel, inference_input: InferenceInput) -> str:
-    logger.info(f"Making prediction")
+    logger.info("Making prediction")
+
+    cache = get_prediction_cache()
+    if cache is not None:
+        cached = cache.get(model, inference_input.data)
+        if cached is not None:
+            logger.info("Prediction taken from cache")
+            return cached
 
     res = model.predict(inference_input)
-    logger.info(f"Prediction made")
+    logger.info("Prediction made")
 
+    if cache is not None:
+        cache.put(model, inference_input.data, res[0])
     return res[0]
 
 
-def prepare_and_save_task(request: PredictionRequest, result: str, is_success: bool, cost: float,
-                          task_id: uuid, session: Session) -> PredictionTask:
-    logger.info(f"Preparing and saving task {task_id}")
+def make_batch_prediction(model: ClassificationModel, inference_input: InferenceInput) -> List[str]:
+    logger.info("Making batch prediction, batch size: %s", len(inference_input.data))
+
+    texts = inference_input.data
+    cache = get_prediction_cache()
+    if cache is None:
+        res = model.predict(inference_input)
+        logger.info("Batch prediction made")
+        return res
+
+    res = [cache.get(model, text) for text in texts]
+    missing = [i for i, label in enumerate(res) if label is None]
+    if missing:
+        labels = model.predict(InferenceInput([texts[i] for i in missing]))
+        for i, label in zip(missing, labels):
+            res[i] = label
+            cache.put(model, texts[i], label)
+    logger.info("Batch prediction made, cached: %s", len(texts) - len(missing))
+
+    return res
+
 
+def prepare_task(request: PredictionRequest, result: str, is_success: bool, cost: float,
+                 task_id: uuid, session: Session) -> PredictionTask:
+    """Adds the task row to the session and queues its result notification, without committing."""
     pred_result = PredictionResult(
         result=result,
         is_success=is_success,
@@ -99,52 +154,87 @@ def prepare_and_save_task(request: PredictionRequest, result: str, is_success: b
         balance_withdrawal=pred_result.balance_withdrawal,
         result_timestamp=pred_result.result_timestamp
     )
+    notify_result({"task_id": str(task_id), "user_id": str(request.user_id), "result": result,
+                   "is_success": is_success}, session)
+    session.add(task)
+    return task
+
+
+def prepare_and_save_task(request: PredictionRequest, result: str, is_success: bool, cost: float,
+                          task_id: uuid, session: Session) -> PredictionTask:
+    logger.info("Preparing and saving task %s", task_id)
+
+    task = prepare_task(request, result, is_success, cost, task_id, session)
     task = save_task(task, session)
-    logger.info(f"Task was saved task {task.id}")
+    logger.info("Task was saved task %s", task.id)
 
     return task
 
 
+def make_deduplicated_batch_prediction(model: ClassificationModel, texts: List[str]) -> List[str]:
+    """Runs every distinct text through the model once and returns one label per input text."""
+    unique_texts = list(dict.fromkeys(texts))
+    labels = dict(zip(unique_texts, make_batch_prediction(model, InferenceInput(unique_texts))))
+    logger.info("Batch of %s texts predicted, distinct texts: %s", len(texts), len(unique_texts))
+    return [labels[text] for text in texts]
+
+
+def add_batch_tasks(request: BatchPredictionRequest, results: List[str], is_success: bool, cost_per_text: float,
+                    batch_id: uuid.UUID, session: Session, positions: List[int] = None) -> int:
+    """Adds one PredictionTask row per text with a single bulk INSERT, without committing."""
+    result_timestamp = datetime.now()
+    rows = [
+        dict(
+            id=uuid.uuid4(),
+            batch_id=batch_id,
+            batch_position=position,
+            user_id=request.user_id,
+            model_id=request.model_id,
+            user_email=request.user_email,
+            inference_input=text,
+            user_balance_before_task=request.user_balance_before_task,
+            request_timestamp=request.request_timestamp,
+            result=result,
+            is_success=is_success,
+            balance_withdrawal=cost_per_text,
+            result_timestamp=result_timestamp
+        )
+        for text, result, position in zip(request.inference_inputs, results,
+                                          positions if positions is not None else range(len(results)))
+    ]
+    session.exec(insert(PredictionTask), params=rows)
+    notify_result({"batch_id": str(batch_id), "user_id": str(request.user_id), "size": len(rows),
+                   "is_success": is_success}, session)
+    logger.info("Added %s tasks of batch %s", len(rows), batch_id)
+    return len(rows)
+
+
+def get_prediction_tasks_by_batch(batch_id: uuid.UUID, session: Session) -> List[PredictionTask]:
+    statement = select(PredictionTask) \
+        .where(PredictionTask.batch_id == batch_id) \
+        .order_by(PredictionTask.batch_position)
+
+    return session.exec(statement).all()
+
+
 def save_task(task: PredictionTask, session: Session) -> PredictionTask:
     try:
         session.add(task)
         session.commit()
         session.refresh(task)
     except Exception as e:
-        logger.error(f"Error creating prediction task with id {task.id}: {e}")
+        logger.error("Error creating prediction task with id %s: %s", task.id, e)
         session.rollback()
     return task
 
 
-def get_all_prediction_history(session: Session) -> List[PredictionTask]:
-    logger.info("Getting all prediction history")
-    return session.query(PredictionTask).all()
-
-
 def get_prediction_task_by_id(task_id: uuid, session: Session) -> PredictionTask:
-    logger.info(f"Getting prediction task by id {task_id}")
+    logger.info("Getting prediction task by id %s", task_id)
     statement = select(PredictionTask).where(PredictionTask.id == task_id)
     result = session.exec(statement).first()
     return result
 
 
-def get_all_prediction_histories(session: Session) -> List[PredictionTask]:
-    statement = select(PredictionTask) \
-        .order_by(PredictionTask.request_timestamp.desc())
-
-    result = session.exec(statement).all()
-    return result
-
-
-def get_prediction_histories_by_user(user_id: uuid.UUID, session: Session) -> List[PredictionTask]:
-    statement = select(PredictionTask) \
-        .where(PredictionTask.user_id == user_id) \
-        .order_by(PredictionTask.request_timestamp.desc())
-
-    result = session.exec(statement).all()
-    return result
-
-
 def remove_prediction_histories_by_user(user_id: uuid.UUID, session: Session) -> int:
     statement = delete(PredictionTask).where(PredictionTask.user_id == user_id)
     result = session.exec(statement)
@@ -152,14 +242,5 @@ def remove_prediction_histories_by_user(user_id: uuid.UUID, session: Session) ->
     return result.rowcount
 
 
-def get_prediction_histories_by_model(model_id: uuid.UUID, session: Session) -> List[PredictionTask]:
-    statement = select(PredictionTask) \
-        .where(PredictionTask.model_id == model_id) \
-        .order_by(PredictionTask.request_timestamp.desc())
-
-    result = session.exec(statement).all()
-    return result
-
-
 def validate_input(inference_input: str) -> bool:
     return inference_input is not None and len(inference_input) > 5
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import uuid
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import or_, and_
+
+
+def encode_cursor(timestamp: datetime, id: uuid.UUID) -> str:
+    raw = f"{timestamp.isoformat()}|{id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, id = raw.split("|")
+        return datetime.fromisoformat(timestamp), uuid.UUID(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(statement, timestamp_column, id_column, cursor: Optional[str], limit: int):
+    """
+    Orders the statement newest first and continues after the row the cursor points to. The (timestamp, id)
+    comparison uses the sort columns only, so the cost of a page doesn't depend on how deep it is.
+    One extra row is selected to tell whether there is a next page.
+    """
+    if cursor:
+        timestamp, id = decode_cursor(cursor)
+        statement = statement.where(or_(timestamp_column < timestamp,
+                                        and_(timestamp_column == timestamp, id_column < id)))
+    return statement.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows: List, limit: int, cursor_key: Callable) -> Tuple[List, Optional[str]]:
+    """cursor_key returns the (timestamp, id) of a row, the values apply_keyset sorted it by."""
+    if len(rows) <= limit:
+        return list(rows), None
+    items = list(rows[:limit])
+    return items, encode_cursor(*cursor_key(items[-1]))
@@ -1,13 +1,21 @@
 import logging
 import uuid
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 import bcrypt
 from fastapi import HTTPException
 
+from config.auth_config import get_auth_settings
+from config.billing_config import get_billing_settings
+from config.constants import HISTORY_PAGE_SIZE
 from entities.user.user import User
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update, delete
 
 from entities.user.balance_history import BalanceHistory
+from entities.user.balance_hold import BalanceHold
+from service.auth.user_cache import invalidate_cached_user
+from service.crud.pagination import apply_keyset, split_page
+from service.notifications.user_notifier import notify_user_changed
 
 logger = logging.getLogger(__name__)
 
@@ -36,58 +44,166 @@ def add_balance(email: str, amount: float, session: Session) -> None:
     if amount <= 0:
         raise Exception("Amount must be positive")
 
-    user = get_user_by_email(email, session)
-    if not user:
+    row = session.exec(credit_by_email_statement(email, amount)).first()
+    if not row:
+        session.rollback()
         raise Exception("User not found")
 
-    balance_history = BalanceHistory(user_id=user.id, amount_before_change=user.balance, amount_change=amount)
+    user_id, new_balance = row
+    session.add(BalanceHistory(user_id=user_id, amount_before_change=new_balance - amount, amount_change=amount))
+    commit_user_change(user_id, session)
+
 
-    user.balance += amount
-    session.add(balance_history)
+def commit_user_change(user_id: uuid.UUID, session: Session) -> None:
+    """
+    Commits a change of the user's row and drops the user from the API's user caches: this process's at
+    once, the other processes' through a NOTIFY delivered with the commit.
+    """
+    notify_user_changed(user_id, session)
     session.commit()
-    session.refresh(user)
+    invalidate_cached_user(user_id)
+
+
+def credit_by_email_statement(email: str, amount: float):
+    return update(User) \
+        .where(User.email == email) \
+        .values(balance=User.balance + amount) \
+        .returning(User.id, User.balance)
+
+
+def debit_statement(user_id: uuid.UUID, amount: float):
+    """Only matches the user while the balance covers the amount, so the check and the debit are one step."""
+    return update(User) \
+        .where(User.id == user_id) \
+        .where(User.balance >= amount) \
+        .values(balance=User.balance - amount) \
+        .returning(User.balance)
+
+
+def delete_hold_statement(hold_id: uuid.UUID):
+    return delete(BalanceHold) \
+        .where(BalanceHold.id == hold_id) \
+        .returning(BalanceHold.user_id, BalanceHold.amount, BalanceHold.balance_before)
+
+
+def expired_holds_statement(user_id: uuid.UUID):
+    expires_before = datetime.now() - timedelta(seconds=get_billing_settings().BALANCE_HOLD_TTL_S)
+    return select(BalanceHold.id) \
+        .where(BalanceHold.user_id == user_id) \
+        .where(BalanceHold.created_at < expires_before)
 
 
 def withdraw_balance(user_id: uuid.UUID, amount: float, session: Session) -> None:
-    logger.info(f"Withdrawing {amount} from user {user_id}")
+    """
+    Debits the balance with one conditional UPDATE, so concurrent debits can neither overdraw it nor
+    overwrite each other. The BalanceHistory row is committed together with anything else pending in the session.
+    """
+    logger.info("Withdrawing %s from user %s", amount, user_id)
     if amount <= 0:
-        logger.error(f"Amount must be positive {amount}, user {user_id}")
+        logger.error("Amount must be positive %s, user %s", amount, user_id)
         raise Exception("Amount must be positive")
 
-    user = get_user_by_id(user_id, session)
-    if not user:
-        logger.error(f"User {user_id} not found")
+    new_balance = debit(user_id, amount, session)
+    session.add(BalanceHistory(user_id=user_id, amount_before_change=new_balance + amount, amount_change=-amount))
+    commit_user_change(user_id, session)
+    logger.info("Amount: %s withdrawed from user: %s", amount, user_id)
+
+
+def debit(user_id: uuid.UUID, amount: float, session: Session) -> float:
+    """
+    Raises when the balance doesn't cover the amount. Nothing is rolled back: the caller owns the transaction
+    and decides what happens to the rows it has pending.
+    """
+    new_balance = session.exec(debit_statement(user_id, amount)).scalar_one_or_none()
+    if new_balance is not None:
+        return new_balance
+
+    balance = session.exec(balance_statement(user_id)).first()
+    if balance is None:
+        logger.error("User %s not found", user_id)
         raise HTTPException(status_code=404, detail=str("User not found"))
+    logger.error("Insufissient balance: %s, amount: %s, user: %s", balance, amount, user_id)
+    raise HTTPException(status_code=400, detail=str("Insufficient balance"))
+
+
+def balance_statement(user_id: uuid.UUID):
+    return select(User.balance).where(User.id == user_id)
 
-    if user.balance < amount:
-        logger.error(f"Insufissient balance: {user.balance}, amount: {amount}, user: {user_id}")
-        raise HTTPException(status_code=400, detail=str("Insufficient balance"))
 
-    balance_history = BalanceHistory(user_id=user.id, amount_before_change=user.balance, amount_change=-amount)
+def reserve_balance(user_id: uuid.UUID, amount: float, hold_id: uuid.UUID, session: Session) -> float:
+    """
+    Takes `amount` off the balance when a task is submitted and records it as a hold, so in-flight tasks
+    can't together spend more than the balance. The worker later settles or releases the hold.
+    """
+    logger.info("Reserving %s from user %s, hold %s", amount, user_id, hold_id)
+    release_expired_holds(user_id, session)
+    new_balance = debit(user_id, amount, session)
+    session.add(BalanceHold(id=hold_id, user_id=user_id, amount=amount, balance_before=new_balance + amount))
+    commit_user_change(user_id, session)
+    return new_balance
 
-    user.balance -= amount
-    session.add(balance_history)
+
+def settle_hold(hold_id: uuid.UUID, session: Session) -> bool:
+    """Turns the hold into a BalanceHistory entry. Returns False when there is no such hold."""
+    row = session.exec(delete_hold_statement(hold_id)).first()
+    if not row:
+        return False
+
+    user_id, amount, balance_before = row
+    session.add(BalanceHistory(user_id=user_id, amount_before_change=balance_before, amount_change=-amount))
     session.commit()
-    session.refresh(user)
-    logger.info(f"Amount: {amount} withdrawed from user: {user_id}")
+    logger.info("Hold %s of %s settled for user %s", hold_id, amount, user_id)
+    return True
+
 
+def release_hold(hold_id: uuid.UUID, session: Session) -> bool:
+    """Gives the held amount back to the user. Returns False when there is no such hold."""
+    row = session.exec(delete_hold_statement(hold_id)).first()
+    if not row:
+        return False
 
-def get_balance_histories(user_id: uuid.UUID, session: Session) -> List[BalanceHistory]:
+    user_id, amount, _ = row
+    session.exec(update(User).where(User.id == user_id).values(balance=User.balance + amount))
+    commit_user_change(user_id, session)
+    logger.info("Hold %s of %s released for user %s", hold_id, amount, user_id)
+    return True
 
-    statement = select(BalanceHistory) \
-        .where(BalanceHistory.user_id == user_id) \
-        .order_by(BalanceHistory.timestamp.desc())
 
-    result = session.exec(statement).all()
-    return result
+def release_expired_holds(user_id: uuid.UUID, session: Session) -> None:
+    """Releases holds of tasks that never completed, e.g. because their message was lost."""
+    for hold_id in session.exec(expired_holds_statement(user_id)).all():
+        release_hold(hold_id, session)
 
 
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
+def charge_task(user_id: uuid.UUID, amount: float, hold_id: uuid.UUID, session: Session) -> None:
+    """Settles the hold reserved for the task, or debits the balance directly when it has none."""
+    if not settle_hold(hold_id, session):
+        withdraw_balance(user_id, amount, session)
+
+
+def get_balance_histories(user_id: uuid.UUID, session: Session, cursor: Optional[str] = None,
+                          limit: int = HISTORY_PAGE_SIZE) -> Tuple[List[BalanceHistory], Optional[str]]:
+    """Returns a page of the user's balance changes, newest first, and the cursor of the next page."""
+    statement = apply_keyset(select(BalanceHistory).where(BalanceHistory.user_id == user_id),
+                             BalanceHistory.timestamp, BalanceHistory.id, cursor, limit)
+    return split_page(session.exec(statement).all(), limit, lambda history: (history.timestamp, history.id))
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or get_auth_settings().BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with another work factor than BCRYPT_ROUNDS, e.g. before it was changed."""
+    try:
+        rounds = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != get_auth_settings().BCRYPT_ROUNDS
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
         plain_password.encode('utf-8'),
@@ -98,7 +214,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def find_and_verify_user(email: str, password: str, session: Session) -> User:
     user = get_user_by_email(email, session)
     if not user or not verify_password(password, user.hashed_password):
-        logger.error(f"Invalid credentials for user {email}")
+        logger.error("Invalid credentials for user %s", email)
 
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return user
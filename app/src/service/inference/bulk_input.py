@@ -0,0 +1,63 @@
+import csv
+import json
+from typing import Iterator, Optional, Tuple, BinaryIO
+
+from config.constants import CSV_FORMAT, JSONL_FORMAT
+
+
+def input_format_from_filename(filename: str) -> Optional[str]:
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension == CSV_FORMAT:
+        return CSV_FORMAT
+    if extension in (JSONL_FORMAT, "ndjson"):
+        return JSONL_FORMAT
+    return None
+
+
+def _lines(file: BinaryIO, position: list) -> Iterator[str]:
+    # Lines are read from the binary file so that the byte offset after every record is known; csv.reader
+    # pulls lines one by one, so the offset is exact even for quoted fields spanning several lines.
+    for line in iter(file.readline, b""):
+        position[0] += len(line)
+        yield line.decode("utf-8")
+
+
+def _read_csv_header(file: BinaryIO) -> Tuple[list, int]:
+    position = [0]
+    file.seek(0)
+    header = next(csv.reader(_lines(file, position)), [])
+    if header:
+        header[0] = header[0].lstrip("\ufeff")
+    return header, position[0]
+
+
+def iter_rows(path: str, input_format: str, text_field: str, offset: int = 0) -> Iterator[Tuple[Optional[str], int]]:
+    """
+    Yields (text, end offset) for every row of a CSV or JSONL file starting at byte `offset`, reading one
+    record at a time. The text is None for rows without a string `text_field`; the end offset can be
+    passed back as `offset` to continue after that row.
+    """
+    with open(path, "rb") as file:
+        if input_format == CSV_FORMAT:
+            header, header_end = _read_csv_header(file)
+            if text_field not in header:
+                raise ValueError(f"CSV header has no '{text_field}' column")
+            column = header.index(text_field)
+            position = [max(offset, header_end)]
+            file.seek(position[0])
+            for row in csv.reader(_lines(file, position)):
+                yield (row[column] if len(row) > column else None), position[0]
+        elif input_format == JSONL_FORMAT:
+            position = [offset]
+            file.seek(offset)
+            for line in _lines(file, position):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                text = record.get(text_field) if isinstance(record, dict) else None
+                yield (text if isinstance(text, str) else None), position[0]
+        else:
+            raise ValueError(f"Unsupported input format '{input_format}'")
@@ -0,0 +1,122 @@
+import inspect
+import logging
+import os
+from abc import ABC, abstractmethod
+
+import torch
+
+from config.constants import TORCH_ENGINE, ONNX_ENGINE
+from config.inference_config import get_inference_settings
+
+logger = logging.getLogger(__name__)
+
+ONNX_FILE_NAME = "model.onnx"
+PARITY_TEXTS = [
+    "I love this product, it works perfectly!",
+    "This is the worst service I have ever used.",
+    "The package arrived on Tuesday.",
+    "Не очень понравилось, но в целом терпимо.",
+]
+
+
+class InferenceEngine(ABC):
+    name: str
+
+    @abstractmethod
+    def forward(self, inputs: dict) -> torch.Tensor:
+        """Runs one padded batch of tokenizer outputs and returns the logits."""
+        pass
+
+
+class TorchEngine(InferenceEngine):
+    name = TORCH_ENGINE
+
+    def __init__(self, model: torch.nn.Module):
+        self.model = model
+
+    def forward(self, inputs: dict) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+
+class OnnxEngine(InferenceEngine):
+    name = ONNX_ENGINE
+
+    def __init__(self, session):
+        self.session = session
+        self.input_names = [model_input.name for model_input in session.get_inputs()]
+
+    def forward(self, inputs: dict) -> torch.Tensor:
+        feed = {name: inputs[name].numpy() for name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        return torch.from_numpy(logits)
+
+
+def export_onnx(model: torch.nn.Module, tokenizer, onnx_path: str) -> None:
+    logger.info("Exporting model to ONNX at '%s'", onnx_path)
+    sample = tokenizer(PARITY_TEXTS[:2], return_tensors="pt", padding=True)
+    # Inputs are passed positionally, so they must follow the order of the model's forward() signature.
+    input_names = [name for name in inspect.signature(model.forward).parameters if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    # Export to a temporary file first so that concurrently starting workers never load a half-written graph.
+    tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    os.replace(tmp_path, onnx_path)
+    logger.info("Model exported to ONNX at '%s'", onnx_path)
+
+
+def create_onnx_session(onnx_path: str):
+    import onnxruntime
+
+    settings = get_inference_settings()
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.ONNX_INTRA_OP_THREADS:
+        options.intra_op_num_threads = settings.ONNX_INTRA_OP_THREADS
+    return onnxruntime.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def check_parity(reference: InferenceEngine, candidate: InferenceEngine, tokenizer, atol: float) -> bool:
+    inputs = dict(tokenizer(PARITY_TEXTS, return_tensors="pt", padding=True, truncation=True, max_length=512))
+    expected = reference.forward(inputs)
+    actual = candidate.forward(inputs)
+    max_diff = (expected - actual).abs().max().item()
+    same_labels = torch.equal(expected.argmax(dim=-1), actual.argmax(dim=-1))
+    logger.info("Parity check %s vs %s: max logit diff %s, same labels: %s", candidate.name, reference.name, max_diff,
+                same_labels)
+    return same_labels and max_diff <= atol
+
+
+def build_engine(engine_name: str, model: torch.nn.Module, tokenizer, model_dir: str) -> InferenceEngine:
+    torch_engine = TorchEngine(model)
+    if engine_name == TORCH_ENGINE:
+        return torch_engine
+    if engine_name != ONNX_ENGINE:
+        logger.warning("Unknown inference engine '%s', using %s", engine_name, TORCH_ENGINE)
+        return torch_engine
+
+    try:
+        onnx_path = os.path.join(model_dir, ONNX_FILE_NAME)
+        if not os.path.exists(onnx_path):
+            export_onnx(model, tokenizer, onnx_path)
+        onnx_engine = OnnxEngine(create_onnx_session(onnx_path))
+    except Exception as e:
+        logger.error("Could not create %s engine from '%s', using %s: %s", ONNX_ENGINE, model_dir, TORCH_ENGINE, e)
+        return torch_engine
+
+    if not check_parity(torch_engine, onnx_engine, tokenizer, get_inference_settings().ONNX_PARITY_ATOL):
+        logger.error("%s engine for '%s' does not match torch output, using %s", ONNX_ENGINE, model_dir, TORCH_ENGINE)
+        return torch_engine
+    return onnx_engine
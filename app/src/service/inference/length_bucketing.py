@@ -0,0 +1,46 @@
+from typing import List
+
+from config.metrics import INFERENCE_PADDING_EFFICIENCY, INFERENCE_TOKENS
+
+
+def make_buckets(lengths: List[int], boundaries: List[int], max_batch_size: int) -> List[List[int]]:
+    """
+    Groups input indices by token length. Indices are sorted by length and split whenever the next
+    input falls into a larger bucket boundary or the current bucket is full, so each bucket only
+    has to be padded to the longest input it contains.
+    """
+    boundaries = sorted(boundaries)
+    buckets = []
+    current, current_bound = [], None
+
+    for idx in sorted(range(len(lengths)), key=lengths.__getitem__):
+        bound = next((b for b in boundaries if lengths[idx] <= b), None)
+        if current and (bound != current_bound or len(current) >= max_batch_size):
+            buckets.append(current)
+            current = []
+        current.append(idx)
+        current_bound = bound
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def padded_token_count(lengths: List[int], buckets: List[List[int]]) -> int:
+    return sum(len(bucket) * max(lengths[i] for i in bucket) for bucket in buckets)
+
+
+def padding_efficiency(lengths: List[int], buckets: List[List[int]]) -> float:
+    padded_tokens = padded_token_count(lengths, buckets)
+    return sum(lengths) / padded_tokens if padded_tokens else 1.0
+
+
+def record_padding_efficiency(lengths: List[int], buckets: List[List[int]]) -> float:
+    real_tokens = sum(lengths)
+    padded_tokens = padded_token_count(lengths, buckets)
+    efficiency = padding_efficiency(lengths, buckets)
+
+    INFERENCE_TOKENS.labels(kind="real").inc(real_tokens)
+    INFERENCE_TOKENS.labels(kind="padding").inc(padded_tokens - real_tokens)
+    INFERENCE_PADDING_EFFICIENCY.observe(efficiency)
+    return efficiency
@@ -0,0 +1,41 @@
+import logging
+import os
+from typing import Optional
+
+from config.metrics import WORKER_PROCESS_MEMORY
+
+logger = logging.getLogger(__name__)
+
+
+def read_memory_stats(pid: int) -> Optional[dict]:
+    """
+    Returns RSS, PSS and USS (private clean + private dirty) of a process in bytes, read from
+    /proc/<pid>/smaps_rollup. Pages shared copy-on-write with the parent count towards PSS
+    proportionally and not at all towards USS. Returns None where smaps_rollup is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            values = {}
+            for line in smaps:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return None
+
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def record_memory_stats(label: str) -> Optional[dict]:
+    stats = read_memory_stats(os.getpid())
+    if stats is None:
+        return None
+    for kind, value in stats.items():
+        WORKER_PROCESS_MEMORY.labels(kind=kind).set(value)
+    logger.info("Memory of %s process %s: rss %s MiB, pss %s MiB, uss %s MiB", label, os.getpid(),
+                stats['rss'] // 2 ** 20, stats['pss'] // 2 ** 20, stats['uss'] // 2 ** 20)
+    return stats
@@ -0,0 +1,101 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, List
+
+from config.inference_config import get_inference_settings
+from config.metrics import PREDICTION_BATCH_SIZE, PREDICTION_BATCH_WAIT_LATENCY
+from entities.ml_model.classification_model import ClassificationModel
+from entities.ml_model.inference_input import InferenceInput
+from service.crud.model_service import make_batch_prediction
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionBatcher:
+    """
+    Collects texts submitted by concurrently running prediction tasks and runs them through
+    the model as one batch. A batch is flushed when it reaches `max_batch_size` items or when
+    `max_wait_ms` has passed since its first item was queued, whichever comes first.
+    """
+
+    def __init__(self,
+                 predict_fn: Callable[[ClassificationModel, InferenceInput], List[str]],
+                 max_batch_size: int,
+                 max_wait_ms: int):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def submit(self, model: ClassificationModel, text: str) -> Future:
+        future = Future()
+        self._ensure_started()
+        self._queue.put((model, text, future, time.time()))
+        return future
+
+    def predict(self, model: ClassificationModel, text: str) -> str:
+        return self.submit(model, text).result()
+
+    def _ensure_started(self):
+        # The dispatcher thread does not survive a fork, so it is (re)started lazily in the process
+        # that actually submits work.
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            logger.info("Prediction batcher started, max_batch_size: %s, max_wait_ms: %s", self.max_batch_size,
+                        self.max_wait * 1000)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: list):
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[0].name, []).append(item)
+
+        for model_name, items in groups.items():
+            started_at = time.time()
+            for _, _, _, submitted_at in items:
+                PREDICTION_BATCH_WAIT_LATENCY.observe(started_at - submitted_at)
+            PREDICTION_BATCH_SIZE.observe(len(items))
+            try:
+                labels = self.predict_fn(items[0][0], InferenceInput([text for _, text, _, _ in items]))
+                for (_, _, future, _), label in zip(items, labels):
+                    future.set_result(label)
+            except Exception as exc:
+                logger.error("Batched prediction failed for model %s, size %s: %s", model_name, len(items), exc)
+                for _, _, future, _ in items:
+                    future.set_exception(exc)
+
+
+@lru_cache(maxsize=1)
+def get_prediction_batcher() -> PredictionBatcher:
+    settings = get_inference_settings()
+    return PredictionBatcher(
+        make_batch_prediction,
+        max_batch_size=settings.PREDICTION_BATCH_MAX_SIZE,
+        max_wait_ms=settings.PREDICTION_BATCH_MAX_WAIT_MS
+    )
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from config.inference_config import get_inference_settings
+from config.metrics import PREDICTION_CACHE_REQUESTS, PREDICTION_CACHE_EVICTIONS
+from entities.ml_model.classification_model import ClassificationModel
+
+logger = logging.getLogger(__name__)
+
+MEMORY_TIER = "memory"
+DISK_TIER = "disk"
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model: ClassificationModel, text: str) -> str:
+    """
+    Everything that can change a label is part of the key: the disk tier outlives a change of the long text
+    mode, precision or engine, and must not serve labels computed under the previous settings.
+    """
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    long_text_mode = get_inference_settings().INFERENCE_LONG_TEXT_MODE
+    return f"{model.id}:{model.version}:{long_text_mode}:{model.precision}:{model.engine}:{digest}"
+
+
+class LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> int:
+        """Stores the value and returns how many entries were evicted to make room for it."""
+        evicted = 0
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                evicted += 1
+        return evicted
+
+
+class DiskCache:
+    """
+    SQLite backed cache shared by every worker process that points to the same file.
+    Connections are opened per thread and per process, so the cache is safe to use after fork.
+    """
+
+    TRIM_EVERY = 1000
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._puts = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS predictions "
+                               "(key TEXT PRIMARY KEY, label TEXT NOT NULL, created_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_predictions_created_at ON predictions (created_at)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute("SELECT label FROM predictions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> int:
+        connection = self._connection()
+        connection.execute("INSERT OR REPLACE INTO predictions (key, label, created_at) VALUES (?, ?, ?)",
+                           (key, value, time.time()))
+        self._puts += 1
+        if self._puts % self.TRIM_EVERY:
+            return 0
+        cursor = connection.execute("DELETE FROM predictions WHERE key IN (SELECT key FROM predictions "
+                                    "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_size,))
+        return max(cursor.rowcount, 0)
+
+
+class PredictionCache:
+    """
+    Two-tier cache of prediction labels keyed by (model id, model version, normalized text hash):
+    a bounded in-process LRU in front of an optional on-disk store shared by the workers of a host.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, model: ClassificationModel, text: str) -> Optional[str]:
+        key = cache_key(model, text)
+        label = self.memory.get(key)
+        self._record(MEMORY_TIER, label)
+        if label is not None or self.disk is None:
+            return label
+
+        try:
+            label = self.disk.get(key)
+        except sqlite3.Error as e:
+            logger.warning("Prediction disk cache lookup failed: %s", e)
+            label = None
+        self._record(DISK_TIER, label)
+        if label is not None:
+            PREDICTION_CACHE_EVICTIONS.labels(tier=MEMORY_TIER).inc(self.memory.put(key, label))
+        return label
+
+    def put(self, model: ClassificationModel, text: str, label: str) -> None:
+        key = cache_key(model, text)
+        PREDICTION_CACHE_EVICTIONS.labels(tier=MEMORY_TIER).inc(self.memory.put(key, label))
+        if self.disk is None:
+            return
+        try:
+            PREDICTION_CACHE_EVICTIONS.labels(tier=DISK_TIER).inc(self.disk.put(key, label))
+        except sqlite3.Error as e:
+            logger.warning("Prediction disk cache write failed: %s", e)
+
+    @staticmethod
+    def _record(tier: str, label: Optional[str]) -> None:
+        PREDICTION_CACHE_REQUESTS.labels(tier=tier, result="hit" if label is not None else "miss").inc()
+
+
+@lru_cache(maxsize=1)
+def get_prediction_cache() -> Optional[PredictionCache]:
+    settings = get_inference_settings()
+    if not settings.PREDICTION_CACHE_ENABLED:
+        return None
+    disk = None
+    if settings.PREDICTION_CACHE_DISK_PATH:
+        disk = DiskCache(settings.PREDICTION_CACHE_DISK_PATH, settings.PREDICTION_CACHE_DISK_MAX_SIZE)
+    return PredictionCache(LRUCache(settings.PREDICTION_CACHE_MEMORY_MAX_SIZE), disk)
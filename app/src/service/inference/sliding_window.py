@@ -0,0 +1,23 @@
+from typing import List
+
+import torch
+
+from config.constants import LENGTH_WEIGHTED_AGGREGATION
+
+
+def aggregate_windows(probabilities: torch.Tensor, window_to_text: List[int], lengths: List[int],
+                      num_texts: int, aggregation: str) -> torch.Tensor:
+    """
+    Folds per-window class probabilities back into one row per text, either as a plain mean over
+    the windows of a text or weighted by the number of tokens in each window.
+    """
+    if aggregation == LENGTH_WEIGHTED_AGGREGATION:
+        weights = torch.tensor(lengths, dtype=probabilities.dtype)
+    else:
+        weights = torch.ones(len(lengths), dtype=probabilities.dtype)
+    index = torch.tensor(window_to_text)
+
+    sums = torch.zeros(num_texts, probabilities.shape[1], dtype=probabilities.dtype)
+    sums.index_add_(0, index, probabilities * weights[:, None])
+    totals = torch.zeros(num_texts, dtype=probabilities.dtype).index_add_(0, index, weights)
+    return sums / totals[:, None]
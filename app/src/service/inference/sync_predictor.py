@@ -0,0 +1,67 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional
+
+from config.inference_config import get_inference_settings
+from database.database import session_scope
+from entities.ml_model.inference_input import InferenceInput
+from entities.task.prediction_request import PredictionRequest
+from exceptions.model_exception import ModelException
+from service.crud.model_service import get_model_by_name, make_prediction, prepare_task
+from service.crud.user_service import charge_task, release_hold
+
+logger = logging.getLogger(__name__)
+
+
+class SyncPredictor:
+    """
+    Bounded thread pool that runs predictions inside the API process. At most `max_workers` predictions
+    run at once and `max_queued` more may wait for a thread; `try_submit` refuses anything beyond that,
+    so the caller can hand the request to Celery instead of letting latency grow.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sync-predictor")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def try_submit(self, fn: Callable, *args) -> Optional[Future]:
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+def predict_and_save(prediction_request: dict, task_id: uuid.UUID, model_name: str) -> str:
+    """Same steps as the perform_prediction Celery task, but returns the label to the caller."""
+    logger.info("Starting sync prediction task_id %s", task_id)
+    with session_scope() as session:
+        model = get_model_by_name(model_name, session)
+        request = PredictionRequest(**prediction_request)
+        try:
+            result = make_prediction(model, InferenceInput(request.inference_input))
+            prepare_task(request, result, True, model.prediction_cost, task_id, session)
+            charge_task(request.user_id, model.prediction_cost, task_id, session)
+            logger.info("Succeeded sync prediction task_id %s", task_id)
+            return result
+        except Exception as exc:
+            session.rollback()
+            error_mes = f"Error during model prediction {exc}"
+            logger.info("Error during sync prediction, task_id %s, %s, saving failed task", task_id, exc)
+            prepare_task(request, error_mes, False, 0, task_id, session)
+            release_hold(task_id, session)
+            session.commit()
+            raise ModelException(error_mes, 500)
+
+
+@lru_cache(maxsize=1)
+def get_sync_predictor() -> SyncPredictor:
+    settings = get_inference_settings()
+    return SyncPredictor(settings.SYNC_PREDICTION_MAX_WORKERS, settings.SYNC_PREDICTION_MAX_QUEUED)
@@ -0,0 +1,51 @@
+from typing import List
+
+import torch
+
+from config.constants import SLIDING_WINDOW_MODE
+from config.inference_config import get_inference_settings
+from entities.ml_model.classification_model import SENTIMENT_MAP
+from service.inference.engines import InferenceEngine
+from service.inference.length_bucketing import make_buckets, record_padding_efficiency
+from service.inference.sliding_window import aggregate_windows
+
+
+class TextClassifier:
+    """
+    Runs a tokenizer and an inference engine over a list of texts. Inputs are grouped into length buckets
+    so each forward pass is only padded to its longest input; texts longer than the model's window are split
+    into overlapping windows when the sliding window mode is on.
+    """
+
+    def __init__(self, tokenizer: object, engine: InferenceEngine):
+        self.tokenizer = tokenizer
+        self.engine = engine
+
+    def predict(self, texts: List[str]) -> List[str]:
+        settings = get_inference_settings()
+        sliding_window = settings.INFERENCE_LONG_TEXT_MODE == SLIDING_WINDOW_MODE
+        if sliding_window:
+            # Texts longer than max_length are split by the tokenizer itself into overlapping windows,
+            # overflow_to_sample_mapping tells which text every window belongs to.
+            encodings = self.tokenizer(texts, truncation=True, max_length=512,
+                                       stride=settings.INFERENCE_WINDOW_STRIDE, return_overflowing_tokens=True)
+            window_to_text = encodings.pop("overflow_to_sample_mapping")
+        else:
+            encodings = self.tokenizer(texts, truncation=True, max_length=512)
+        lengths = [len(input_ids) for input_ids in encodings["input_ids"]]
+        buckets = make_buckets(lengths, settings.INFERENCE_BUCKET_BOUNDARIES, settings.INFERENCE_MAX_BATCH_SIZE)
+        record_padding_efficiency(lengths, buckets)
+
+        probabilities = [None] * len(lengths)
+        for bucket in buckets:
+            features = [{key: encodings[key][i] for key in encodings.keys()} for i in bucket]
+            inputs = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+            for i, row in zip(bucket, torch.nn.functional.softmax(self.engine.forward(inputs), dim=-1)):
+                probabilities[i] = row
+        probabilities = torch.stack(probabilities)
+
+        if sliding_window:
+            probabilities = aggregate_windows(probabilities, window_to_text, lengths, len(texts),
+                                              settings.INFERENCE_WINDOW_AGGREGATION)
+        predictions = torch.argmax(probabilities, dim=-1).tolist()
+        return [SENTIMENT_MAP[p] for p in predictions]
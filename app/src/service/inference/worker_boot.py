@@ -0,0 +1,102 @@
+import gc
+import glob
+import logging
+import os
+import threading
+import time
+from typing import List
+
+from sqlmodel import Session
+
+from entities.ml_model.classification_model import ClassificationModel
+from entities.ml_model.inference_input import InferenceInput
+from service.crud.model_service import get_active_models, get_model_by_name
+
+logger = logging.getLogger(__name__)
+
+WARMUP_WORD = "warmup"
+CHILD_MARKER_INFIX = ".child."
+
+_preloaded_models: List[ClassificationModel] = []
+
+
+def preload_active_models(session: Session) -> List[ClassificationModel]:
+    """Loads the weights of every active model into this process, so tasks never pay for the first load."""
+    models = []
+    for active_model in get_active_models(session):
+        started_at = time.time()
+        model = get_model_by_name(active_model.name, session)
+        models.append(model)
+        logger.info("Model '%s' preloaded in %.2fs", model.name, time.time() - started_at)
+    _preloaded_models[:] = models
+    return models
+
+
+def take_preloaded_models() -> List[ClassificationModel]:
+    """
+    Hands the preloaded models over to the caller and forgets them, so a model the registry evicts later is
+    freed. A prefork parent never takes them: every child it forks, respawned ones too, takes its own copy.
+    """
+    models = list(_preloaded_models)
+    _preloaded_models.clear()
+    return models
+
+
+def freeze_preloaded_objects() -> None:
+    """
+    Moves every object allocated so far (the preloaded models included) to the permanent GC generation.
+    Collections in forked children then never write to those objects, so their pages stay shared
+    copy-on-write with the parent instead of being copied into every child.
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info("Frozen %s objects before forking the pool", gc.get_freeze_count())
+
+
+def warm_up(models: List[ClassificationModel], lengths: List[int]) -> None:
+    """
+    Runs forward passes of roughly the given token lengths. The model is called directly rather than
+    through make_prediction so the warm-up texts never reach the prediction cache.
+    """
+    for model in models:
+        for length in lengths:
+            started_at = time.time()
+            model.predict(InferenceInput([" ".join([WARMUP_WORD] * length)]))
+            logger.info("Model '%s' warmed up with length %s in %.2fs", model.name, length, time.time() - started_at)
+
+
+def mark_worker_ready(path: str) -> None:
+    with open(path, "w") as ready_file:
+        ready_file.write(str(os.getpid()))
+    logger.info("Worker ready, marker written to %s", path)
+
+
+def mark_child_ready(path: str) -> None:
+    """Written by a pool child once it is warmed up, next to the worker's own ready marker."""
+    with open(f"{path}{CHILD_MARKER_INFIX}{os.getpid()}", "w") as ready_file:
+        ready_file.write(str(os.getpid()))
+
+
+def count_ready_children(path: str) -> int:
+    return len(glob.glob(glob.escape(path) + CHILD_MARKER_INFIX + "*"))
+
+
+def mark_worker_ready_after_children(path: str, children: int, poll_interval_s: float = 0.5) -> threading.Thread:
+    """
+    The worker is ready once the consumer runs and every pool child is warmed up, but Celery doesn't wait for
+    the children before worker_ready. A background thread writes the marker once `children` of them are.
+    """
+    def wait_for_children():
+        while count_ready_children(path) < children:
+            time.sleep(poll_interval_s)
+        mark_worker_ready(path)
+
+    thread = threading.Thread(target=wait_for_children, name="worker-ready", daemon=True)
+    thread.start()
+    return thread
+
+
+def clear_worker_ready(path: str) -> None:
+    for marker in [path] + glob.glob(glob.escape(path) + CHILD_MARKER_INFIX + "*"):
+        if os.path.exists(marker):
+            os.remove(marker)
@@ -1,14 +1,45 @@
 import os
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional
 
+import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
-from config.constants import DEFAULT_MODEL_NAME
+from config.constants import DEFAULT_MODEL_NAME, DEFAULT_MODEL_REPO, TORCH_ENGINE, ONNX_ENGINE, FP32_PRECISION
+from config.inference_config import get_inference_settings
+from config.metrics import MODEL_REGISTRY_RESIDENT_MODELS, MODEL_REGISTRY_RESIDENT_BYTES, MODEL_REGISTRY_EVICTIONS
+from exceptions.model_exception import ModelException
+from service.inference.engines import InferenceEngine, build_engine
+from service.inference.text_classifier import TextClassifier
+from service.loaders.precision import build_precision_variant
 
 logger = logging.getLogger(__name__)
 
 
+def model_size_bytes(model: torch.nn.Module) -> int:
+    """Size of the weights from the state dict, which unlike parameters() includes packed quantized weights."""
+    size = 0
+    for value in model.state_dict().values():
+        # Dynamically quantized layers keep their packed weights in tuples.
+        tensors = value if isinstance(value, tuple) else (value,)
+        size += sum(t.numel() * t.element_size() for t in tensors if isinstance(t, torch.Tensor))
+    return size
+
+
 class ModelLoader:
+    """
+    Registry of the models resident in this process.
+
+    Models are resolved to a local artifact directory (the row's artifact_path, or <cache_dir>/<name>)
+    and downloaded from their source repo only when that directory does not exist. At most
+    MODEL_REGISTRY_MAX_MODELS models (and MODEL_REGISTRY_MAX_BYTES of weights, when set) stay resident;
+    the least recently used ones are evicted first. Concurrent requests for a model that is still
+    loading wait for that single load instead of starting their own.
+    """
+
     def __init__(self, cache_dir: str = None):
         if cache_dir is None:
             base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../ml_models"))
@@ -16,29 +47,131 @@ class ModelLoader:
         self.cache_dir = cache_dir
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
-            logger.info(f"Created cache directory at {self.cache_dir}")
-        self.loaded_models = {}
+            logger.info("Created cache directory at %s", self.cache_dir)
+        self.artifacts = {DEFAULT_MODEL_NAME: (None, DEFAULT_MODEL_REPO)}
+        self.loaded_models = OrderedDict()
+        self.loaded_engines = {}
+        self._pending = {}
+        self._lock = threading.RLock()
+
+    def register(self, model_name: str, artifact_path: Optional[str] = None, source_repo: Optional[str] = None):
+        with self._lock:
+            default_path, default_repo = self.artifacts.get(model_name, (None, None))
+            self.artifacts[model_name] = (artifact_path or default_path, source_repo or default_repo)
+
+    def get_model_path(self, model_name: str) -> str:
+        artifact_path, _ = self.artifacts.get(model_name, (None, None))
+        if artifact_path is None:
+            return os.path.join(self.cache_dir, model_name)
+        return artifact_path if os.path.isabs(artifact_path) else os.path.join(self.cache_dir, artifact_path)
+
+    def get_model(self, model_name: str = DEFAULT_MODEL_NAME, precision: str = FP32_PRECISION):
+        if precision == FP32_PRECISION:
+            return self._get_or_load(self.loaded_models, (model_name, precision),
+                                     lambda: self._load_model(model_name))
+
+        def load_variant():
+            # The variant is built from the resident fp32 model when there is one. Otherwise fp32 is loaded
+            # just for the conversion and not registered, so only the variant stays in memory.
+            with self._lock:
+                resident = self.loaded_models.get((model_name, FP32_PRECISION))
+            model, tokenizer = resident if resident is not None else self._load_model(model_name)
+            return build_precision_variant(model, tokenizer, precision), tokenizer
+
+        return self._get_or_load(self.loaded_models, (model_name, precision), load_variant)
+
+    def get_engine(self, model_name: str = DEFAULT_MODEL_NAME, engine_name: str = TORCH_ENGINE,
+                   precision: str = FP32_PRECISION) -> InferenceEngine:
+        if engine_name == ONNX_ENGINE and precision != FP32_PRECISION:
+            logger.warning("Precision '%s' is not supported by the %s engine, exporting the %s model of '%s'.",
+                           precision, ONNX_ENGINE, FP32_PRECISION, model_name)
+            precision = FP32_PRECISION
+
+        def load_engine():
+            model, tokenizer = self.get_model(model_name, precision)
+            engine = build_engine(engine_name, model, tokenizer, self.get_model_path(model_name))
+            logger.info("Using '%s' inference engine for model '%s'.", engine.name, model_name)
+            return engine
 
-    def get_model(self, model_name: str = DEFAULT_MODEL_NAME):
-        if model_name in self.loaded_models:
-            logger.info(f"Model '{model_name}' already loaded, returning from cache.")
-            return self.loaded_models[model_name]
+        return self._get_or_load(self.loaded_engines, (model_name, precision, engine_name), load_engine)
 
-        local_path = os.path.join(self.cache_dir, model_name)
+    def get_classifier(self, model_name: str = DEFAULT_MODEL_NAME, engine_name: str = TORCH_ENGINE,
+                       precision: str = FP32_PRECISION) -> TextClassifier:
+        _, tokenizer = self.get_model(model_name, precision)
+        return TextClassifier(tokenizer, self.get_engine(model_name, engine_name, precision))
+
+    def _load_model(self, model_name: str):
+        local_path = self.get_model_path(model_name)
         if os.path.exists(local_path):
-            logger.info(f"Loading model '{model_name}' from local cache at '{local_path}'.")
+            logger.info("Loading model '%s' from local cache at '%s'.", model_name, local_path)
             tokenizer = AutoTokenizer.from_pretrained(local_path)
             model = AutoModelForSequenceClassification.from_pretrained(local_path)
-            logger.info(f"Loaded model '{model_name}' from local cache at '{local_path}'.")
-            self.loaded_models[model_name] = (model, tokenizer)
-        else:
-            logger.info(f"Loading model '{model_name}' from Hugging Face.")
-            repo: str = "tabularisai/multilingual-sentiment-analysis"
-            tokenizer = AutoTokenizer.from_pretrained(repo)
-            model = AutoModelForSequenceClassification.from_pretrained(repo)
-            model_path = os.path.join(self.cache_dir, DEFAULT_MODEL_NAME)
-            model.save_pretrained(model_path)
-            tokenizer.save_pretrained(model_path)
-            self.loaded_models[DEFAULT_MODEL_NAME] = (model, tokenizer)
-            logger.info(f"Downloaded and saved model '{DEFAULT_MODEL_NAME}' to local cache at '{model_path}'.")
-        return self.loaded_models[model_name]
+            logger.info("Loaded model '%s' from local cache at '%s'.", model_name, local_path)
+            return model, tokenizer
+
+        _, repo = self.artifacts.get(model_name, (None, None))
+        if repo is None:
+            raise ModelException(f"Model '{model_name}' has no artifact at '{local_path}' and no source repo", 404)
+        logger.info("Loading model '%s' from Hugging Face repo '%s'.", model_name, repo)
+        tokenizer = AutoTokenizer.from_pretrained(repo)
+        model = AutoModelForSequenceClassification.from_pretrained(repo)
+        model.save_pretrained(local_path)
+        tokenizer.save_pretrained(local_path)
+        logger.info("Downloaded and saved model '%s' to local cache at '%s'.", model_name, local_path)
+        return model, tokenizer
+
+    def _get_or_load(self, cache: dict, key: tuple, load: Callable):
+        with self._lock:
+            if key in cache:
+                if cache is self.loaded_models:
+                    self.loaded_models.move_to_end(key)
+                return cache[key]
+            pending = self._pending.get(key)
+            is_loader = pending is None
+            if is_loader:
+                pending = self._pending[key] = Future()
+
+        if not is_loader:
+            logger.info("Waiting for %s to be loaded by another thread.", key)
+            return pending.result()
+
+        try:
+            value = load()
+        except Exception as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            cache[key] = value
+            del self._pending[key]
+            if cache is self.loaded_models:
+                self._evict(keep=key)
+        pending.set_result(value)
+        return value
+
+    def _evict(self, keep: tuple):
+        settings = get_inference_settings()
+        sizes = {key: model_size_bytes(model) for key, (model, _) in self.loaded_models.items()}
+
+        def over_limit():
+            if len(self.loaded_models) > settings.MODEL_REGISTRY_MAX_MODELS:
+                return True
+            return bool(settings.MODEL_REGISTRY_MAX_BYTES) and sum(sizes.values()) > settings.MODEL_REGISTRY_MAX_BYTES
+
+        for key in list(self.loaded_models):
+            if not over_limit():
+                break
+            if key == keep:
+                continue
+            model_name, precision = key
+            del self.loaded_models[key]
+            del sizes[key]
+            for engine_key in [k for k in self.loaded_engines if k[:2] == key]:
+                del self.loaded_engines[engine_key]
+            MODEL_REGISTRY_EVICTIONS.inc()
+            logger.info("Model '%s' (%s) evicted from the registry.", model_name, precision)
+
+        MODEL_REGISTRY_RESIDENT_MODELS.set(len(self.loaded_models))
+        MODEL_REGISTRY_RESIDENT_BYTES.set(sum(sizes.values()))
@@ -0,0 +1,100 @@
+import logging
+
+import torch
+
+from config.constants import FP32_PRECISION, INT8_PRECISION, BF16_PRECISION
+from config.inference_config import get_inference_settings
+
+logger = logging.getLogger(__name__)
+
+# Fixed validation set for the accuracy guardrail: a reduced-precision variant is only used when its
+# labels on these texts agree with the fp32 model often enough.
+VALIDATION_TEXTS = [
+    "I absolutely love this, best purchase of the year!",
+    "Great quality and fast delivery, very happy.",
+    "It works fine, nothing special.",
+    "The order arrived on Monday.",
+    "Not bad, but I expected more for the price.",
+    "Terrible experience, the product broke after one day.",
+    "I hate it. Complete waste of money.",
+    "Customer support never answered my emails.",
+    "Das Essen war ausgezeichnet und der Service freundlich.",
+    "Der Film war langweilig und viel zu lang.",
+    "El hotel estaba limpio y el personal fue muy amable.",
+    "La aplicación se cierra constantemente, es horrible.",
+    "Отличный сервис, всем рекомендую!",
+    "Ужасное качество, больше никогда не закажу.",
+    "Нормально, но могло быть и лучше.",
+    "Le colis est arrivé en retard et abîmé.",
+    "C'est correct, sans plus.",
+    "Questo ristorante è fantastico!",
+    "The update made everything slower and buggier.",
+    "Okay I guess.",
+]
+
+
+class AutocastModule(torch.nn.Module):
+    """Runs the wrapped model under CPU autocast and returns fp32 logits."""
+
+    def __init__(self, model: torch.nn.Module, dtype: torch.dtype):
+        super().__init__()
+        self.model = model
+        self.dtype = dtype
+        self.config = model.config
+
+    def forward(self, **inputs):
+        with torch.autocast("cpu", dtype=self.dtype):
+            outputs = self.model(**inputs)
+        outputs.logits = outputs.logits.float()
+        return outputs
+
+
+def bf16_supported() -> bool:
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+def predict_labels(model: torch.nn.Module, tokenizer, texts: list) -> list:
+    inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=512)
+    with torch.no_grad():
+        return torch.argmax(model(**inputs).logits, dim=-1).tolist()
+
+
+def label_agreement(reference: torch.nn.Module, candidate: torch.nn.Module, tokenizer, texts: list) -> float:
+    expected = predict_labels(reference, tokenizer, texts)
+    actual = predict_labels(candidate, tokenizer, texts)
+    return sum(e == a for e, a in zip(expected, actual)) / len(texts)
+
+
+def build_precision_variant(model: torch.nn.Module, tokenizer, precision: str) -> torch.nn.Module:
+    """
+    Returns `model` converted to the requested precision, or the fp32 model itself when the variant
+    is unknown, not supported by this CPU or fails the label agreement guardrail.
+    """
+    if precision == FP32_PRECISION:
+        return model
+
+    if precision == INT8_PRECISION:
+        # Not in place: quantize_dynamic copies the model once, `model` stays fp32 for the guardrail.
+        variant = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif precision == BF16_PRECISION:
+        if not bf16_supported():
+            logger.warning("CPU does not support bf16, using %s", FP32_PRECISION)
+            return model
+        variant = AutocastModule(model, torch.bfloat16)
+    else:
+        logger.warning("Unknown precision '%s', using %s", precision, FP32_PRECISION)
+        return model
+    variant.eval()
+
+    threshold = get_inference_settings().PRECISION_MIN_LABEL_AGREEMENT
+    agreement = label_agreement(model, variant, tokenizer, VALIDATION_TEXTS)
+    logger.info("%s variant label agreement with %s: %s, threshold: %s", precision, FP32_PRECISION, agreement,
+                threshold)
+    if agreement < threshold:
+        logger.error("%s variant rejected, label agreement %s is below %s, using %s", precision, agreement, threshold,
+                     FP32_PRECISION)
+        return model
+    return variant
@@ -1,3 +1,5 @@
+from typing import List, Optional, Tuple
+
 from entities.task.prediction_task import PredictionTask, PredictionDTO
 
 
@@ -17,3 +19,14 @@ def prediction_task_to_dto(
         request_timestamp=task.request_timestamp,
         result_timestamp=task.result_timestamp
     )
+
+
+def prediction_tasks_to_dtos(
+        rows: List[Tuple[PredictionTask, Optional[str]]],
+        user_email: Optional[str] = None
+) -> List[PredictionDTO]:
+    """Maps (task, model name) rows as returned by the history queries. The task's email is used by default."""
+    return [
+        prediction_task_to_dto(task, user_email or task.user_email, model_name or "unknown")
+        for task, model_name in rows
+    ]
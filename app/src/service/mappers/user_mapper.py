@@ -1,4 +1,5 @@
 import uuid
+from typing import Optional
 
 from entities.user.user import UserDTO, User, UserSignUp
 from entities.user.user_role import UserRole
@@ -15,13 +16,14 @@ def user_to_user_dto(user: User) -> UserDTO:
     )
 
 
-def user_signup_dto_to_user(user_signup_dto: UserSignUp) -> User:
+def user_signup_dto_to_user(user_signup_dto: UserSignUp, hashed_password: Optional[str] = None) -> User:
+    """Hashes the password in the calling thread unless the caller already hashed it."""
     return User(
         id=uuid.uuid4(),
         email=user_signup_dto.email,
         name=user_signup_dto.name,
         surname=user_signup_dto.surname,
-        hashed_password=hash_password(user_signup_dto.password),
+        hashed_password=hashed_password or hash_password(user_signup_dto.password),
         balance=0.0,
         role=UserRole.USER
     )
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Optional
+
+from config.db_config import get_settings
+from config.notification_config import get_notification_settings
+from config.user_cache_config import get_user_cache_settings
+from service.auth.user_cache import get_user_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ResultListener:
+    """
+    Holds the API's single LISTEN connection on the results channel and fans notifications out on the
+    event loop: to the stream queues of the notified user, and to long polls waiting for a task or batch id.
+    Other channels can share the connection through `add_handler`.
+    """
+
+    def __init__(self, channel: str, queue_size: int):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._waiters = defaultdict(set)
+        self._handlers = {}
+        self._loop = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_handler(self, channel: str, handler: Callable[[str], None]) -> None:
+        """Also LISTENs on `channel` and calls the handler on the event loop with each payload. Call before start."""
+        self._handlers[channel] = handler
+
+    def start(self, loop: asyncio.AbstractEventLoop, conninfo: str) -> None:
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(conninfo,), name="result-listener", daemon=True)
+        self._thread.start()
+        logger.info("Result listener started on channel %s", self.channel)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, conninfo: str) -> None:
+        import psycopg
+
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    for channel in (self.channel, *self._handlers):
+                        connection.execute(f"LISTEN {channel}")
+                    while not self._stop.is_set():
+                        for notify in connection.notifies(timeout=1.0):
+                            handler = self._handlers.get(notify.channel, self.dispatch)
+                            self._loop.call_soon_threadsafe(handler, notify.payload)
+            except Exception as e:
+                logger.error("Result listener connection failed, reconnecting: %s", e)
+                self._stop.wait(1.0)
+
+    def dispatch(self, payload: str) -> None:
+        """Runs on the event loop."""
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("Ignoring malformed result notification: %s", payload)
+            return
+
+        for queue in list(self._subscribers.get(data.get("user_id"), ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                logger.warning("Result stream of user %s is full, dropping notification", data.get('user_id'))
+        for key in (data.get("task_id"), data.get("batch_id")):
+            for future in self._waiters.pop(key, ()):
+                if not future.done():
+                    future.set_result(data)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        self._subscribers[user_id].discard(queue)
+        if not self._subscribers[user_id]:
+            del self._subscribers[user_id]
+
+    def register(self, key: str) -> asyncio.Future:
+        """Registers a waiter before the caller checks the database, so a notification in between is not lost."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[key].add(future)
+        return future
+
+    def unregister(self, key: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(key)
+        if waiters is not None:
+            waiters.discard(future)
+            if not waiters:
+                del self._waiters[key]
+
+    @staticmethod
+    async def wait(future: asyncio.Future, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+@lru_cache(maxsize=1)
+def get_result_listener() -> ResultListener:
+    settings = get_notification_settings()
+    return ResultListener(settings.RESULT_NOTIFY_CHANNEL, settings.RESULT_STREAM_QUEUE_SIZE)
+
+
+def start_result_listener(loop: asyncio.AbstractEventLoop) -> None:
+    db_settings = get_settings()
+    if not get_notification_settings().RESULT_LISTENER_ENABLED or not db_settings.DB_HOST:
+        logger.info("Result listener disabled, long polls fall back to re-checking the database")
+        return
+    listener = get_result_listener()
+    user_cache = get_user_cache()
+    if user_cache is not None:
+        listener.add_handler(get_user_cache_settings().USER_INVALIDATION_CHANNEL, user_cache.on_notification)
+    listener.start(loop, db_settings.DATABASE_URL_psycopg.replace("+psycopg", "", 1))
@@ -0,0 +1,21 @@
+import json
+import logging
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from config.notification_config import get_notification_settings
+
+logger = logging.getLogger(__name__)
+
+
+def notify_result(payload: dict, session: Session) -> None:
+    """
+    Queues a NOTIFY with the payload on the results channel. Postgres delivers it when the session's
+    transaction commits, so listeners never hear about rows they cannot read yet. No-op on other databases.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": get_notification_settings().RESULT_NOTIFY_CHANNEL,
+                     "payload": json.dumps(payload, default=str)})
@@ -0,0 +1,27 @@
+import uuid
+
+from sqlalchemy import text
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config.user_cache_config import get_user_cache_settings
+
+NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+
+
+def notify_user_changed(user_id: uuid.UUID, session: Session) -> None:
+    """
+    Queues a NOTIFY with the user id on the invalidation channel, so every API process drops the user from
+    its cache once the session's transaction commits. No-op on other databases.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    session.execute(NOTIFY_STATEMENT, {"channel": get_user_cache_settings().USER_INVALIDATION_CHANNEL,
+                                       "payload": str(user_id)})
+
+
+async def notify_user_changed_async(user_id: uuid.UUID, session: AsyncSession) -> None:
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    await session.execute(NOTIFY_STATEMENT, {"channel": get_user_cache_settings().USER_INVALIDATION_CHANNEL,
+                                             "payload": str(user_id)})
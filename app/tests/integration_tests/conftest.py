@@ -1,4 +1,6 @@
 import os
+import tempfile
+from contextlib import contextmanager, asynccontextmanager
 import pytest
 from celery.contrib.testing.worker import start_worker
 from starlette.testclient import TestClient
@@ -10,13 +12,16 @@ from entities.user.user import UserSignUp
 from entities.user.user_role import UserRole
 from main import app
 from service.auth.jwt_service import create_access_token
+from service.auth.user_cache import get_user_cache
 from service.crud.model_service import create_and_save_default_model, get_model_by_name
 from service.crud.user_service import get_user_by_email, create_user
 from service.mappers.user_mapper import user_signup_dto_to_user
 
 import database.database
-from sqlalchemy import StaticPool
+from sqlalchemy import StaticPool, NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from entities.auth.auth_entities import TokenData
 from entities.user.user import User
 from entities.user.balance_history import BalanceHistory
@@ -28,11 +33,14 @@ from entities.user.balance_history import BalanceHistory
 # os.environ["CELERY_BROKER_URL"] = "memory://"
 # os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
 
+# The routes use an aiosqlite engine and the worker a sync one, so both open the same database file.
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.sqlite3")
 test_engine = create_engine(
-    "sqlite:///:memory:",
+    f"sqlite:///{TEST_DB_PATH}",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool
 )
+test_async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
 SQLModel.metadata.create_all(test_engine)
 
 
@@ -41,7 +49,25 @@ def override_get_session():
         yield session
 
 
+@contextmanager
+def override_session_scope():
+    with Session(test_engine) as session:
+        yield session
+
+
+async def override_get_async_session():
+    async with AsyncSession(test_async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@asynccontextmanager
+async def override_async_session_scope():
+    async with AsyncSession(test_async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 app.dependency_overrides[database.database.get_session] = override_get_session
+app.dependency_overrides[database.database.get_async_session] = override_get_async_session
 
 
 @pytest.fixture(name="client")
@@ -79,7 +105,8 @@ def token(default_user):
 
 @pytest.fixture
 def patched_client(client, token, monkeypatch):
-    monkeypatch.setattr("main.get_session", override_get_session)
+    monkeypatch.setattr("service.auth.access_middleware.async_session_scope", override_async_session_scope)
+    monkeypatch.setattr("routes.prediction_router.async_session_scope", override_async_session_scope)
     client.cookies.set(get_auth_settings().COOKIE_NAME, f"Bearer {token}")
     return client
 
@@ -117,7 +144,8 @@ def admin_token(admin):
 @pytest.fixture
 def admin_client(admin_token, monkeypatch):
     adm_client = TestClient(app)
-    monkeypatch.setattr("main.get_session", override_get_session)
+    monkeypatch.setattr("service.auth.access_middleware.async_session_scope", override_async_session_scope)
+    monkeypatch.setattr("routes.prediction_router.async_session_scope", override_async_session_scope)
     adm_client.cookies.set(get_auth_settings().COOKIE_NAME, f"Bearer {admin_token}")
     return adm_client
 
@@ -133,9 +161,15 @@ def create_default_model():
     yield
 
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    # Fixtures change users directly in the database, past the invalidation of the user services.
+    get_user_cache().clear()
+
+
 @pytest.fixture(autouse=True)
 def patch_session_in_celery(monkeypatch):
-    monkeypatch.setattr("celery_worker.get_session", override_get_session)
+    monkeypatch.setattr("celery_worker.session_scope", override_session_scope)
 
 
 @pytest.fixture(scope="session", autouse=True)
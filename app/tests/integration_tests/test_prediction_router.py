@@ -1,9 +1,16 @@
+import json
 import uuid
 from time import sleep
+from types import SimpleNamespace
 
 import pytest
+from sqlmodel import select
 
 from celery_worker import celery, perform_prediction
+from app.tests.integration_tests.conftest import override_get_session, override_session_scope
+from entities.task.bulk_job import BulkJob
+from entities.task.bulk_job_status import BulkJobStatus
+from routes.bulk_job_router import stream_results
 
 
 def test_create_prediction(admin_client, celery_worker_fixture):
@@ -100,7 +107,7 @@ def test_get_prediction_task_not_ready(admin_client, celery_worker_fixture):
 
 
 def test_show_prediction_history(admin_client, celery_worker_fixture):
-    response = admin_client.get("/prediction/history")
+    response = admin_client.get("/prediction/history", params={"limit": 500})
 
     assert response.status_code == 200
     assert "predictions" in response.context
@@ -119,9 +126,246 @@ def test_show_prediction_history(admin_client, celery_worker_fixture):
     prediction_data = make_prediction_response.json()
     sec_pred_id = prediction_data["task_id"]
     sleep(5)
-    response = admin_client.get("/prediction/history")
+    response = admin_client.get("/prediction/history", params={"limit": 500})
 
     assert response.status_code == 200
     assert len(response.context["predictions"]) == prev_len+2
     assert first_pred_id in [str(pred.id) for pred in response.context['predictions']]
     assert sec_pred_id in [str(pred.id) for pred in response.context['predictions']]
+
+
+def test_prediction_history_pages(admin_client, admin):
+    from datetime import datetime
+    from sqlmodel import Session
+    from app.tests.integration_tests.conftest import test_engine
+    from config.constants import DEFAULT_MODEL_NAME
+    from entities.task.prediction_task import PredictionTask
+    from service.crud.model_service import get_model_metadata_by_name
+
+    timestamp = datetime(2000, 1, 1)
+    inserted = {uuid.uuid4() for _ in range(5)}
+    with Session(test_engine) as session:
+        model_id = get_model_metadata_by_name(DEFAULT_MODEL_NAME, session).id
+        for task_id in inserted:
+            session.add(PredictionTask(id=task_id, user_id=admin.id, model_id=model_id, user_email=admin.email,
+                                       inference_input="paged input", user_balance_before_task=0,
+                                       request_timestamp=timestamp, result="neutral", is_success=True,
+                                       balance_withdrawal=0, result_timestamp=timestamp))
+        session.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = admin_client.get("/prediction/history", params=params, headers={"Accept": "application/json"})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert {str(task_id) for task_id in inserted} <= set(seen)
+
+
+def test_prediction_history_rejects_invalid_cursor(admin_client):
+    response = admin_client.get("/prediction/history", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def sync_predictions(monkeypatch):
+    from config.inference_config import get_inference_settings
+
+    monkeypatch.setattr(get_inference_settings(), "SYNC_PREDICTION_ENABLED", True)
+    monkeypatch.setattr("service.inference.sync_predictor.session_scope", override_session_scope)
+
+
+def test_create_sync_prediction(admin_client, sync_predictions):
+    payload = {
+        "inference_input": "this is valid input",
+        "model_name": "test_model"
+    }
+
+    response = admin_client.post("/prediction/predict_sync", json=payload)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["result"]
+
+    response = admin_client.post("/prediction/prediction_result", json={"task_id": data["task_id"]})
+    assert response.status_code == 200, response.text
+    assert response.json()["result"] == data["result"]
+
+
+def test_create_sync_prediction_falls_back_to_celery_when_saturated(monkeypatch, admin_client, sync_predictions,
+                                                                    celery_worker_fixture):
+    class SaturatedPredictor:
+        def try_submit(self, fn, *args):
+            return None
+
+    monkeypatch.setattr("routes.prediction_router.get_sync_predictor", lambda: SaturatedPredictor())
+    payload = {
+        "inference_input": "this is valid input",
+        "model_name": "test_model"
+    }
+
+    response = admin_client.post("/prediction/predict_sync", json=payload)
+    assert response.status_code == 202, response.text
+    result = celery.AsyncResult(response.json()["task_id"])
+    assert result.get(timeout=10) == "Prediction succeeded"
+
+
+def test_create_batch_prediction(admin_client, admin, celery_worker_fixture):
+    from sqlmodel import Session, select
+    from app.tests.integration_tests.conftest import test_engine
+    from entities.user.balance_history import BalanceHistory
+
+    with Session(test_engine) as session:
+        histories_before = len(session.exec(select(BalanceHistory).where(BalanceHistory.user_id == admin.id)).all())
+
+    payload = {
+        "inference_inputs": ["this is valid input", "another valid input", "this is valid input"],
+        "model_name": "test_model"
+    }
+    response = admin_client.post("/prediction/predict_batch", json=payload)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["size"] == 3
+    assert celery.AsyncResult(data["batch_id"]).get(timeout=10) == "Batch prediction succeeded"
+
+    response = admin_client.post("/prediction/batch_result", json={"batch_id": data["batch_id"]})
+    assert response.status_code == 200, response.text
+    results = response.json()
+    assert len(results) == 3
+    assert sum(result["cost"] for result in results) == data["cost"]
+    by_text = {}
+    for result in results:
+        assert by_text.setdefault(result["inference_input"], result["result"]) == result["result"]
+
+    with Session(test_engine) as session:
+        histories = session.exec(select(BalanceHistory).where(BalanceHistory.user_id == admin.id)).all()
+    assert len(histories) == histories_before + 1
+
+
+def test_create_batch_prediction_invalid_input(admin_client):
+    payload = {
+        "inference_inputs": ["this is valid input", "1"],
+        "model_name": "test_model"
+    }
+
+    response = admin_client.post("/prediction/predict_batch", json=payload)
+    assert response.status_code == 400, response.text
+
+
+@pytest.fixture
+def bulk_job_dir(monkeypatch, tmp_path):
+    from config.inference_config import get_inference_settings
+
+    monkeypatch.setattr(get_inference_settings(), "BULK_JOB_DIR", str(tmp_path))
+    monkeypatch.setattr(get_inference_settings(), "BULK_JOB_BATCH_SIZE", 2)
+    monkeypatch.setattr(get_inference_settings(), "BULK_JOB_BATCHES_PER_TASK", 1)
+    monkeypatch.setattr("routes.bulk_job_router.get_session", override_get_session)
+    return tmp_path
+
+
+def test_bulk_job(admin_client, bulk_job_dir, celery_worker_fixture):
+    content = "text\nthis is valid input\nbad\n\"another, valid\ninput\"\nthis is valid input\nlast valid input\n"
+    response = admin_client.post("/prediction/bulk_jobs", files={"file": ("texts.csv", content, "text/csv")},
+                                 data={"model_name": "test_model"})
+    assert response.status_code == 200, response.text
+    job_id = response.json()["id"]
+
+    for _ in range(100):
+        job = admin_client.get(f"/prediction/bulk_jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            break
+        sleep(0.1)
+    assert job["status"] == "completed", job
+    assert (job["rows_read"], job["rows_predicted"], job["rows_skipped"], job["progress"]) == (5, 4, 1, 1.0)
+
+    response = admin_client.get(f"/prediction/bulk_jobs/{job_id}/results")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "position,text,result"
+    assert [line.split(",")[0] for line in lines[1:] if line[0].isdigit()] == ["0", "2", "3", "4"]
+
+    response = admin_client.post(f"/prediction/bulk_jobs/{job_id}/resume")
+    assert response.status_code == 400
+
+
+def test_bulk_job_that_cannot_be_dispatched_is_failed(admin_client, bulk_job_dir, monkeypatch):
+    def failing_apply_async(*args, **kwargs):
+        raise RuntimeError("broker down")
+
+    monkeypatch.setattr("routes.bulk_job_router.perform_bulk_job.apply_async", failing_apply_async)
+    response = admin_client.post("/prediction/bulk_jobs", files={"file": ("texts.csv", "text\nok\n", "text/csv")})
+    assert response.status_code == 500
+
+    with next(override_get_session()) as session:
+        job = session.exec(select(BulkJob).where(BulkJob.error == "Dispatch failed: broker down")).first()
+    assert job.status == BulkJobStatus.FAILED
+    assert list(stream_results(job.id, job.input_format)) == ["position,text,result\r\n"]
+
+
+def test_results_download_of_stalled_job_ends(admin, bulk_job_dir, monkeypatch):
+    from config.inference_config import get_inference_settings
+
+    monkeypatch.setattr(get_inference_settings(), "BULK_JOB_RESULT_STALL_TIMEOUT_S", 0.0)
+    job = BulkJob(user_id=admin.id, model_id=uuid.uuid4(), user_email=admin.email, input_path="missing.jsonl",
+                  input_format="jsonl", input_size=1)
+    with next(override_get_session()) as session:
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+    assert list(stream_results(job.id, job.input_format)) == []
+
+
+def test_bulk_job_rejects_unknown_format(admin_client, bulk_job_dir):
+    response = admin_client.post("/prediction/bulk_jobs", files={"file": ("texts.txt", "text\n", "text/plain")})
+    assert response.status_code == 400
+
+
+def test_results_committed_with_the_final_status_are_streamed(admin, bulk_job_dir, monkeypatch):
+    job = BulkJob(user_id=admin.id, model_id=uuid.uuid4(), user_email=admin.email, input_path="missing.jsonl",
+                  input_format="jsonl", input_size=1, status=BulkJobStatus.COMPLETED)
+    with next(override_get_session()) as session:
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    # The first read misses the last row, which commits together with the COMPLETED status.
+    pages = [[], [SimpleNamespace(batch_position=0, inference_input="last valid input", result="Neutral")], []]
+    monkeypatch.setattr("routes.bulk_job_router.get_bulk_job_results_page", lambda *args: pages.pop(0))
+
+    assert [json.loads(line)["position"] for line in stream_results(job.id, job.input_format)] == [0]
+    assert pages == []
+
+
+def test_running_bulk_job_is_not_resumed(admin_client, admin, bulk_job_dir):
+    job = BulkJob(user_id=admin.id, model_id=uuid.uuid4(), user_email=admin.email, input_path="missing.jsonl",
+                  input_format="jsonl", input_size=1, status=BulkJobStatus.RUNNING)
+    with next(override_get_session()) as session:
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+    response = admin_client.post(f"/prediction/bulk_jobs/{job.id}/resume")
+    assert response.status_code == 409, response.text
+
+
+def test_get_prediction_long_poll(admin_client, celery_worker_fixture):
+    payload = {
+        "inference_input": "this is valid input",
+        "model_name": "test_model"
+    }
+    task_id = admin_client.post("/prediction/predict", json=payload).json()["task_id"]
+
+    response = admin_client.post("/prediction/prediction_result", json={"task_id": task_id, "wait": 10})
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == task_id
+
+
+def test_stream_unavailable_without_listener(admin_client):
+    response = admin_client.get("/prediction/stream")
+    assert response.status_code == 503
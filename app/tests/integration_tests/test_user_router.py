@@ -110,3 +110,27 @@ def test_my_info(patched_client):
     assert "text/html" in content_type
     assert "Default" in response.text
     assert "default@example.com" in response.text
+
+
+def test_auth_is_resolved_once_per_request(patched_client, monkeypatch):
+    from service.auth import auth_service
+    from service.crud import async_user_service
+
+    decoded, fetched = [], []
+    verify_token, get_user_by_id = auth_service.verify_token, async_user_service.get_user_by_id
+
+    def counting_verify_token(token):
+        decoded.append(token)
+        return verify_token(token)
+
+    async def counting_get_user_by_id(id, session):
+        fetched.append(id)
+        return await get_user_by_id(id, session)
+
+    monkeypatch.setattr(auth_service, "verify_token", counting_verify_token)
+    monkeypatch.setattr(async_user_service, "get_user_by_id", counting_get_user_by_id)
+
+    response = patched_client.get("/users/balance/current")
+    assert response.status_code == 200
+    assert len(decoded) == 1
+    assert len(fetched) == 1
@@ -1,3 +1,6 @@
+import string
+from contextlib import contextmanager
+
 import pytest
 from sqlalchemy import create_engine, StaticPool
 from sqlmodel import SQLModel, Session
@@ -25,3 +28,36 @@ def session_fixture():
 def override_get_session():
     with Session(test_engine) as session:
         yield session
+
+
+@contextmanager
+def override_session_scope():
+    with Session(test_engine) as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    """A small randomly initialised sequence classifier saved in the ModelLoader cache layout."""
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast, BertConfig, BertForSequenceClassification
+    import torch
+
+    cache_dir = tmp_path_factory.mktemp("ml_models")
+    vocab = {"[PAD]": 0, "[UNK]": 1, "[CLS]": 2, "[SEP]": 3}
+    for token in list(string.ascii_lowercase) + "this is a good bad great terrible movie review".split():
+        vocab.setdefault(token, len(vocab))
+    tokenizer = Tokenizer(models.WordPiece(vocab=vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 2), ("[SEP]", 3)]
+    )
+    fast_tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, unk_token="[UNK]", pad_token="[PAD]",
+                                             cls_token="[CLS]", sep_token="[SEP]", model_max_length=512)
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=514, num_labels=5)
+    model = BertForSequenceClassification(config)
+    model.save_pretrained(cache_dir / "tiny")
+    fast_tokenizer.save_pretrained(cache_dir / "tiny")
+    return cache_dir
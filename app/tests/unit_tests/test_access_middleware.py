@@ -0,0 +1,53 @@
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from service.auth.access_middleware import AccessMiddleware, PathMatcher
+
+
+def test_path_matcher_matches_exact_paths_and_prefixes():
+    matcher = PathMatcher(["/", "/docs"], ["/docs/"])
+    assert matcher("/")
+    assert matcher("/docs")
+    assert matcher("/docs/oauth2-redirect")
+    assert not matcher("/docsx")
+    assert not matcher("/users/balance/current")
+    assert not PathMatcher(["/"])("/anything")
+
+
+def make_client() -> TestClient:
+    async def public(request: Request):
+        return PlainTextResponse(request.state.request_id)
+
+    async def stream(request: Request):
+        return StreamingResponse(iter(["a", "b", "c"]), media_type="text/plain")
+
+    app = Starlette(routes=[Route("/", public), Route("/stream", stream), Route("/private", public)])
+    app.add_middleware(AccessMiddleware, public_paths=PathMatcher(["/", "/stream"]))
+    return TestClient(app)
+
+
+def test_request_id_is_kept_or_generated_and_echoed():
+    client = make_client()
+
+    response = client.get("/", headers={"X-Request-ID": "req-1"})
+    assert response.text == "req-1"
+    assert response.headers["X-Request-ID"] == "req-1"
+
+    response = client.get("/")
+    assert response.headers["X-Request-ID"] == response.text != ""
+
+
+def test_streamed_responses_pass_through():
+    response = make_client().get("/stream")
+    assert response.text == "abc"
+    assert "X-Request-ID" in response.headers
+
+
+def test_private_path_without_token_redirects_home():
+    response = make_client().get("/private", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "/"
+    assert "X-Request-ID" in response.headers
@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src"))
+
+
+def test_api_does_not_import_torch():
+    code = "import sys, main; print('torch' in sys.modules, 'transformers' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, env={**os.environ, "PYTHONPATH": SRC_DIR},
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "False False"
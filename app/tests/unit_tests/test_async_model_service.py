@@ -0,0 +1,73 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import StaticPool, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from entities.ml_model.classification_model import ClassificationModel
+from entities.task.prediction_task import PredictionTask
+from service.crud.async_model_service import get_all_prediction_histories, get_prediction_histories_by_user
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_engine():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def make_task(user_id: uuid.UUID, model_id: uuid.UUID, timestamp: datetime) -> PredictionTask:
+    return PredictionTask(user_id=user_id, model_id=model_id, user_email="user@example.com",
+                          inference_input="history input", user_balance_before_task=0, request_timestamp=timestamp,
+                          result="neutral", is_success=True, balance_withdrawal=0, result_timestamp=timestamp)
+
+
+@pytest.mark.anyio
+async def test_history_page_is_one_query_with_model_names(async_engine):
+    user_id, start = uuid.uuid4(), datetime(2024, 1, 1)
+    first = ClassificationModel(name="first", model_type="classification", prediction_cost=1.0)
+    second = ClassificationModel(name="second", model_type="classification", prediction_cost=1.0)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add_all([first, second])
+        session.add_all([make_task(user_id, model.id, start + timedelta(minutes=i))
+                         for i, model in enumerate([first, second, first, second])])
+        session.add(make_task(user_id, uuid.uuid4(), start + timedelta(minutes=10)))
+        await session.commit()
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        rows, next_cursor = await get_prediction_histories_by_user(user_id, session, limit=10)
+
+    assert len(statements) == 1
+    assert next_cursor is None
+    assert [name for _, name in rows] == [None, "second", "first", "second", "first"]
+
+
+@pytest.mark.anyio
+async def test_history_pages_follow_the_cursor(async_engine):
+    user_id, start = uuid.uuid4(), datetime(2024, 1, 1)
+    tasks = [make_task(user_id, uuid.uuid4(), start + timedelta(minutes=i)) for i in range(3)]
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add_all(tasks + [make_task(uuid.uuid4(), uuid.uuid4(), start)])
+        await session.commit()
+
+        first_page, next_cursor = await get_prediction_histories_by_user(user_id, session, limit=2)
+        second_page, last_cursor = await get_prediction_histories_by_user(user_id, session, next_cursor, limit=2)
+        all_rows, _ = await get_all_prediction_histories(session)
+
+    assert [task.id for task, _ in first_page] == [tasks[2].id, tasks[1].id]
+    assert [task.id for task, _ in second_page] == [tasks[0].id]
+    assert last_cursor is None
+    assert len(all_rows) == 4
@@ -0,0 +1,101 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from entities.user.user import User
+from service.crud.async_user_service import (
+    create_user,
+    get_user_by_email,
+    add_balance,
+    withdraw_balance,
+    reserve_balance,
+    release_hold,
+    get_balance_histories,
+    find_and_verify_user
+)
+from service.crud.user_service import hash_password, password_needs_rehash
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_session():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def create_test_user(session: AsyncSession, balance: float) -> User:
+    user = User(
+        email="async@example.com",
+        name="Async",
+        surname="Tester",
+        hashed_password=hash_password("secret"),
+        balance=balance,
+    )
+    await create_user(user, session)
+    return user
+
+
+@pytest.mark.anyio
+async def test_add_and_withdraw_balance_return_new_balance(async_session):
+    user = await create_test_user(async_session, 10.0)
+
+    assert await add_balance(user.email, 40.0, async_session) == 50.0
+    assert await withdraw_balance(user.id, 20.0, async_session) == 30.0
+
+    histories, next_cursor = await get_balance_histories(user.id, async_session)
+    assert sorted(h.amount_change for h in histories) == [-20.0, 40.0]
+    assert next_cursor is None
+
+
+@pytest.mark.anyio
+async def test_withdraw_balance_insufficient_funds(async_session):
+    user = await create_test_user(async_session, 10.0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await withdraw_balance(user.id, 20.0, async_session)
+    assert exc_info.value.status_code == 400
+    assert (await get_user_by_email(user.email, async_session)).balance == 10.0
+
+
+@pytest.mark.anyio
+async def test_reserve_and_release_hold(async_session):
+    user = await create_test_user(async_session, 100.0)
+    hold_id = uuid.uuid4()
+
+    assert await reserve_balance(user.id, 60.0, hold_id, async_session) == 40.0
+    with pytest.raises(HTTPException):
+        await reserve_balance(user.id, 60.0, uuid.uuid4(), async_session)
+
+    assert await release_hold(hold_id, async_session) is True
+    assert await release_hold(hold_id, async_session) is False
+    await async_session.refresh(user)
+    assert user.balance == 100.0
+
+
+@pytest.mark.anyio
+async def test_login_rehashes_password_with_outdated_work_factor(async_session):
+    user = await create_test_user(async_session, 0.0)
+    user.hashed_password = hash_password("secret", rounds=4)
+    await async_session.commit()
+    assert password_needs_rehash(user.hashed_password)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await find_and_verify_user(user.email, "wrong", async_session)
+    assert exc_info.value.status_code == 401
+
+    verified = await find_and_verify_user(user.email, "secret", async_session)
+    assert not password_needs_rehash(verified.hashed_password)
+    assert (await get_user_by_email(user.email, async_session)).hashed_password == verified.hashed_password
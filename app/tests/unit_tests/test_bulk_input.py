@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from config.constants import CSV_FORMAT, JSONL_FORMAT
+from service.inference.bulk_input import iter_rows, input_format_from_filename
+
+
+def test_input_format_from_filename():
+    assert input_format_from_filename("texts.CSV") == CSV_FORMAT
+    assert input_format_from_filename("texts.ndjson") == JSONL_FORMAT
+    assert input_format_from_filename("texts.txt") is None
+
+
+def test_csv_rows_resume_from_offset(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text('id,text\n1,first text\n2,"second\nline, quoted"\n3\n4,fourth text\n', encoding="utf-8")
+
+    rows = list(iter_rows(str(path), CSV_FORMAT, "text"))
+    assert [text for text, _ in rows] == ["first text", "second\nline, quoted", None, "fourth text"]
+    assert rows[-1][1] == path.stat().st_size
+
+    resumed = list(iter_rows(str(path), CSV_FORMAT, "text", rows[1][1]))
+    assert [text for text, _ in resumed] == [None, "fourth text"]
+
+
+def test_csv_without_text_column_is_rejected(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text("id,body\n1,first text\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        list(iter_rows(str(path), CSV_FORMAT, "text"))
+
+
+def test_jsonl_rows_skip_blank_and_invalid_lines(tmp_path):
+    path = tmp_path / "input.jsonl"
+    lines = [json.dumps({"text": "первый текст"}), "", "not json", json.dumps({"text": 5}), json.dumps({"text": "last"})]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    rows = list(iter_rows(str(path), JSONL_FORMAT, "text"))
+    assert [text for text, _ in rows] == ["первый текст", None, None, "last"]
+
+    resumed = list(iter_rows(str(path), JSONL_FORMAT, "text", rows[0][1]))
+    assert [text for text, _ in resumed] == [None, None, "last"]
@@ -1,10 +1,13 @@
+import os
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
 
 import pytest
+from fastapi import HTTPException
 
-from app.tests.unit_tests.conftest import override_get_session
-from celery_worker import perform_prediction
+from app.tests.unit_tests.conftest import override_session_scope
+from celery_worker import perform_prediction, perform_batch_prediction, process_label, remember_parent_pid
 from exceptions.model_exception import ModelException
 
 
@@ -13,11 +16,23 @@ def test_perform_prediction_success(monkeypatch):
     call_log = {
         "get_model_by_name": False,
         "make_prediction": False,
-        "prepare_and_save_task": False,
-        "withdraw_balance": False,
+        "prepare_task": False,
+        "charge_task": False,
     }
 
     # Fake implementations that update our call_log.
+    sessions = set()
+    open_sessions = []
+
+    @contextmanager
+    def tracking_session_scope():
+        with override_session_scope() as session:
+            open_sessions.append(session)
+            try:
+                yield session
+            finally:
+                open_sessions.remove(session)
+
     def fake_get_model_by_name(model_name, session):
         call_log["get_model_by_name"] = True
 
@@ -28,19 +43,22 @@ def test_perform_prediction_success(monkeypatch):
 
     def fake_make_prediction(model, inference_input):
         call_log["make_prediction"] = True
+        assert not open_sessions
         return "dummy_prediction_result"
 
-    def fake_prepare_and_save_task(prediction_request, result, success, cost, task_id, session):
-        call_log["prepare_and_save_task"] = True
+    def fake_prepare_task(prediction_request, result, success, cost, task_id, session):
+        call_log["prepare_task"] = True
+        sessions.add(id(session))
 
-    def fake_withdraw_balance(user_id, cost, session):
-        call_log["withdraw_balance"] = True
+    def fake_charge_task(user_id, cost, hold_id, session):
+        call_log["charge_task"] = True
+        sessions.add(id(session))
 
     monkeypatch.setattr("celery_worker.get_model_by_name", fake_get_model_by_name)
     monkeypatch.setattr("celery_worker.make_prediction", fake_make_prediction)
-    monkeypatch.setattr("celery_worker.prepare_and_save_task", fake_prepare_and_save_task)
-    monkeypatch.setattr("celery_worker.withdraw_balance", fake_withdraw_balance)
-    monkeypatch.setattr("celery_worker.get_session", override_get_session)
+    monkeypatch.setattr("celery_worker.prepare_task", fake_prepare_task)
+    monkeypatch.setattr("celery_worker.charge_task", fake_charge_task)
+    monkeypatch.setattr("celery_worker.session_scope", tracking_session_scope)
 
     prediction_request = {
         "inference_input": "dummy data",
@@ -57,17 +75,19 @@ def test_perform_prediction_success(monkeypatch):
 
     assert call_log["get_model_by_name"] is True
     assert call_log["make_prediction"] is True
-    assert call_log["prepare_and_save_task"] is True
-    assert call_log["withdraw_balance"] is True
+    assert call_log["prepare_task"] is True
+    assert call_log["charge_task"] is True
     assert result == 'Prediction succeeded'
+    assert len(sessions) == 1
 
 
 def test_perform_prediction_failure(monkeypatch):
     call_log = {
         "get_model_by_name": False,
         "make_prediction": False,
-        "prepare_and_save_task": False,
-        "withdraw_balance": False,
+        "prepare_task": False,
+        "release_hold": False,
+        "charge_task": False,
     }
 
     def fake_get_model_by_name(model_name, session):
@@ -82,17 +102,22 @@ def test_perform_prediction_failure(monkeypatch):
         call_log["make_prediction"] = True
         raise Exception("prediction error")
 
-    def fake_prepare_and_save_task(prediction_request, result, success, cost, task_id, session):
-        call_log["prepare_and_save_task"] = True
+    def fake_prepare_task(prediction_request, result, success, cost, task_id, session):
+        call_log["prepare_task"] = True
+        assert success is False
+
+    def fake_release_hold(hold_id, session):
+        call_log["release_hold"] = True
 
-    def fake_withdraw_balance(user_id, cost, session):
-        call_log["withdraw_balance"] = True
+    def fake_charge_task(user_id, cost, hold_id, session):
+        call_log["charge_task"] = True
 
     monkeypatch.setattr("celery_worker.get_model_by_name", fake_get_model_by_name)
     monkeypatch.setattr("celery_worker.make_prediction", fake_make_prediction)
-    monkeypatch.setattr("celery_worker.prepare_and_save_task", fake_prepare_and_save_task)
-    monkeypatch.setattr("celery_worker.withdraw_balance", fake_withdraw_balance)
-    monkeypatch.setattr("celery_worker.get_session", override_get_session)
+    monkeypatch.setattr("celery_worker.prepare_task", fake_prepare_task)
+    monkeypatch.setattr("celery_worker.release_hold", fake_release_hold)
+    monkeypatch.setattr("celery_worker.charge_task", fake_charge_task)
+    monkeypatch.setattr("celery_worker.session_scope", override_session_scope)
 
     prediction_request = {
         "inference_input": "dummy data",
@@ -109,5 +134,52 @@ def test_perform_prediction_failure(monkeypatch):
         perform_prediction(prediction_request, task_id, model_name)
 
     assert "Error during model prediction" in str(excinfo.value)
-    assert call_log["prepare_and_save_task"] is True
-    assert call_log["withdraw_balance"] is False
\ No newline at end of file
+    assert call_log["prepare_task"] is True
+    assert call_log["release_hold"] is True
+    assert call_log["charge_task"] is False
+
+
+def test_perform_batch_prediction_charge_failure_saves_failed_tasks(monkeypatch):
+    saved, released = [], []
+
+    class DummyModel:
+        prediction_cost = 100
+
+    def fake_add_batch_tasks(request, results, success, cost, batch_id, session, positions=None):
+        saved.append((list(results), success))
+
+    def fake_charge_task(user_id, cost, hold_id, session):
+        raise HTTPException(status_code=400, detail="Insufficient balance")
+
+    monkeypatch.setattr("celery_worker.get_model_by_name", lambda model_name, session: DummyModel())
+    monkeypatch.setattr("celery_worker.make_deduplicated_batch_prediction",
+                        lambda model, texts: ["Positive"] * len(texts))
+    monkeypatch.setattr("celery_worker.add_batch_tasks", fake_add_batch_tasks)
+    monkeypatch.setattr("celery_worker.charge_task", fake_charge_task)
+    monkeypatch.setattr("celery_worker.release_hold", lambda hold_id, session: released.append(hold_id))
+    monkeypatch.setattr("celery_worker.session_scope", override_session_scope)
+
+    batch_request = {
+        "inference_inputs": ["good", "bad"],
+        "user_id": uuid.uuid4(),
+        "model_id": uuid.uuid4(),
+        "user_email": "dummy@mail.ru",
+        "user_balance_before_task": 50.0,
+        "request_timestamp": datetime.now()
+    }
+    batch_id = uuid.uuid4()
+
+    with pytest.raises(ModelException):
+        perform_batch_prediction(batch_request, batch_id, "dummy_model")
+
+    assert saved[-1][1] is False
+    assert len(saved[-1][0]) == 2
+    assert released == [batch_id]
+
+
+def test_process_label_compares_with_the_worker_parent(monkeypatch):
+    remember_parent_pid()
+    assert process_label() == "parent"
+
+    monkeypatch.setattr("celery_worker._parent_pid", os.getpid() + 1)
+    assert process_label() == "child"
@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import StaticPool, create_engine, inspect, text
+from sqlmodel import SQLModel, select
+
+from database.tables_initiator import create_missing_indexes
+from entities.task.prediction_task import PredictionTask
+from entities.user.balance_history import BalanceHistory
+from service.crud.async_model_service import prediction_history_statement
+from service.crud.pagination import apply_keyset, encode_cursor
+
+
+def make_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def query_plan(engine, statement) -> str:
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_missing_indexes_are_created_on_existing_database():
+    engine = make_engine()
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_predictiontask_user_id_request_timestamp_id"))
+        connection.execute(text("DROP INDEX ix_balancehistory_user_id_timestamp_id"))
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)
+
+    inspector = inspect(engine)
+    assert "ix_predictiontask_user_id_request_timestamp_id" in {
+        index["name"] for index in inspector.get_indexes("predictiontask")}
+    assert "ix_balancehistory_user_id_timestamp_id" in {
+        index["name"] for index in inspector.get_indexes("balancehistory")}
+
+
+def test_user_history_page_is_read_from_index():
+    engine = make_engine()
+    cursor = encode_cursor(datetime(2024, 1, 1), uuid.uuid4())
+    statement = apply_keyset(prediction_history_statement().where(PredictionTask.user_id == uuid.uuid4()),
+                             PredictionTask.request_timestamp, PredictionTask.id, cursor, 50)
+
+    plan = query_plan(engine, statement)
+    assert "ix_predictiontask_user_id_request_timestamp_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_all_history_and_balance_history_are_read_from_index():
+    engine = make_engine()
+    all_history = apply_keyset(prediction_history_statement(), PredictionTask.request_timestamp,
+                               PredictionTask.id, None, 50)
+    balance_history = apply_keyset(select(BalanceHistory).where(BalanceHistory.user_id == uuid.uuid4()),
+                                   BalanceHistory.timestamp, BalanceHistory.id, None, 50)
+
+    assert "ix_predictiontask_request_timestamp_id" in query_plan(engine, all_history)
+    plan = query_plan(engine, balance_history)
+    assert "ix_balancehistory_user_id_timestamp_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_model_history_page_is_read_from_index():
+    engine = make_engine()
+    cursor = encode_cursor(datetime(2024, 1, 1), uuid.uuid4())
+    statement = apply_keyset(prediction_history_statement().where(PredictionTask.model_id == uuid.uuid4()),
+                             PredictionTask.request_timestamp, PredictionTask.id, cursor, 50)
+
+    plan = query_plan(engine, statement)
+    assert "ix_predictiontask_model_id_request_timestamp_id" in plan
+    assert "TEMP B-TREE" not in plan
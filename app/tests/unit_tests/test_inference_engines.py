@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from config.constants import ONNX_ENGINE, TORCH_ENGINE
+from entities.ml_model.classification_model import ClassificationModel
+from entities.ml_model.inference_input import InferenceInput
+from service.inference.engines import OnnxEngine, TorchEngine, ONNX_FILE_NAME
+from service.inference.text_classifier import TextClassifier
+from service.loaders.model_loader import ModelLoader
+
+
+def test_torch_engine_is_default(tiny_model_dir):
+    loader = ModelLoader(str(tiny_model_dir))
+    assert isinstance(loader.get_engine("tiny"), TorchEngine)
+    assert isinstance(loader.get_engine("tiny", "unknown"), TorchEngine)
+
+
+def test_onnx_engine_matches_torch(tiny_model_dir):
+    pytest.importorskip("onnxruntime")
+    loader = ModelLoader(str(tiny_model_dir))
+    engine = loader.get_engine("tiny", ONNX_ENGINE)
+
+    assert isinstance(engine, OnnxEngine)
+    assert os.path.exists(tiny_model_dir / "tiny" / ONNX_FILE_NAME)
+    assert loader.get_engine("tiny", ONNX_ENGINE) is engine
+
+    model, tokenizer = loader.get_model("tiny")
+    texts = ["this is a good movie", "bad", "a terrible terrible review of this movie"]
+    torch_model = ClassificationModel(name="tiny", prediction_cost=0.0, engine=TORCH_ENGINE)
+    torch_model.set_resources(TextClassifier(tokenizer, TorchEngine(model)))
+    onnx_model = ClassificationModel(name="tiny", prediction_cost=0.0, engine=ONNX_ENGINE)
+    onnx_model.set_resources(TextClassifier(tokenizer, engine))
+
+    assert onnx_model.predict(InferenceInput(texts)) == torch_model.predict(InferenceInput(texts))
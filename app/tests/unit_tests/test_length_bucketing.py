@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import torch
+
+from entities.ml_model.classification_model import ClassificationModel, SENTIMENT_MAP
+from entities.ml_model.inference_input import InferenceInput
+from service.inference.engines import TorchEngine
+from service.inference.length_bucketing import make_buckets, padding_efficiency
+from service.inference.text_classifier import TextClassifier
+
+
+class FakeTokenizer:
+    def __call__(self, texts, truncation=True, max_length=512):
+        input_ids = [[1] * min(len(text.split()), max_length) for text in texts]
+        return {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]}
+
+    def pad(self, features, padding=True, return_tensors="pt"):
+        width = max(len(f["input_ids"]) for f in features)
+        return {
+            key: torch.tensor([f[key] + [0] * (width - len(f[key])) for f in features])
+            for key in features[0]
+        }
+
+
+class FakeModel:
+    """Predicts the class equal to the number of real tokens (capped at 4) and records tensor widths."""
+
+    def __init__(self):
+        self.widths = []
+
+    def __call__(self, input_ids, attention_mask):
+        self.widths.append(input_ids.shape[1])
+        classes = attention_mask.sum(dim=-1).clamp(max=4)
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(classes, num_classes=5).float())
+
+
+def test_make_buckets_groups_by_boundary_and_batch_size():
+    lengths = [3, 100, 5, 120, 4, 300]
+    buckets = make_buckets(lengths, boundaries=[16, 128, 512], max_batch_size=2)
+
+    assert buckets == [[0, 4], [2], [1, 3], [5]]
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+
+
+def test_padding_efficiency():
+    lengths = [10, 500]
+    assert padding_efficiency(lengths, [[0, 1]]) == 510 / 1000
+    assert padding_efficiency(lengths, [[0], [1]]) == 1.0
+
+
+def test_predict_restores_original_order():
+    model = ClassificationModel(name="test_model", model_type="classification", prediction_cost=0.0)
+    fake_model = FakeModel()
+    model.set_resources(TextClassifier(FakeTokenizer(), TorchEngine(fake_model)))
+    texts = ["one two three four five " * 40, "one", "one two three", "one two"]
+
+    predictions = model.predict(InferenceInput(texts))
+
+    assert predictions == [SENTIMENT_MAP[4], SENTIMENT_MAP[1], SENTIMENT_MAP[3], SENTIMENT_MAP[2]]
+    assert max(fake_model.widths[:-1]) < 200
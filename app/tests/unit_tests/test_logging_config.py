@@ -0,0 +1,53 @@
+import json
+import logging
+import sys
+from queue import SimpleQueue
+
+from config.logging_config import JsonFormatter, RequestIdFilter, SamplingFilter, TracebackQueueHandler, \
+    request_id_var
+
+
+def make_record(name: str, level: int = logging.INFO, msg: str = "user %s", args=("a",)) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_sampling_uses_longest_prefix_and_keeps_warnings():
+    sampling = SamplingFilter({"service.auth": 0.0, "service.auth.user_cache": 1.0})
+
+    assert not sampling.filter(make_record("service.auth.jwt_service"))
+    assert sampling.filter(make_record("service.auth.user_cache"))
+    assert sampling.filter(make_record("service.authz"))
+    assert sampling.filter(make_record("routes.user_router"))
+    assert sampling.filter(make_record("service.auth.jwt_service", logging.WARNING))
+
+
+def test_json_record_carries_request_id_and_lazy_message():
+    record = make_record("routes.user_router")
+    context_token = request_id_var.set("req-1")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(context_token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "user a"
+    assert entry["request_id"] == "req-1"
+    assert entry["logger"] == "routes.user_router"
+    assert entry["level"] == "INFO"
+
+    RequestIdFilter().filter(record)
+    assert json.loads(JsonFormatter().format(record))["request_id"] is None
+
+
+def test_queued_record_keeps_the_traceback_apart():
+    handler = TracebackQueueHandler(SimpleQueue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("routes.user_router", logging.ERROR, __file__, 1, "failed for %s", ("a",),
+                                   sys.exc_info())
+    handler.handle(record)
+
+    entry = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert entry["message"] == "failed for a"
+    assert "ValueError: boom" in entry["exception"]
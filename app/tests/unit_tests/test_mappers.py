@@ -5,7 +5,7 @@ from entities.task.prediction_task import PredictionTask
 from entities.user.user import User, UserSignUp
 from entities.user.user_role import UserRole
 from service.crud.user_service import verify_password
-from service.mappers.prediction_mapper import prediction_task_to_dto
+from service.mappers.prediction_mapper import prediction_task_to_dto, prediction_tasks_to_dtos
 from service.mappers.user_mapper import user_to_user_dto, user_signup_dto_to_user
 
 
@@ -82,4 +82,21 @@ def test_prediction_task_to_dto():
     assert dto.is_success is True
     assert dto.cost == 50.0
     assert dto.request_timestamp == now
-    assert dto.result_timestamp == now
\ No newline at end of file
+    assert dto.result_timestamp == now
+
+
+def test_prediction_tasks_to_dtos():
+    now = datetime.now()
+    tasks = [
+        PredictionTask(id=uuid.uuid4(), user_id=uuid.uuid4(), model_id=uuid.uuid4(), user_email="owner@example.com",
+                       inference_input="Test inference input", user_balance_before_task=100.0, request_timestamp=now,
+                       result="Test result", is_success=True, balance_withdrawal=50.0, result_timestamp=now)
+        for _ in range(2)
+    ]
+
+    dtos = prediction_tasks_to_dtos([(tasks[0], "Model"), (tasks[1], None)])
+
+    assert [dto.id for dto in dtos] == [task.id for task in tasks]
+    assert [dto.model_name for dto in dtos] == ["Model", "unknown"]
+    assert all(dto.user_email == "owner@example.com" for dto in dtos)
+    assert prediction_tasks_to_dtos([(tasks[0], "Model")], "viewer@example.com")[0].user_email == "viewer@example.com"
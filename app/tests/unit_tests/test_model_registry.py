@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config.constants import INT8_PRECISION
+from config.inference_config import get_inference_settings
+from exceptions.model_exception import ModelException
+from service.loaders.model_loader import ModelLoader, model_size_bytes
+
+
+@pytest.fixture
+def registry_settings(monkeypatch):
+    settings = get_inference_settings()
+    monkeypatch.setattr(settings, "MODEL_REGISTRY_MAX_MODELS", 2)
+    monkeypatch.setattr(settings, "MODEL_REGISTRY_MAX_BYTES", None)
+    monkeypatch.setattr(settings, "PRECISION_MIN_LABEL_AGREEMENT", 0.0)
+    return settings
+
+
+def test_registered_artifact_path_is_used(tiny_model_dir):
+    loader = ModelLoader(str(tiny_model_dir))
+    loader.register("other", artifact_path="tiny")
+
+    model, _ = loader.get_model("other")
+    assert model is not None
+    assert loader.get_model_path("other") == str(tiny_model_dir / "tiny")
+
+
+def test_unknown_model_without_artifact_raises(tmp_path):
+    loader = ModelLoader(str(tmp_path))
+    with pytest.raises(ModelException) as exc:
+        loader.get_model("missing")
+    assert exc.value.error_code == 404
+    assert not loader._pending
+
+
+def test_least_recently_used_model_is_evicted(tiny_model_dir, registry_settings):
+    loader = ModelLoader(str(tiny_model_dir))
+    loader.register("a", artifact_path="tiny")
+    loader.register("b", artifact_path="tiny")
+    loader.register("c", artifact_path="tiny")
+
+    loader.get_model("a")
+    engine_b = loader.get_engine("b")
+    loader.get_model("a")
+    loader.get_model("c")
+
+    assert [name for name, _ in loader.loaded_models] == ["a", "c"]
+    assert not any(key[0] == "b" for key in loader.loaded_engines)
+    assert loader.get_engine("b") is not engine_b
+
+
+def test_byte_limit_evicts_models(tiny_model_dir, registry_settings, monkeypatch):
+    loader = ModelLoader(str(tiny_model_dir))
+    model, _ = loader.get_model("tiny")
+    monkeypatch.setattr(registry_settings, "MODEL_REGISTRY_MAX_BYTES", model_size_bytes(model) + 1)
+
+    loader.get_model("tiny", INT8_PRECISION)
+
+    assert list(loader.loaded_models) == [("tiny", INT8_PRECISION)]
+
+
+def test_variant_does_not_keep_fp32_resident(tiny_model_dir, monkeypatch):
+    monkeypatch.setattr(get_inference_settings(), "PRECISION_MIN_LABEL_AGREEMENT", 0.0)
+    loader = ModelLoader(str(tiny_model_dir))
+
+    int8_model, _ = loader.get_model("tiny", INT8_PRECISION)
+
+    assert list(loader.loaded_models) == [("tiny", INT8_PRECISION)]
+    fp32_model, _ = loader.get_model("tiny")
+    assert 0 < model_size_bytes(int8_model) < model_size_bytes(fp32_model)
+
+
+def test_concurrent_loads_are_deduplicated(tiny_model_dir, monkeypatch):
+    loader = ModelLoader(str(tiny_model_dir))
+    original_load = loader._load_model
+    calls = []
+    lock = threading.Lock()
+
+    def slow_load(model_name):
+        with lock:
+            calls.append(model_name)
+        time.sleep(0.2)
+        return original_load(model_name)
+
+    monkeypatch.setattr(loader, "_load_model", slow_load)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: loader.get_model("tiny"), range(8)))
+
+    assert calls == ["tiny"]
+    assert all(result is results[0] for result in results)
@@ -10,19 +10,21 @@ from app.src.service.crud.model_service import (
     create_and_save_default_model,
     get_default_model,
     get_model_by_name,
+    get_model_metadata_by_name,
     make_prediction,
+    make_deduplicated_batch_prediction,
+    add_batch_tasks,
+    get_prediction_tasks_by_batch,
     prepare_and_save_task,
     save_task,
-    get_all_prediction_history,
     get_prediction_task_by_id,
-    get_prediction_histories_by_user,
-    get_prediction_histories_by_model,
     validate_input,
 )
 from config.constants import DEFAULT_MODEL_NAME
 
 from entities.ml_model.classification_model import ClassificationModel
 from entities.ml_model.inference_input import InferenceInput
+from entities.task.batch_prediction_request import BatchPredictionRequest
 from entities.task.prediction_request import PredictionRequest
 from entities.task.prediction_task import PredictionTask
 from entities.user.user import User
@@ -69,10 +71,20 @@ def test_get_model_by_name(session: Session):
     assert fetched is not None
 
 
+def test_get_model_metadata_by_name_does_not_load_weights(session: Session):
+    model = ClassificationModel(name="MetadataOnly", model_type="classification", prediction_cost=10.0)
+    create_model(model, session)
+
+    fetched = get_model_metadata_by_name("MetadataOnly", session)
+    assert fetched.id == model.id
+    assert fetched.prediction_cost == 10.0
+    assert fetched._classifier is None
+    assert get_model_metadata_by_name("Missing", session) is None
+
+
 def test_make_prediction():
     model = ClassificationModel(name=DEFAULT_MODEL_NAME, model_type="classification", prediction_cost=0.0)
-    m, tokenizer = model_loader.get_model(model.name)
-    model.set_resources(m, tokenizer)
+    model.set_resources(model_loader.get_classifier(model.name))
     long_input = InferenceInput(data="This is a sufficiently long input")
     result_long = make_prediction(model, long_input)
     assert result_long in sentiment_map.values()
@@ -127,38 +139,6 @@ def test_prepare_and_save_task(session: Session):
     assert isinstance(fetched.result_timestamp, datetime)
 
 
-def test_get_all_prediction_history(session: Session):
-    task1 = PredictionTask(
-        user_id=uuid.uuid4(),
-        model_id=uuid.uuid4(),
-        user_email="dummy@mail.ru",
-        inference_input="input1",
-        user_balance_before_task=100.0,
-        request_timestamp=datetime.now(),
-        result="positive",
-        is_success=True,
-        balance_withdrawal=20.0,
-        result_timestamp=datetime.now()
-    )
-    task2 = PredictionTask(
-        user_id=uuid.uuid4(),
-        model_id=uuid.uuid4(),
-        user_email="dummy@mail.ru",
-        inference_input="input2",
-        user_balance_before_task=200.0,
-        request_timestamp=datetime.now(),
-        result="neutral",
-        is_success=False,
-        balance_withdrawal=30.0,
-        result_timestamp=datetime.now()
-    )
-    save_task(task1, session)
-    save_task(task2, session)
-
-    tasks = get_all_prediction_history(session)
-    assert len(tasks) >= 2
-
-
 def test_get_prediction_task_by_id(session: Session):
     task = PredictionTask(
         user_id=uuid.uuid4(),
@@ -178,77 +158,39 @@ def test_get_prediction_task_by_id(session: Session):
     assert fetched.id == task.id
 
 
-def test_get_prediction_histories_by_user(session: Session):
-    user_id = uuid.uuid4()
-    task1 = PredictionTask(
-        user_id=user_id,
-        model_id=uuid.uuid4(),
-        user_email="dummy@mail.ru",
-        inference_input="user input 1",
-        user_balance_before_task=100.0,
-        request_timestamp=datetime(2023, 1, 2, 12, 0, 0),
-        result="positive",
-        is_success=True,
-        balance_withdrawal=10.0,
-        result_timestamp=datetime(2023, 1, 2, 12, 30, 0)
-    )
-    task2 = PredictionTask(
-        user_id=user_id,
-        model_id=uuid.uuid4(),
-        user_email="dummy@mail.ru",
-        inference_input="user input 2",
-        user_balance_before_task=110.0,
-        request_timestamp=datetime(2023, 1, 1, 12, 0, 0),
-        result="neutral",
-        is_success=False,
-        balance_withdrawal=20.0,
-        result_timestamp=datetime(2023, 1, 1, 12, 30, 0)
-    )
-    save_task(task1, session)
-    save_task(task2, session)
+def test_validate_input():
+    assert validate_input("valid input") is True
+    assert validate_input("bad") is False
+    assert validate_input("") is False
+    assert not validate_input(None)
 
-    tasks = get_prediction_histories_by_user(user_id, session)
-    assert len(tasks) == 2
-    # The tasks should be ordered by request_timestamp descending.
-    assert tasks[0].request_timestamp >= tasks[1].request_timestamp
 
+def test_make_deduplicated_batch_prediction_predicts_each_text_once(monkeypatch):
+    calls = []
 
-def test_get_prediction_histories_by_model(session: Session):
-    model_id = uuid.uuid4()
-    task1 = PredictionTask(
-        user_id=uuid.uuid4(),
-        model_id=model_id,
-        user_email="dummy@mail.ru",
-        inference_input="model input 1",
-        user_balance_before_task=90.0,
-        request_timestamp=datetime.now(),
-        result="positive",
-        is_success=True,
-        balance_withdrawal=10.0,
-        result_timestamp=datetime(2023, 2, 1, 12, 0, 0)
-    )
-    task2 = PredictionTask(
-        user_id=uuid.uuid4(),
-        model_id=model_id,
-        user_email="dummy@mail.ru",
-        inference_input="model input 2",
-        user_balance_before_task=95.0,
-        request_timestamp=datetime.now(),
-        result="neutral",
-        is_success=False,
-        balance_withdrawal=5.0,
-        result_timestamp=datetime(2023, 2, 2, 12, 0, 0)
-    )
-    save_task(task1, session)
-    save_task(task2, session)
+    def fake_batch_prediction(model, inference_input):
+        calls.append(list(inference_input.data))
+        return [f"label:{text}" for text in inference_input.data]
 
-    tasks = get_prediction_histories_by_model(model_id, session)
-    assert len(tasks) == 2
-    assert tasks[0].result_timestamp >= tasks[1].result_timestamp
+    monkeypatch.setattr("app.src.service.crud.model_service.make_batch_prediction", fake_batch_prediction)
+    model = ClassificationModel(name="test_model", model_type="classification", prediction_cost=0.0)
 
+    results = make_deduplicated_batch_prediction(model, ["a text", "b text", "a text"])
 
-def test_validate_input():
-    assert validate_input("valid input") is True
-    assert validate_input("bad") is False
-    assert validate_input("") is False
-    assert not validate_input(None)
+    assert calls == [["a text", "b text"]]
+    assert results == ["label:a text", "label:b text", "label:a text"]
+
+
+def test_add_batch_tasks(session: Session):
+    request = BatchPredictionRequest(user_id=uuid.uuid4(), model_id=uuid.uuid4(), user_email="batch@example.com",
+                                     inference_inputs=["first text", "second text"],
+                                     user_balance_before_task=100.0, request_timestamp=datetime.now())
+    batch_id = uuid.uuid4()
+
+    assert add_batch_tasks(request, ["Positive", "Negative"], True, 2.0, batch_id, session) == 2
+    session.commit()
+
+    tasks = get_prediction_tasks_by_batch(batch_id, session)
+    assert sorted((task.inference_input, task.result) for task in tasks) == \
+        [("first text", "Positive"), ("second text", "Negative")]
+    assert all(task.balance_withdrawal == 2.0 for task in tasks)
@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from service.crud.pagination import encode_cursor, decode_cursor, split_page
+
+
+def test_cursor_round_trip():
+    timestamp, id = datetime(2024, 5, 1, 12, 30, 15, 123456), uuid.uuid4()
+    assert decode_cursor(encode_cursor(timestamp, id)) == (timestamp, id)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_split_page_returns_cursor_of_last_item():
+    class Row:
+        def __init__(self, minute):
+            self.id = uuid.uuid4()
+            self.timestamp = datetime(2024, 1, 1, 0, minute)
+
+    rows = [Row(3), Row(2), Row(1)]
+    def cursor_key(row):
+        return row.timestamp, row.id
+
+    items, next_cursor = split_page(rows, 2, cursor_key)
+    assert items == rows[:2]
+    assert decode_cursor(next_cursor) == (rows[1].timestamp, rows[1].id)
+    assert split_page(rows, 3, cursor_key) == (rows, None)
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+
+from service.auth.password_hasher import PasswordHasher
+from service.crud.user_service import hash_password, password_needs_rehash
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_hash_and_verify_run_on_the_hasher_threads():
+    hasher = PasswordHasher(max_workers=1, max_queued=1)
+    hashed = await hasher.hash("secret")
+
+    assert await hasher.verify("secret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    assert not password_needs_rehash(hashed)
+
+
+@pytest.mark.anyio
+async def test_refuses_work_beyond_the_queue_limit():
+    hasher = PasswordHasher(max_workers=1, max_queued=0)
+    assert hasher._slots.acquire(blocking=False)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.hash("secret")
+    assert exc_info.value.status_code == 503
+
+    hasher._slots.release()
+    assert await hasher.verify("secret", await hasher.hash("secret"))
+
+
+def test_needs_rehash_when_work_factor_differs():
+    assert password_needs_rehash(hash_password("secret", rounds=4))
+    assert password_needs_rehash("not a bcrypt hash")
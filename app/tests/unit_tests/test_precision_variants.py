@@ -0,0 +1,46 @@
+import torch
+
+from config.constants import INT8_PRECISION, BF16_PRECISION, FP32_PRECISION
+from config.inference_config import get_inference_settings
+from entities.ml_model.classification_model import ClassificationModel
+from entities.ml_model.inference_input import InferenceInput
+from service.loaders.model_loader import ModelLoader
+from service.loaders.precision import AutocastModule, bf16_supported
+
+
+def test_int8_variant_is_quantized(tiny_model_dir, monkeypatch):
+    monkeypatch.setattr(get_inference_settings(), "PRECISION_MIN_LABEL_AGREEMENT", 0.0)
+    loader = ModelLoader(str(tiny_model_dir))
+
+    fp32_model, _ = loader.get_model("tiny")
+    int8_model, _ = loader.get_model("tiny", INT8_PRECISION)
+
+    assert int8_model is not fp32_model
+    assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in int8_model.modules())
+    assert not any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in fp32_model.modules())
+
+    model = ClassificationModel(name="tiny", prediction_cost=0.0, precision=INT8_PRECISION)
+    model.set_resources(loader.get_classifier("tiny", precision=INT8_PRECISION))
+    assert len(model.predict(InferenceInput(["this is a good movie", "bad"]))) == 2
+
+
+def test_variant_rejected_below_agreement_threshold(tiny_model_dir, monkeypatch):
+    monkeypatch.setattr(get_inference_settings(), "PRECISION_MIN_LABEL_AGREEMENT", 1.01)
+    loader = ModelLoader(str(tiny_model_dir))
+
+    fp32_model, _ = loader.get_model("tiny", FP32_PRECISION)
+    int8_model, _ = loader.get_model("tiny", INT8_PRECISION)
+
+    assert int8_model is fp32_model
+
+
+def test_bf16_variant_falls_back_without_cpu_support(tiny_model_dir, monkeypatch):
+    monkeypatch.setattr(get_inference_settings(), "PRECISION_MIN_LABEL_AGREEMENT", 0.0)
+    loader = ModelLoader(str(tiny_model_dir))
+    fp32_model, _ = loader.get_model("tiny")
+    bf16_model, _ = loader.get_model("tiny", BF16_PRECISION)
+
+    if bf16_supported():
+        assert isinstance(bf16_model, AutocastModule)
+    else:
+        assert bf16_model is fp32_model
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from entities.ml_model.classification_model import ClassificationModel
+from service.inference.prediction_batcher import PredictionBatcher
+
+
+def test_batcher_runs_concurrent_submissions_as_one_batch():
+    calls = []
+
+    def fake_predict(model, inference_input):
+        calls.append(list(inference_input.data))
+        return [f"label:{text}" for text in inference_input.data]
+
+    batcher = PredictionBatcher(fake_predict, max_batch_size=4, max_wait_ms=200)
+    model = ClassificationModel(name="test_model", model_type="classification", prediction_cost=0.0)
+    texts = ["first text", "second text", "third text", "fourth text"]
+    results = {}
+
+    def worker(text):
+        results[text] = batcher.predict(model, text)
+
+    threads = [threading.Thread(target=worker, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert sorted(calls[0]) == sorted(texts)
+    assert results == {text: f"label:{text}" for text in texts}
+
+
+def test_batcher_flushes_after_max_wait():
+    batcher = PredictionBatcher(lambda model, inp: ["ok"] * len(inp.data), max_batch_size=8, max_wait_ms=5)
+    model = ClassificationModel(name="test_model", model_type="classification", prediction_cost=0.0)
+
+    assert batcher.submit(model, "lonely text").result(timeout=5) == "ok"
+
+
+def test_batcher_propagates_errors_to_every_task():
+    def failing_predict(model, inference_input):
+        raise RuntimeError("forward pass failed")
+
+    batcher = PredictionBatcher(failing_predict, max_batch_size=2, max_wait_ms=50)
+    model = ClassificationModel(name="test_model", model_type="classification", prediction_cost=0.0)
+    futures = [batcher.submit(model, "text one"), batcher.submit(model, "text two")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="forward pass failed"):
+            future.result(timeout=5)
@@ -0,0 +1,81 @@
+import uuid
+
+from config.constants import FP32_PRECISION, INT8_PRECISION, ONNX_ENGINE, SLIDING_WINDOW_MODE, TORCH_ENGINE
+from config.inference_config import get_inference_settings
+from entities.ml_model.classification_model import ClassificationModel
+from entities.ml_model.inference_input import InferenceInput
+from service.crud.model_service import make_prediction, make_batch_prediction
+from service.inference.prediction_cache import LRUCache, DiskCache, PredictionCache, cache_key
+
+
+class CountingModel:
+    def __init__(self, model_id=None, version="1"):
+        self.id = model_id or uuid.uuid4()
+        self.version = version
+        self.precision = FP32_PRECISION
+        self.engine = TORCH_ENGINE
+        self.predicted = []
+
+    def predict(self, data_input):
+        texts = [data_input.data] if isinstance(data_input.data, str) else data_input.data
+        self.predicted.extend(texts)
+        return ["Positive" for _ in texts]
+
+
+def test_cache_key_normalizes_whitespace_and_unicode():
+    model = ClassificationModel(name="test_model", prediction_cost=0.0)
+    assert cache_key(model, "  great  product\n") == cache_key(model, "great product")
+    assert cache_key(model, "great product") != cache_key(model, "Great product")
+
+    new_version = ClassificationModel(id=model.id, name="test_model", prediction_cost=0.0, version="2")
+    assert cache_key(model, "great product") != cache_key(new_version, "great product")
+
+
+def test_cache_key_depends_on_inference_settings(monkeypatch):
+    model = ClassificationModel(name="test_model", prediction_cost=0.0)
+    key = cache_key(model, "great product")
+
+    assert key != cache_key(ClassificationModel(id=model.id, name="test_model", prediction_cost=0.0,
+                                                precision=INT8_PRECISION), "great product")
+    assert key != cache_key(ClassificationModel(id=model.id, name="test_model", prediction_cost=0.0,
+                                                engine=ONNX_ENGINE), "great product")
+    monkeypatch.setattr(get_inference_settings(), "INFERENCE_LONG_TEXT_MODE", SLIDING_WINDOW_MODE)
+    assert key != cache_key(model, "great product")
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+
+    assert cache.put("c", "3") == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "predictions.sqlite3")
+    model = CountingModel()
+    first = PredictionCache(LRUCache(10), DiskCache(path, max_size=100))
+    second = PredictionCache(LRUCache(10), DiskCache(path, max_size=100))
+
+    first.put(model, "shared text", "Neutral")
+
+    assert second.get(model, "shared text") == "Neutral"
+    assert second.memory.get(cache_key(model, "shared text")) == "Neutral"
+
+
+def test_make_prediction_uses_cache(monkeypatch):
+    cache = PredictionCache(LRUCache(10))
+    monkeypatch.setattr("service.crud.model_service.get_prediction_cache", lambda: cache)
+    model = CountingModel()
+
+    assert make_prediction(model, InferenceInput("repeated review text")) == "Positive"
+    assert make_prediction(model, InferenceInput("repeated  review text")) == "Positive"
+    assert model.predicted == ["repeated review text"]
+
+    labels = make_batch_prediction(model, InferenceInput(["repeated review text", "new review text"]))
+    assert labels == ["Positive", "Positive"]
+    assert model.predicted == ["repeated review text", "new review text"]
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import uuid
+
+from sqlalchemy import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from routes import prediction_router
+
+from service.notifications.result_listener import ResultListener
+from service.notifications.result_notifier import notify_result
+
+
+def test_dispatch_fans_out_to_user_streams_and_waiters():
+    async def scenario():
+        listener = ResultListener("prediction_results", queue_size=10)
+        queue = listener.subscribe("user-1")
+        other_queue = listener.subscribe("user-2")
+        future = listener.register("task-1")
+
+        listener.dispatch(json.dumps({"task_id": "task-1", "user_id": "user-1", "result": "Positive"}))
+
+        assert (await listener.wait(future, 1.0))["result"] == "Positive"
+        assert queue.get_nowait()["task_id"] == "task-1"
+        assert other_queue.empty()
+        listener.unsubscribe("user-1", queue)
+        listener.dispatch(json.dumps({"batch_id": "batch-1", "user_id": "user-1"}))
+        assert queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_wait_times_out_without_notification():
+    async def scenario():
+        listener = ResultListener("prediction_results", queue_size=10)
+        future = listener.register("task-1")
+        assert await listener.wait(future, 0.01) is None
+        listener.unregister("task-1", future)
+        assert not listener._waiters
+
+    asyncio.run(scenario())
+
+
+def test_notify_result_is_noop_outside_postgres(session: Session):
+    notify_result({"task_id": "task-1", "user_id": "user-1"}, session)
+
+
+def test_long_poll_ends_the_request_transaction_before_waiting(monkeypatch):
+    checks = []
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            async def fetch_prediction_task(task_id):
+                checks.append(session.in_transaction())
+                return None
+
+            monkeypatch.setattr(prediction_router, "fetch_prediction_task", fetch_prediction_task)
+            assert await prediction_router.wait_for_prediction_task(uuid.uuid4(), 0.05, session) is None
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    assert checks and not any(checks)
@@ -0,0 +1,49 @@
+import torch
+
+from config.constants import SLIDING_WINDOW_MODE, LENGTH_WEIGHTED_AGGREGATION, MEAN_AGGREGATION
+from config.inference_config import get_inference_settings
+from entities.ml_model.classification_model import ClassificationModel
+from entities.ml_model.inference_input import InferenceInput
+from service.inference.engines import TorchEngine
+from service.inference.sliding_window import aggregate_windows
+from service.inference.text_classifier import TextClassifier
+from service.loaders.model_loader import ModelLoader
+
+
+class RecordingEngine(TorchEngine):
+    def __init__(self, model):
+        super().__init__(model)
+        self.batch_shapes = []
+
+    def forward(self, inputs):
+        self.batch_shapes.append(tuple(inputs["input_ids"].shape))
+        return super().forward(inputs)
+
+
+def test_aggregate_windows():
+    probabilities = torch.tensor([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+
+    mean = aggregate_windows(probabilities, [0, 0, 1], [100, 300, 10], 2, MEAN_AGGREGATION)
+    weighted = aggregate_windows(probabilities, [0, 0, 1], [100, 300, 10], 2, LENGTH_WEIGHTED_AGGREGATION)
+
+    assert torch.allclose(mean, torch.tensor([[0.5, 0.5], [0.5, 0.5]]))
+    assert torch.allclose(weighted, torch.tensor([[0.25, 0.75], [0.5, 0.5]]))
+
+
+def test_long_texts_are_split_into_batched_windows(tiny_model_dir, monkeypatch):
+    settings = get_inference_settings()
+    monkeypatch.setattr(settings, "INFERENCE_LONG_TEXT_MODE", SLIDING_WINDOW_MODE)
+    monkeypatch.setattr(settings, "INFERENCE_WINDOW_STRIDE", 64)
+    model, tokenizer = ModelLoader(str(tiny_model_dir)).get_model("tiny")
+    engine = RecordingEngine(model)
+    classifier = ClassificationModel(name="tiny", prediction_cost=0.0)
+    classifier.set_resources(TextClassifier(tokenizer, engine))
+    texts = ["this is a good movie " * 300, "bad", "a terrible review " * 200]
+
+    predictions = classifier.predict(InferenceInput(texts))
+
+    assert len(predictions) == len(texts)
+    windows = sum(shape[0] for shape in engine.batch_shapes)
+    assert windows > len(texts)
+    assert max(shape[1] for shape in engine.batch_shapes) <= 512
+    assert len(engine.batch_shapes) < windows
@@ -0,0 +1,17 @@
+import threading
+
+from service.inference.sync_predictor import SyncPredictor
+
+
+def test_sync_predictor_refuses_work_beyond_its_slots():
+    release = threading.Event()
+    predictor = SyncPredictor(max_workers=1, max_queued=1)
+
+    running = predictor.try_submit(release.wait, 5)
+    queued = predictor.try_submit(lambda: "queued")
+    assert running is not None and queued is not None
+    assert predictor.try_submit(lambda: "refused") is None
+
+    release.set()
+    assert queued.result(timeout=5) == "queued"
+    assert predictor.try_submit(lambda: "accepted").result(timeout=5) == "accepted"
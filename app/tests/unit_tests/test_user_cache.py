@@ -0,0 +1,95 @@
+import uuid
+
+import pytest
+from sqlalchemy import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from entities.auth.auth_entities import TokenData
+from entities.user.user import User
+from service.auth import auth_service
+from service.auth.user_cache import UserCache, get_user_cache
+from service.crud import async_user_service
+
+
+def make_user(balance: float = 10.0) -> User:
+    return User(email=f"{uuid.uuid4()}@example.com", name="Cache", surname="User", hashed_password="x",
+                balance=balance)
+
+
+def test_get_returns_a_copy_of_the_cached_user():
+    cache = UserCache(max_size=10, ttl_s=60)
+    user = make_user()
+    assert cache.get(user.id) is None
+
+    cache.put(user)
+    user.balance = 0.0
+    cached = cache.get(user.id)
+    assert cached is not user
+    assert cached.balance == 10.0
+
+    cached.balance = 5.0
+    assert cache.get(str(user.id)).balance == 10.0
+
+
+def test_entries_expire_and_the_cache_is_bounded():
+    cache = UserCache(max_size=2, ttl_s=0)
+    user = make_user()
+    cache.put(user)
+    assert cache.get(user.id) is None
+
+    cache = UserCache(max_size=2, ttl_s=60)
+    users = [make_user() for _ in range(3)]
+    for user in users:
+        cache.put(user)
+    assert cache.get(users[0].id) is None
+    assert cache.get(users[2].id) is not None
+
+
+def test_notification_invalidates_the_user():
+    cache = UserCache(max_size=10, ttl_s=60)
+    user = make_user()
+    cache.put(user)
+    cache.on_notification(str(user.id))
+    assert cache.get(user.id) is None
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_session():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_active_user_is_served_from_cache_until_balance_changes(async_session, monkeypatch):
+    user = make_user()
+    await async_user_service.create_user(user, async_session)
+    token_data = TokenData(username=user.email, user_id=user.id)
+
+    fetched = []
+    get_user_by_id = async_user_service.get_user_by_id
+
+    async def counting_get_user_by_id(id, session):
+        fetched.append(id)
+        return await get_user_by_id(id, session)
+
+    monkeypatch.setattr(async_user_service, "get_user_by_id", counting_get_user_by_id)
+    get_user_cache().clear()
+
+    await auth_service.get_current_active_user(token_data, async_session)
+    assert (await auth_service.get_current_active_user(token_data, async_session)).balance == 10.0
+    assert len(fetched) == 1
+
+    await async_user_service.withdraw_balance(user.id, 4.0, async_session)
+    assert (await auth_service.get_current_active_user(token_data, async_session)).balance == 6.0
+    assert len(fetched) == 2
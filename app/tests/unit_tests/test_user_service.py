@@ -12,6 +12,10 @@ from app.src.service.crud.user_service import (
     create_user,
     add_balance,
     withdraw_balance,
+    reserve_balance,
+    settle_hold,
+    release_hold,
+    charge_task,
     get_balance_histories,
     hash_password,
     verify_password,
@@ -139,10 +143,15 @@ def test_withdraw_balance_insufficient_funds(session: Session):
     )
     create_user(user, session)
 
+    pending = BalanceHistory(user_id=user.id, amount_before_change=30.0, amount_change=0.0)
+    session.add(pending)
     with pytest.raises(HTTPException) as exc_info:
         withdraw_balance(user.id, 50.0, session)
     assert exc_info.value.status_code == 400
     assert "Insufficient balance" in exc_info.value.detail
+    # The caller owns the transaction, its pending rows are left for it to commit or roll back.
+    assert session.exec(select(BalanceHistory).where(BalanceHistory.id == pending.id)).first() is not None
+    session.rollback()
 
 
 def test_get_balance_histories_order(session: Session):
@@ -171,10 +180,17 @@ def test_get_balance_histories_order(session: Session):
     session.add(history2)
     session.commit()
 
-    histories = get_balance_histories(user.id, session)
+    histories, next_cursor = get_balance_histories(user.id, session)
     assert len(histories) == 2
+    assert next_cursor is None
     assert histories[0].timestamp > histories[1].timestamp
 
+    first_page, next_cursor = get_balance_histories(user.id, session, limit=1)
+    assert [history.id for history in first_page] == [history2.id]
+    second_page, next_cursor = get_balance_histories(user.id, session, next_cursor, limit=1)
+    assert [history.id for history in second_page] == [history1.id]
+    assert next_cursor is None
+
 
 def test_hash_and_verify_password():
     password = "mysecretpassword"
@@ -220,3 +236,66 @@ def test_find_and_verify_user_invalid_password(session: Session):
         find_and_verify_user("invalidpass@example.com", "wrongpass", session)
     assert exc_info.value.status_code == 401
     assert "Invalid credentials" in exc_info.value.detail
+
+
+def test_reserve_and_settle_hold(session: Session):
+    user = User(
+        email="hold@example.com",
+        name="Hold",
+        surname="Tester",
+        hashed_password=hash_password("secret"),
+        balance=100.0,
+    )
+    create_user(user, session)
+    hold_id = uuid.uuid4()
+
+    reserve_balance(user.id, 30.0, hold_id, session)
+    assert get_user_by_id(user.id, session).balance == 70.0
+    with pytest.raises(HTTPException) as exc_info:
+        reserve_balance(user.id, 80.0, uuid.uuid4(), session)
+    assert exc_info.value.status_code == 400
+
+    assert settle_hold(hold_id, session) is True
+    assert settle_hold(hold_id, session) is False
+    session.refresh(user)
+    assert user.balance == 70.0
+    histories, _ = get_balance_histories(user.id, session)
+    assert [(h.amount_before_change, h.amount_change) for h in histories] == [(100.0, -30.0)]
+
+
+def test_release_hold_restores_balance(session: Session):
+    user = User(
+        email="release@example.com",
+        name="Release",
+        surname="Tester",
+        hashed_password=hash_password("secret"),
+        balance=50.0,
+    )
+    create_user(user, session)
+    hold_id = uuid.uuid4()
+
+    reserve_balance(user.id, 50.0, hold_id, session)
+    assert release_hold(hold_id, session) is True
+    assert release_hold(hold_id, session) is False
+    session.refresh(user)
+    assert user.balance == 50.0
+    assert get_balance_histories(user.id, session) == ([], None)
+
+
+def test_charge_task_without_hold_withdraws(session: Session):
+    user = User(
+        email="charge@example.com",
+        name="Charge",
+        surname="Tester",
+        hashed_password=hash_password("secret"),
+        balance=20.0,
+    )
+    create_user(user, session)
+
+    charge_task(user.id, 15.0, uuid.uuid4(), session)
+    session.refresh(user)
+    assert user.balance == 5.0
+    with pytest.raises(HTTPException):
+        charge_task(user.id, 15.0, uuid.uuid4(), session)
+    session.refresh(user)
+    assert user.balance == 5.0
@@ -0,0 +1,103 @@
+import gc
+import os
+
+import pytest
+from sqlmodel import Session
+
+from entities.ml_model.classification_model import ClassificationModel
+from service.crud.model_service import create_model
+from service.inference.memory_stats import read_memory_stats
+from service.inference.worker_boot import (
+    preload_active_models,
+    take_preloaded_models,
+    freeze_preloaded_objects,
+    warm_up,
+    mark_worker_ready,
+    mark_child_ready,
+    count_ready_children,
+    mark_worker_ready_after_children,
+    clear_worker_ready
+)
+
+
+class RecordingModel:
+    name = "recording_model"
+
+    def __init__(self):
+        self.inputs = []
+
+    def predict(self, data_input):
+        self.inputs.append(data_input.data)
+        return ["Neutral"]
+
+
+def test_preload_active_models_skips_inactive(session: Session, monkeypatch):
+    create_model(ClassificationModel(name="preload_active", prediction_cost=1.0), session)
+    create_model(ClassificationModel(name="preload_inactive", prediction_cost=1.0, is_active=False), session)
+    loaded = []
+
+    def fake_get_model_by_name(name, session):
+        loaded.append(name)
+        return ClassificationModel(name=name, prediction_cost=1.0)
+
+    monkeypatch.setattr("service.inference.worker_boot.get_model_by_name", fake_get_model_by_name)
+
+    models = preload_active_models(session)
+
+    assert "preload_active" in loaded
+    assert "preload_inactive" not in loaded
+    assert [model.name for model in take_preloaded_models()] == [model.name for model in models]
+    assert take_preloaded_models() == []
+
+
+def test_warm_up_runs_each_length():
+    model = RecordingModel()
+
+    warm_up([model], [4, 16])
+
+    assert [len(texts[0].split()) for texts in model.inputs] == [4, 16]
+
+
+def test_ready_marker(tmp_path):
+    path = str(tmp_path / "ready")
+
+    mark_worker_ready(path)
+    assert os.path.exists(path)
+
+    clear_worker_ready(path)
+    assert not os.path.exists(path)
+    clear_worker_ready(path)
+
+
+def test_ready_marker_waits_for_pool_children(tmp_path):
+    path = str(tmp_path / "ready")
+
+    thread = mark_worker_ready_after_children(path, children=1, poll_interval_s=0.01)
+    thread.join(0.1)
+    assert not os.path.exists(path)
+
+    mark_child_ready(path)
+    thread.join(5)
+    assert os.path.exists(path)
+    assert count_ready_children(path) == 1
+
+    clear_worker_ready(path)
+    assert not os.path.exists(path)
+    assert count_ready_children(path) == 0
+
+
+def test_freeze_preloaded_objects():
+    try:
+        freeze_preloaded_objects()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_read_memory_stats():
+    stats = read_memory_stats(os.getpid())
+    if stats is None:
+        pytest.skip("/proc/<pid>/smaps_rollup is not available")
+
+    assert stats["rss"] > 0
+    assert 0 < stats["uss"] <= stats["pss"] <= stats["rss"]